@@ -0,0 +1,235 @@
+# aggregates.py - Tabel agregat bulanan/tahunan TMA yang diperbarui secara inkremental
+import calendar
+import pandas as pd
+import profiling
+
+# Threshold standar (cm) sesuai slider halaman Data TMA: 1.0 - 3.0 m, langkah 0.1 m
+STANDARD_THRESHOLDS_CM = list(range(100, 301, 10))
+MONTH_NAMES = list(calendar.month_name)
+
+CREATE_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS threshold_standar
+       (threshold_cm INTEGER PRIMARY KEY)''',
+    '''CREATE TABLE IF NOT EXISTS tma_bulanan
+       (stasiun TEXT NOT NULL,
+        tahun INTEGER NOT NULL,
+        bulan INTEGER NOT NULL,
+        jumlah_hari INTEGER,
+        tma_rata REAL,
+        tma_min REAL,
+        tma_max REAL,
+        PRIMARY KEY (stasiun, tahun, bulan))''',
+    '''CREATE TABLE IF NOT EXISTS banjir_bulanan
+       (stasiun TEXT NOT NULL,
+        tahun INTEGER NOT NULL,
+        bulan INTEGER NOT NULL,
+        threshold_cm INTEGER NOT NULL,
+        hari_banjir INTEGER,
+        PRIMARY KEY (stasiun, tahun, bulan, threshold_cm))''',
+    '''CREATE TABLE IF NOT EXISTS tma_tahunan
+       (stasiun TEXT NOT NULL,
+        tahun INTEGER NOT NULL,
+        jumlah_hari INTEGER,
+        tma_rata REAL,
+        tma_min REAL,
+        tma_max REAL,
+        PRIMARY KEY (stasiun, tahun))''',
+    '''CREATE TABLE IF NOT EXISTS banjir_tahunan
+       (stasiun TEXT NOT NULL,
+        tahun INTEGER NOT NULL,
+        threshold_cm INTEGER NOT NULL,
+        hari_banjir INTEGER,
+        PRIMARY KEY (stasiun, tahun, threshold_cm))''',
+]
+
+AGGREGATE_TABLES = ['tma_bulanan', 'banjir_bulanan', 'tma_tahunan', 'banjir_tahunan']
+
+_YEAR = "CAST(strftime('%Y', tanggal) AS INTEGER)"
+_MONTH = "CAST(strftime('%m', tanggal) AS INTEGER)"
+
+
+def create_tables(conn):
+    for ddl in CREATE_TABLES:
+        conn.execute(ddl)
+    conn.executemany("INSERT OR IGNORE INTO threshold_standar VALUES (?)",
+                     [(t,) for t in STANDARD_THRESHOLDS_CM])
+
+
+# Threshold dalam cm jika tepat di kelipatan cm (misalnya 1.6 -> 160), None jika tidak (1.496):
+# tabel agregat hanya dipakai untuk threshold yang benar-benar sama, bukan hasil pembulatan
+def threshold_to_cm(threshold):
+    cm = int(round(threshold * 100))
+    return cm if abs(threshold * 100 - cm) < 1e-9 else None
+
+
+def _month_start(year, month):
+    return f"{year:04d}-{month:02d}-01"
+
+
+def _next_month_start(year, month):
+    return _month_start(year + 1, 1) if month == 12 else _month_start(year, month + 1)
+
+
+# Hitung ulang agregat hanya untuk bulan-bulan yang tersentuh rentang tanggal [start, end].
+# Dipanggil di dalam transaksi yang sama dengan penulisan tma_data.
+@profiling.timed('aggregates.refresh')
+def refresh(conn, stasiun, start, end):
+    start = pd.Timestamp(start)
+    end = pd.Timestamp(end)
+    lo = _month_start(start.year, start.month)
+    hi = _next_month_start(end.year, end.month)
+    lo_key = start.year * 100 + start.month
+    hi_key = end.year * 100 + end.month
+
+    conn.execute("DELETE FROM tma_bulanan WHERE stasiun=? AND tahun * 100 + bulan BETWEEN ? AND ?",
+                 (stasiun, lo_key, hi_key))
+    conn.execute("DELETE FROM banjir_bulanan WHERE stasiun=? AND tahun * 100 + bulan BETWEEN ? AND ?",
+                 (stasiun, lo_key, hi_key))
+    conn.execute(f'''INSERT INTO tma_bulanan
+                     SELECT stasiun, {_YEAR}, {_MONTH}, COUNT(*), AVG(tma_rata), MIN(tma_min), MAX(tma_max)
+                     FROM tma_data
+                     WHERE stasiun=? AND tanggal >= ? AND tanggal < ?
+                     GROUP BY 1, 2, 3''', (stasiun, lo, hi))
+    conn.execute(f'''INSERT INTO banjir_bulanan
+                     SELECT d.stasiun, {_YEAR}, {_MONTH}, t.threshold_cm,
+                            SUM(d.tma_max > t.threshold_cm / 100.0)
+                     FROM tma_data d CROSS JOIN threshold_standar t
+                     WHERE d.stasiun=? AND d.tanggal >= ? AND d.tanggal < ?
+                     GROUP BY 1, 2, 3, 4''', (stasiun, lo, hi))
+
+    # Agregat tahunan diturunkan dari tabel bulanan (maksimal 12 baris per tahun)
+    years = (start.year, end.year)
+    conn.execute("DELETE FROM tma_tahunan WHERE stasiun=? AND tahun BETWEEN ? AND ?", (stasiun,) + years)
+    conn.execute("DELETE FROM banjir_tahunan WHERE stasiun=? AND tahun BETWEEN ? AND ?", (stasiun,) + years)
+    conn.execute('''INSERT INTO tma_tahunan
+                    SELECT stasiun, tahun, SUM(jumlah_hari),
+                           SUM(tma_rata * jumlah_hari) / SUM(jumlah_hari), MIN(tma_min), MAX(tma_max)
+                    FROM tma_bulanan
+                    WHERE stasiun=? AND tahun BETWEEN ? AND ?
+                    GROUP BY stasiun, tahun''', (stasiun,) + years)
+    conn.execute('''INSERT INTO banjir_tahunan
+                    SELECT stasiun, tahun, threshold_cm, SUM(hari_banjir)
+                    FROM banjir_bulanan
+                    WHERE stasiun=? AND tahun BETWEEN ? AND ?
+                    GROUP BY stasiun, tahun, threshold_cm''', (stasiun,) + years)
+
+
+# Bangun ulang semua agregat dari tma_data (dipakai saat migrasi)
+def rebuild(conn):
+    clear(conn)
+    ranges = conn.execute("SELECT stasiun, MIN(tanggal), MAX(tanggal) FROM tma_data GROUP BY stasiun").fetchall()
+    for stasiun, start, end in ranges:
+        refresh(conn, stasiun, start, end)
+
+
+def clear(conn, stasiun=None):
+    for table in AGGREGATE_TABLES:
+        if stasiun is None:
+            conn.execute(f"DELETE FROM {table}")
+        else:
+            conn.execute(f"DELETE FROM {table} WHERE stasiun=?", (stasiun,))
+
+
+# Statistik bulanan satu tahun, format sama dengan tabel "Detail Statistik Bulanan"
+def read_monthly_stats(conn, stasiun, tahun, threshold):
+    tahun = int(tahun)
+    threshold = float(threshold)
+    threshold_cm = threshold_to_cm(threshold)
+    if threshold_cm in STANDARD_THRESHOLDS_CM:
+        query = '''SELECT m.bulan, b.hari_banjir, m.tma_rata AS tma_rata_rata,
+                          m.tma_max AS tma_tertinggi, m.tma_min AS tma_terendah
+                   FROM tma_bulanan m
+                   JOIN banjir_bulanan b ON b.stasiun = m.stasiun AND b.tahun = m.tahun
+                                        AND b.bulan = m.bulan AND b.threshold_cm = ?
+                   WHERE m.stasiun = ? AND m.tahun = ?
+                   ORDER BY m.bulan'''
+        params = (threshold_cm, stasiun, tahun)
+    else:
+        # Threshold di luar daftar standar: hitung langsung dengan range scan pada indeks
+        query = f'''SELECT {_MONTH} AS bulan, SUM(tma_max > ?) AS hari_banjir,
+                           AVG(tma_rata) AS tma_rata_rata, MAX(tma_max) AS tma_tertinggi,
+                           MIN(tma_min) AS tma_terendah
+                    FROM tma_data
+                    WHERE stasiun = ? AND tanggal >= ? AND tanggal < ?
+                    GROUP BY 1 ORDER BY 1'''
+        params = (threshold, stasiun, _month_start(tahun, 1), _month_start(tahun + 1, 1))
+    stats = pd.read_sql(query, conn, params=params)
+    stats.insert(1, 'nama_bulan', [MONTH_NAMES[b] for b in stats['bulan']])
+    return stats
+
+
+def read_yearly_stats(conn, stasiun):
+    return pd.read_sql('''SELECT tahun, jumlah_hari, tma_rata, tma_min, tma_max
+                          FROM tma_tahunan WHERE stasiun = ? ORDER BY tahun''',
+                       conn, params=(stasiun,))
+
+
+# Jumlah hari banjir per tahun (kolom: tahun, banjir)
+def read_yearly_floods(conn, stasiun, threshold):
+    threshold = float(threshold)
+    threshold_cm = threshold_to_cm(threshold)
+    if threshold_cm in STANDARD_THRESHOLDS_CM:
+        query = '''SELECT tahun, hari_banjir AS banjir FROM banjir_tahunan
+                   WHERE stasiun = ? AND threshold_cm = ? ORDER BY tahun'''
+        params = (stasiun, threshold_cm)
+    else:
+        query = f'''SELECT {_YEAR} AS tahun, SUM(tma_max > ?) AS banjir FROM tma_data
+                    WHERE stasiun = ? GROUP BY 1 ORDER BY 1'''
+        params = (threshold, stasiun)
+    return pd.read_sql(query, conn, params=params)
+
+
+# Hari banjir dan jumlah hari terukur per bulan untuk seluruh tahun (input model musiman)
+def read_monthly_floods(conn, stasiun, threshold):
+    threshold = float(threshold)
+    threshold_cm = threshold_to_cm(threshold)
+    if threshold_cm in STANDARD_THRESHOLDS_CM:
+        query = '''SELECT m.tahun, m.bulan, b.hari_banjir, m.jumlah_hari
+                   FROM tma_bulanan m
+                   JOIN banjir_bulanan b ON b.stasiun = m.stasiun AND b.tahun = m.tahun
+                                        AND b.bulan = m.bulan AND b.threshold_cm = ?
+                   WHERE m.stasiun = ?
+                   ORDER BY m.tahun, m.bulan'''
+        params = (threshold_cm, stasiun)
+    else:
+        query = f'''SELECT {_YEAR} AS tahun, {_MONTH} AS bulan, SUM(tma_max > ?) AS hari_banjir,
+                           COUNT(*) AS jumlah_hari
+                    FROM tma_data WHERE stasiun = ?
+                    GROUP BY 1, 2 ORDER BY 1, 2'''
+        params = (threshold, stasiun)
+    return pd.read_sql(query, conn, params=params)
+
+
+# Jumlah hari banjir per tahun untuk semua stasiun sekaligus (kolom: stasiun, tahun, banjir)
+def read_all_yearly_floods(conn, threshold):
+    threshold = float(threshold)
+    threshold_cm = threshold_to_cm(threshold)
+    if threshold_cm in STANDARD_THRESHOLDS_CM:
+        query = '''SELECT stasiun, tahun, hari_banjir AS banjir FROM banjir_tahunan
+                   WHERE threshold_cm = ? ORDER BY stasiun, tahun'''
+        params = (threshold_cm,)
+    else:
+        query = f'''SELECT stasiun, {_YEAR} AS tahun, SUM(tma_max > ?) AS banjir FROM tma_data
+                    GROUP BY 1, 2 ORDER BY 1, 2'''
+        params = (threshold,)
+    return pd.read_sql(query, conn, params=params)
+
+
+# Hari banjir bulanan untuk semua stasiun (kolom: stasiun, tahun, bulan, hari_banjir, jumlah_hari)
+def read_all_monthly_floods(conn, threshold):
+    threshold = float(threshold)
+    threshold_cm = threshold_to_cm(threshold)
+    if threshold_cm in STANDARD_THRESHOLDS_CM:
+        query = '''SELECT m.stasiun, m.tahun, m.bulan, b.hari_banjir, m.jumlah_hari
+                   FROM tma_bulanan m
+                   JOIN banjir_bulanan b ON b.stasiun = m.stasiun AND b.tahun = m.tahun
+                                        AND b.bulan = m.bulan AND b.threshold_cm = ?
+                   ORDER BY m.stasiun, m.tahun, m.bulan'''
+        params = (threshold_cm,)
+    else:
+        query = f'''SELECT stasiun, {_YEAR} AS tahun, {_MONTH} AS bulan, SUM(tma_max > ?) AS hari_banjir,
+                           COUNT(*) AS jumlah_hari
+                    FROM tma_data
+                    GROUP BY 1, 2, 3 ORDER BY 1, 2, 3'''
+        params = (threshold,)
+    return pd.read_sql(query, conn, params=params)
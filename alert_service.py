@@ -0,0 +1,304 @@
+# alert_service.py - Layanan ingest bacaan TMA real-time dengan peringatan banjir
+#
+# Bacaan diterima dari stdin, direktori file drop, atau endpoint HTTP lokal, dievaluasi satu per satu
+# oleh alerts.AlertEngine, lalu disimpan per batch ke tabel telemetri (piramida, baris harian dan
+# agregat hari banjir ikut diperbarui). Peringatan ditulis ke tabel peringatan begitu terjadi.
+#
+# Format baris: "stasiun,waktu,tma" atau "waktu,tma" (stasiun dari --station); pemisah ';' boleh
+# dengan koma desimal. Waktu ISO (2024-01-31 06:15) atau dd/mm/yyyy HH:MM.
+#
+# Contoh:
+#   tail -f logger.csv | python alert_service.py --stdin
+#   python alert_service.py --watch masuk/ --http 8502
+#   curl --data-binary @bacaan.csv http://127.0.0.1:8502/bacaan
+#   python alert_service.py --replay bacaan.csv --db /tmp/uji.db     # ukur throughput
+#   python alert_service.py --set-threshold hilir 1.8 --rise-rate 0.15
+#
+# File di direktori --watch sebaiknya ditulis dengan nama sementara lalu di-rename menjadi .csv;
+# setelah dibaca, file diberi akhiran .selesai.
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+import alerts
+import database
+import forecasting
+
+# Batch bacaan per penulisan; batch juga ditulis setiap FLUSH_SECONDS dan segera saat ada peringatan
+BATCH_SIZE = 5000
+FLUSH_SECONDS = 1.0
+WATCH_SECONDS = 1.0
+# Pengaturan threshold per stasiun dibaca ulang dari database setiap selang ini (detik)
+SETTINGS_SECONDS = 60
+DONE_SUFFIX = '.selesai'
+
+_EPOCH = datetime(1970, 1, 1)
+_STOP = object()
+
+
+def _parse_time(text):
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for fmt in ('%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"Format waktu tidak dikenali: {text}")
+
+
+# Satu baris -> (stasiun, waktu, tma); None untuk header, baris kosong atau tidak valid
+def parse_line(line, default_station=database.DEFAULT_STATION):
+    line = line.strip()
+    if not line:
+        return None
+    if ';' in line:
+        fields = line.split(';')
+        fields[-1] = fields[-1].replace(',', '.')
+    else:
+        fields = line.split(',')
+    if len(fields) == 3:
+        stasiun = fields[0].strip() or default_station
+    elif len(fields) == 2:
+        stasiun = default_station
+    else:
+        return None
+    try:
+        tma = float(fields[-1])
+        waktu = _parse_time(fields[-2].strip())
+    except ValueError:
+        return None
+    if tma != tma:
+        return None
+    return stasiun, waktu, tma
+
+
+class AlertService:
+    def __init__(self, default_station=database.DEFAULT_STATION, threshold=forecasting.DEFAULT_THRESHOLD,
+                 store=True, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS, log=sys.stderr):
+        self.default_station = default_station
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.log = log
+        self.engine = alerts.AlertEngine(threshold, database.load_alert_settings(), database.load_flooding_states())
+        self.queue = queue.Queue(maxsize=10000)
+        self.readings = 0
+        self.dropped = 0
+        self.alert_count = 0
+        self._buffers = {}
+        self._buffered = 0
+        self._alerts = []
+        self._last_flush = self._settings_loaded = time.monotonic()
+
+    def handle_line(self, line):
+        parsed = parse_line(line, self.default_station)
+        if parsed is None:
+            self.dropped += 1
+            return
+        self.handle(*parsed)
+
+    def handle(self, stasiun, waktu, tma):
+        new_alerts = self.engine.process(stasiun, (waktu - _EPOCH).total_seconds(), waktu, tma)
+        buffer = self._buffers.get(stasiun)
+        if buffer is None:
+            buffer = self._buffers[stasiun] = ([], [])
+        buffer[0].append(waktu)
+        buffer[1].append(tma)
+        self._buffered += 1
+        self.readings += 1
+        if new_alerts:
+            self._alerts.extend(new_alerts)
+            self.alert_count += len(new_alerts)
+            if self.log is not None:
+                for alert in new_alerts:
+                    print(f"[{alert.waktu}] {alert.stasiun}: {alert.jenis} "
+                          f"(nilai {alert.nilai:.2f}, batas {alert.batas:.2f})", file=self.log, flush=True)
+        if new_alerts or self._buffered >= self.batch_size:
+            self.flush()
+
+    # Tulis bacaan yang tertahan (satu transaksi per stasiun) lalu peringatannya
+    def flush(self):
+        if self.store:
+            for stasiun, (waktu, tma) in self._buffers.items():
+                database.upsert_telemetry(pd.DataFrame({'waktu': waktu, 'tma': tma}), stasiun)
+            database.add_alerts(self._alerts)
+        self._buffers = {}
+        self._buffered = 0
+        self._alerts = []
+        self._last_flush = time.monotonic()
+
+    def reload_settings(self):
+        self.engine.update_settings(database.load_alert_settings())
+        self._settings_loaded = time.monotonic()
+
+    # Konsumen tunggal: semua sumber mengirim daftar baris ke antrian
+    def run(self):
+        while True:
+            try:
+                lines = self.queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                lines = None
+            if lines is _STOP:
+                break
+            for line in lines or []:
+                self.handle_line(line)
+            now = time.monotonic()
+            if self._buffered and now - self._last_flush >= self.flush_seconds:
+                self.flush()
+            if now - self._settings_loaded >= SETTINGS_SECONDS:
+                self.reload_settings()
+        self.flush()
+
+    def stop(self):
+        self.queue.put(_STOP)
+
+
+def read_stdin(service, stop_at_eof):
+    for line in sys.stdin:
+        service.queue.put([line])
+    if stop_at_eof:
+        service.stop()
+
+
+# File yang gagal dibuka/diganti nama (masih ditulis, izin, dihapus) dicatat ke log lalu dicoba lagi
+# pada putaran berikutnya; baris baru dimasukkan antrian setelah file ditandai selesai agar tidak ganda
+def watch_directory(service, path):
+    while True:
+        for name in sorted(os.listdir(path)):
+            if not name.lower().endswith('.csv'):
+                continue
+            file_path = os.path.join(path, name)
+            try:
+                with open(file_path, encoding='utf-8-sig') as f:
+                    lines = f.readlines()
+                os.replace(file_path, file_path + DONE_SUFFIX)
+            except OSError as e:
+                if service.log is not None:
+                    print(f"Gagal membaca {file_path}: {str(e)}", file=service.log, flush=True)
+                continue
+            service.queue.put(lines)
+        time.sleep(WATCH_SECONDS)
+
+
+# POST /bacaan: badan berisi baris bacaan; GET /peringatan: peringatan terbaru; GET /status: penghitung
+def make_http_server(service, port, host='127.0.0.1'):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            payload = json.dumps(body, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if not self.path.startswith('/bacaan'):
+                self._reply(404, {'error': 'tidak ditemukan'})
+                return
+            length = int(self.headers.get('Content-Length') or 0)
+            lines = self.rfile.read(length).decode('utf-8-sig').splitlines()
+            service.queue.put(lines)
+            self._reply(202, {'diterima': len(lines)})
+
+        def do_GET(self):
+            if self.path.startswith('/peringatan'):
+                self._reply(200, database.load_alerts().to_dict(orient='records'))
+            elif self.path.startswith('/status'):
+                self._reply(200, {'bacaan': service.readings, 'dibuang': service.dropped,
+                                  'peringatan': service.alert_count, 'antrian': service.queue.qsize()})
+            else:
+                self._reply(404, {'error': 'tidak ditemukan'})
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+# Putar ulang file bacaan secepat mungkin: throughput evaluasi saja, lalu evaluasi + penyimpanan
+def replay(path, default_station, threshold, store=True, batch_size=BATCH_SIZE):
+    with open(path, encoding='utf-8-sig') as f:
+        lines = f.readlines()
+    results = []
+    for mode, store_mode in [('evaluasi', False), ('evaluasi+simpan', True)]:
+        if store_mode and not store:
+            continue
+        service = AlertService(default_station, threshold, store=store_mode, batch_size=batch_size, log=None)
+        start = time.perf_counter()
+        for line in lines:
+            service.handle_line(line)
+        service.flush()
+        elapsed = time.perf_counter() - start
+        results.append({
+            'mode': mode,
+            'bacaan': service.readings,
+            'dibuang': service.dropped,
+            'peringatan': service.alert_count,
+            'detik': elapsed,
+            'bacaan_per_detik': service.readings / elapsed if elapsed else None,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan ingest dan peringatan banjir real-time")
+    parser.add_argument('--stdin', action='store_true', help="Baca bacaan dari stdin")
+    parser.add_argument('--watch', help="Direktori file drop (*.csv)")
+    parser.add_argument('--http', type=int, metavar='PORT', help="Terima bacaan lewat HTTP POST /bacaan")
+    parser.add_argument('--host', default='127.0.0.1', help="Alamat HTTP (default: %(default)s)")
+    parser.add_argument('--replay', metavar='FILE', help="Putar ulang file dan ukur throughput")
+    parser.add_argument('--no-store', action='store_true', help="Replay tanpa menulis ke database")
+    parser.add_argument('--station', default=database.DEFAULT_STATION,
+                        help="Stasiun untuk baris tanpa kolom stasiun (default: %(default)s)")
+    parser.add_argument('--threshold', type=float, default=forecasting.DEFAULT_THRESHOLD,
+                        help="Threshold bawaan untuk stasiun tanpa pengaturan (default: %(default)s)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Bacaan per batch (default: %(default)s)")
+    parser.add_argument('--set-threshold', nargs=2, metavar=('STASIUN', 'THRESHOLD'),
+                        help="Simpan threshold stasiun lalu keluar")
+    parser.add_argument('--rise-rate', type=float, help="Batas laju kenaikan (m/jam) untuk --set-threshold")
+    parser.add_argument('--db', default=database.DB_PATH, help="File database SQLite (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    database.use_database(args.db)
+
+    if args.set_threshold:
+        stasiun, threshold = args.set_threshold
+        database.set_alert_setting(stasiun, float(threshold), args.rise_rate)
+        return
+
+    if args.replay:
+        json.dump(replay(args.replay, args.station, args.threshold, not args.no_store, args.batch_size),
+                  sys.stdout, indent=2)
+        print()
+        return
+
+    if not (args.stdin or args.watch or args.http):
+        parser.error("Pilih minimal satu sumber: --stdin, --watch atau --http")
+
+    service = AlertService(args.station, args.threshold, batch_size=args.batch_size)
+    if args.stdin:
+        only_stdin = not (args.watch or args.http)
+        threading.Thread(target=read_stdin, args=(service, only_stdin), daemon=True).start()
+    if args.watch:
+        threading.Thread(target=watch_directory, args=(service, args.watch), daemon=True).start()
+    if args.http:
+        server = make_http_server(service, args.http, args.host)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"HTTP: http://{args.host}:{args.http}/bacaan", file=sys.stderr)
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        service.flush()
+
+
+if __name__ == "__main__":
+    main()
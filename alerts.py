@@ -0,0 +1,160 @@
+# alerts.py - Mesin peringatan banjir real-time atas bacaan TMA yang masuk satu per satu
+#
+# Setiap bacaan dievaluasi terhadap state per stasiun dalam O(1) (amortized): perubahan status
+# banjir (tma > threshold stasiun) dan laju kenaikan dari bacaan tertua dalam RATE_WINDOW terakhir.
+# Peringatan hanya dibuat saat status berubah sehingga satu kejadian banjir menghasilkan satu
+# peringatan 'banjir' dan satu 'surut' (dengan histeresis agar noise di sekitar threshold tidak
+# memicu peringatan berulang). Dipakai oleh alert_service.py.
+from collections import deque, namedtuple
+import pandas as pd
+
+# Batas laju kenaikan bawaan (m per jam) jika stasiun tidak punya pengaturan sendiri
+DEFAULT_RISE_RATE = 0.10
+# Laju kenaikan dihitung dari bacaan tertua dalam jendela ini (detik), minimal MIN_RATE_SPAN detik
+RATE_WINDOW = 3600
+MIN_RATE_SPAN = 600
+# Status banjir baru dinyatakan surut jika tma <= threshold - HYSTERESIS (m)
+HYSTERESIS = 0.02
+
+JENIS = ['banjir', 'surut', 'naik_cepat']
+
+CREATE_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS ambang_stasiun
+       (stasiun TEXT PRIMARY KEY,
+        threshold REAL NOT NULL,
+        laju_naik REAL)''',
+    '''CREATE TABLE IF NOT EXISTS peringatan
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        stasiun TEXT NOT NULL,
+        waktu TEXT NOT NULL,
+        jenis TEXT NOT NULL,
+        tma REAL,
+        nilai REAL,
+        batas REAL,
+        dibuat TEXT NOT NULL DEFAULT (datetime('now', 'localtime')))''',
+    '''CREATE INDEX IF NOT EXISTS idx_peringatan_stasiun_waktu ON peringatan (stasiun, waktu)''',
+]
+
+INSERT_ALERT = "INSERT INTO peringatan (stasiun, waktu, jenis, tma, nilai, batas) VALUES (?, ?, ?, ?, ?, ?)"
+
+# nilai: tma untuk banjir/surut, laju (m/jam) untuk naik_cepat; batas: threshold atau batas laju
+Alert = namedtuple('Alert', ['stasiun', 'waktu', 'jenis', 'tma', 'nilai', 'batas'])
+
+
+class StationState:
+    __slots__ = ['threshold', 'rise_rate', 'flooding', 'rising', 'last_time', 'window']
+
+    def __init__(self, threshold, rise_rate, flooding=False):
+        self.threshold = threshold
+        self.rise_rate = rise_rate
+        self.flooding = flooding
+        self.rising = False
+        self.last_time = None
+        self.window = deque()
+
+
+class AlertEngine:
+    # settings: {stasiun: (threshold, laju_naik)}; flooding: {stasiun: True/False} status terakhir
+    def __init__(self, default_threshold, settings=None, flooding=None, default_rise_rate=DEFAULT_RISE_RATE,
+                 rate_window=RATE_WINDOW, min_rate_span=MIN_RATE_SPAN, hysteresis=HYSTERESIS):
+        self.default_threshold = default_threshold
+        self.default_rise_rate = default_rise_rate
+        self.settings = dict(settings or {})
+        self.flooding = dict(flooding or {})
+        self.rate_window = rate_window
+        self.min_rate_span = min_rate_span
+        self.hysteresis = hysteresis
+        self._stations = {}
+
+    def _state(self, stasiun):
+        threshold, rise_rate = self.settings.get(stasiun, (None, None))
+        state = StationState(self.default_threshold if threshold is None else threshold,
+                             self.default_rise_rate if rise_rate is None else rise_rate,
+                             self.flooding.get(stasiun, False))
+        self._stations[stasiun] = state
+        return state
+
+    # Ganti pengaturan threshold tanpa membuang status dan jendela laju yang sedang berjalan
+    def update_settings(self, settings):
+        self.settings = dict(settings)
+        for stasiun, state in self._stations.items():
+            threshold, rise_rate = self.settings.get(stasiun, (None, None))
+            state.threshold = self.default_threshold if threshold is None else threshold
+            state.rise_rate = self.default_rise_rate if rise_rate is None else rise_rate
+
+    # Evaluasi satu bacaan; t = detik (epoch) untuk menghitung laju, waktu = waktu bacaan yang disimpan.
+    # Mengembalikan daftar peringatan baru (biasanya kosong).
+    def process(self, stasiun, t, waktu, tma):
+        state = self._stations.get(stasiun) or self._state(stasiun)
+        # Bacaan yang datang terlambat (tidak urut waktu) tetap disimpan tetapi tidak mengubah status
+        if state.last_time is not None and t <= state.last_time:
+            return []
+        state.last_time = t
+        alerts = []
+
+        if state.flooding:
+            flooding = tma > state.threshold - self.hysteresis
+        else:
+            flooding = tma > state.threshold
+        if flooding != state.flooding:
+            state.flooding = flooding
+            alerts.append(Alert(stasiun, waktu, 'banjir' if flooding else 'surut', tma, tma, state.threshold))
+
+        window = state.window
+        window.append((t, tma))
+        while t - window[0][0] > self.rate_window:
+            window.popleft()
+        span = t - window[0][0]
+        if span >= self.min_rate_span:
+            rate = (tma - window[0][1]) / span * 3600
+            rising = rate >= state.rise_rate
+            if rising and not state.rising:
+                alerts.append(Alert(stasiun, waktu, 'naik_cepat', tma, rate, state.rise_rate))
+            state.rising = rising
+        return alerts
+
+
+def create_tables(conn):
+    for ddl in CREATE_TABLES:
+        conn.execute(ddl)
+
+
+def read_settings(conn):
+    return {stasiun: (threshold, laju_naik)
+            for stasiun, threshold, laju_naik in conn.execute("SELECT stasiun, threshold, laju_naik FROM ambang_stasiun")}
+
+
+def write_setting(conn, stasiun, threshold, laju_naik=None):
+    conn.execute('''INSERT INTO ambang_stasiun (stasiun, threshold, laju_naik) VALUES (?, ?, ?)
+                    ON CONFLICT (stasiun) DO UPDATE SET threshold=excluded.threshold, laju_naik=excluded.laju_naik''',
+                 (stasiun, threshold, laju_naik))
+
+
+# Status banjir terakhir per stasiun dari peringatan banjir/surut terbaru (untuk melanjutkan setelah restart)
+def read_flooding(conn):
+    rows = conn.execute('''SELECT p.stasiun, p.jenis FROM peringatan p
+                           JOIN (SELECT stasiun, MAX(id) AS id FROM peringatan
+                                 WHERE jenis IN ('banjir', 'surut') GROUP BY stasiun) t ON t.id = p.id''')
+    return {stasiun: jenis == 'banjir' for stasiun, jenis in rows}
+
+
+# Waktu peringatan disimpan sebagai teks 'YYYY-MM-DD HH:MM:SS' (sama dengan tma_telemetri)
+def write_alerts(conn, alerts):
+    conn.executemany(INSERT_ALERT, [alert._replace(waktu=str(alert.waktu)) for alert in alerts])
+
+
+def read_alerts(conn, stasiun=None, limit=50):
+    query = "SELECT stasiun, waktu, jenis, tma, nilai, batas, dibuat FROM peringatan"
+    params = []
+    if stasiun is not None:
+        query += " WHERE stasiun = ?"
+        params.append(stasiun)
+    query += " ORDER BY id DESC LIMIT ?"
+    return pd.read_sql(query, conn, params=params + [limit])
+
+
+def clear(conn, stasiun=None):
+    if stasiun is None:
+        conn.execute("DELETE FROM peringatan")
+    else:
+        conn.execute("DELETE FROM peringatan WHERE stasiun=?", (stasiun,))
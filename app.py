@@ -1,9 +1,9 @@
 # app.py - File utama dengan sistem login dan navigasi tanpa sidebar
 import streamlit as st
-import pandas as pd
-import os
-import sqlite3
-from datetime import datetime
+import auth
+import jobs
+import profiling
+from database import init_db
 
 # Konfigurasi halaman - sembunyikan sidebar secara permanen
 st.set_page_config(
@@ -24,46 +24,15 @@ hide_streamlit_style = """
 """
 st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
-# Inisialisasi database
-def init_db():
-    conn = sqlite3.connect('flood_prediction.db')
-    c = conn.cursor()
-    
-    # Buat tabel users jika belum ada
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (username TEXT PRIMARY KEY, password TEXT)''')
-    
-    # Buat tabel tma_data jika belum ada
-    c.execute('''CREATE TABLE IF NOT EXISTS tma_data
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  tanggal TEXT,
-                  jam_06 REAL,
-                  jam_12 REAL,
-                  jam_18 REAL,
-                  tma_min REAL,
-                  tma_max REAL,
-                  tma_rata REAL)''')
-    
-    # Tambahkan user default jika belum ada
-    c.execute("SELECT COUNT(*) FROM users")
-    if c.fetchone()[0] == 0:
-        c.execute("INSERT INTO users VALUES (?, ?)", ('123', '123'))
-        c.execute("INSERT INTO users VALUES (?, ?)", ('user', 'user123'))
-    
-    conn.commit()
-    conn.close()
-
-# Panggil fungsi inisialisasi database
+# Panggil fungsi inisialisasi database (DDL hanya sekali per proses)
 init_db()
+# Antrian upload: lanjutkan job yang terputus saat proses dimulai (sekali per proses), bukan menunggu upload baru
+jobs.start()
 
-# Fungsi autentikasi dari database
+# Fungsi autentikasi: hash password diverifikasi di thread skrip sesi pemanggil, dibatasi
+# auth._verify_slots (BoundedSemaphore, VERIFY_WORKERS slot); hasilnya token sesi atau None
 def authenticate(username, password):
-    conn = sqlite3.connect('flood_prediction.db')
-    c = conn.cursor()
-    c.execute("SELECT password FROM users WHERE username=?", (username,))
-    result = c.fetchone()
-    conn.close()
-    return result is not None and result[0] == password
+    return auth.login(username, password)
 
 # Halaman Login
 def show_login():
@@ -74,9 +43,9 @@ def show_login():
         password = st.text_input("Password", type="password")
         
         if st.form_submit_button("Login", type="primary"):
-            if authenticate(username, password):
-                st.session_state.logged_in = True
-                st.session_state.username = username
+            token = authenticate(username, password)
+            if token is not None:
+                st.session_state.token = token
                 st.session_state.current_page = "Dashboard"
                 st.rerun()
             else:
@@ -86,8 +55,10 @@ def show_login():
 def show_navigation():
     # Tab navigasi
     tabs = st.container()
+    is_admin = st.session_state.get('role') == 'admin'
     with tabs:
-        col1, col2, col3, col4 = st.columns(4)
+        columns = st.columns(6 if is_admin else 5)
+        col1, col2, col3, col4, col5 = columns[:5]
         
         if col1.button("🏠 Dashboard"):
             st.session_state.current_page = "Dashboard"
@@ -101,7 +72,15 @@ def show_navigation():
             st.session_state.current_page = "Prediksi"
             st.rerun()
             
-        if col4.button("🚪 Logout"):
+        if col4.button("📄 Laporan"):
+            st.session_state.current_page = "Laporan"
+            st.rerun()
+            
+        if is_admin and columns[5].button("🩺 Diagnostik"):
+            st.session_state.current_page = "Diagnostik"
+            st.rerun()
+            
+        if col5.button("🚪 Logout"):
             st.session_state.clear()
             st.rerun()
     
@@ -113,21 +92,36 @@ def show_navigation():
 
 # Main App Logic
 def show():
-    if not st.session_state.get('logged_in'):
+    # Pengukuran waktu per sesi (aktif hanya jika dinyalakan dari halaman Diagnostik)
+    if 'profiling' not in st.session_state:
+        st.session_state.profiling = profiling.Recorder()
+    profiling.use_session(st.session_state.profiling)
+
+    # Sesi dikenali dari token bertanda tangan, tanpa membuka database pada setiap rerun
+    user = auth.session_user(st.session_state.get('token'))
+    if user is None:
         show_login()
     else:
+        st.session_state.username, st.session_state.role = user
         show_navigation()
         
         # Load halaman berdasarkan pilihan
-        if st.session_state.current_page == "Dashboard":
-            from beranda import show
-            show()
-        elif st.session_state.current_page == "Data TMA":
-            from data_tma import show
-            show()
-        elif st.session_state.current_page == "Prediksi":
-            from prediksi import show
-            show()
+        with profiling.timed(f"page.{st.session_state.current_page}"):
+            if st.session_state.current_page == "Dashboard":
+                from beranda import show
+                show()
+            elif st.session_state.current_page == "Data TMA":
+                from data_tma import show
+                show()
+            elif st.session_state.current_page == "Prediksi":
+                from prediksi import show
+                show()
+            elif st.session_state.current_page == "Laporan":
+                from laporan import show
+                show()
+            elif st.session_state.current_page == "Diagnostik" and st.session_state.get('role') == 'admin':
+                from diagnostik import show
+                show()
 
 if __name__ == "__main__":
     show()
\ No newline at end of file
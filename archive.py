@@ -0,0 +1,107 @@
+# archive.py - Arsip kolumnar TMA per stasiun per tahun (file .npy yang dibaca memory-mapped)
+#
+# Tahun yang sudah lewat dibekukan ke <direktori arsip>/<stasiun>/<tahun>/: tanggal.npy (int64 hari sejak
+# 1970-01-01) dan satu file float32 per kolom bacaan. SQLite tetap menjadi sumber data utama; partisi
+# arsip hanya salinan baca cepat dan dihapus begitu ada penulisan ke tahun tersebut.
+#
+#   python archive.py            # bekukan semua tahun yang sudah lewat untuk semua stasiun
+#   python archive.py --drop     # hapus seluruh arsip
+import os
+import shutil
+import sys
+from datetime import date
+from urllib.parse import quote, unquote
+import numpy as np
+
+# Direktori arsip; default di samping file database (database.DB_PATH + ARCHIVE_SUFFIX) sehingga setiap
+# database punya arsip sendiri. TMA_ARCHIVE_DIR menggantinya dengan path tetap.
+ARCHIVE_DIR = os.environ.get('TMA_ARCHIVE_DIR') or None
+ARCHIVE_SUFFIX = '.arsip'
+READING_COLUMNS = ['jam_06', 'jam_12', 'jam_18', 'tma_min', 'tma_max', 'tma_rata']
+
+
+# Ditentukan pada setiap pemanggilan agar ikut berpindah jika database.DB_PATH diganti (--db, benchmark)
+def archive_dir():
+    if ARCHIVE_DIR:
+        return os.path.abspath(ARCHIVE_DIR)
+    import database
+    return database.DB_PATH + ARCHIVE_SUFFIX
+
+
+def _station_dir(stasiun):
+    return os.path.join(archive_dir(), quote(stasiun, safe=''))
+
+
+def _year_dir(stasiun, year):
+    return os.path.join(_station_dir(stasiun), str(int(year)))
+
+
+def stations():
+    path = archive_dir()
+    if not os.path.isdir(path):
+        return []
+    return sorted(unquote(name) for name in os.listdir(path))
+
+
+# Tahun yang sudah dibekukan (hanya direktori lengkap; direktori .tmp diabaikan)
+def frozen_years(stasiun):
+    path = _station_dir(stasiun)
+    if not os.path.isdir(path):
+        return []
+    return sorted(int(name) for name in os.listdir(path) if name.isdigit())
+
+
+# Tulis satu partisi tahun secara atomik: tulis ke direktori sementara lalu rename
+def write_year(stasiun, year, tanggal, readings):
+    target = _year_dir(stasiun, year)
+    tmp = target + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, 'tanggal.npy'), np.asarray(tanggal, dtype='datetime64[D]').astype(np.int64))
+    for name in READING_COLUMNS:
+        np.save(os.path.join(tmp, f'{name}.npy'), np.asarray(readings[name], dtype=np.float32))
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+
+# Baca satu partisi tanpa salinan: array memory-mapped read-only
+def read_year(stasiun, year):
+    path = _year_dir(stasiun, year)
+    tanggal = np.load(os.path.join(path, 'tanggal.npy'), mmap_mode='r').view('datetime64[D]')
+    readings = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in READING_COLUMNS}
+    return tanggal, readings
+
+
+def drop_years(stasiun, years):
+    for year in years:
+        shutil.rmtree(_year_dir(stasiun, year), ignore_errors=True)
+
+
+def drop(stasiun=None):
+    shutil.rmtree(archive_dir() if stasiun is None else _station_dir(stasiun), ignore_errors=True)
+
+
+# Bekukan tahun-tahun sebelum `before_year` (default: tahun berjalan) yang belum diarsipkan.
+# rows_for_year(stasiun, year) mengembalikan (tanggal, readings) dari SQLite.
+def freeze(station_years, rows_for_year, before_year=None):
+    before_year = before_year or date.today().year
+    frozen = []
+    for stasiun, years in station_years.items():
+        done = set(frozen_years(stasiun))
+        for year in years:
+            if year < before_year and year not in done:
+                tanggal, readings = rows_for_year(stasiun, year)
+                if len(tanggal):
+                    write_year(stasiun, year, tanggal, readings)
+                    frozen.append((stasiun, year))
+    return frozen
+
+
+if __name__ == "__main__":
+    import database
+
+    if '--drop' in sys.argv[1:]:
+        drop()
+    else:
+        for stasiun, year in database.freeze_archive():
+            print(f"{stasiun}: {year}")
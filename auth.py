@@ -0,0 +1,189 @@
+# auth.py - Hash password (scrypt bersalt) dan token sesi bertanda tangan
+#
+# Password disimpan sebagai "scrypt$n$r$p$salt$hash" (base64). scrypt sengaja lambat dan memakai
+# SCRYPT_N * r * 128 byte memori, jadi paling banyak VERIFY_WORKERS verifikasi berjalan bersamaan;
+# login lain menunggu giliran. Login tetap memblokir thread skrip sesi yang meminta (hanya sesi itu),
+# semaphore hanya membatasi beban CPU dan memori saat banyak login datang bersamaan.
+# Setelah login, sesi hanya menyimpan token HMAC (username, peran, kedaluwarsa); rerun dan pindah
+# halaman cukup memeriksa tanda tangan token tanpa membuka database.
+#
+#   python auth.py --tune                 # ukur biaya scrypt dan sarankan TMA_SCRYPT_N
+#   python auth.py --set-password user    # ganti password (diminta lewat prompt)
+import argparse
+import base64
+import getpass
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+import database
+import profiling
+
+# Biaya scrypt: n = faktor CPU/memori (pangkat 2), r = ukuran blok, p = paralelisme.
+# n = 2**14 (16 MiB) sekitar 60 ms per verifikasi pada satu core server; sesuaikan dengan --tune.
+SCRYPT_N = int(os.environ.get('TMA_SCRYPT_N') or 2 ** 14)
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+# Target waktu satu verifikasi untuk --tune (detik)
+TARGET_SECONDS = 0.1
+# Verifikasi login yang berjalan bersamaan
+VERIFY_WORKERS = 2
+# Masa berlaku token sesi (detik)
+TOKEN_TTL = 12 * 3600
+# Kunci tanda tangan token; tanpa TMA_SESSION_SECRET kunci dibuat acak per proses
+# (token hanya disimpan di session_state yang juga hilang saat proses restart)
+SESSION_SECRET = (os.environ.get('TMA_SESSION_SECRET') or '').encode('utf-8') or secrets.token_bytes(32)
+
+_verify_slots = threading.BoundedSemaphore(VERIFY_WORKERS)
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * n * r * p, dklen=HASH_BYTES)
+
+
+def hash_password(password, n=None):
+    n = n or SCRYPT_N
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(_scrypt(password, salt, n, SCRYPT_R, SCRYPT_P))}"
+
+
+def is_hashed(stored):
+    return stored is not None and stored.startswith('scrypt$')
+
+
+def verify_password(password, stored):
+    if not is_hashed(stored):
+        return False
+    try:
+        _, n, r, p, salt, expected = stored.split('$')
+        actual = _scrypt(password, _unb64(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, _unb64(expected))
+
+
+# Hash lama dengan biaya berbeda diperbarui saat login berhasil
+def needs_rehash(stored):
+    return stored.split('$')[1:4] != [str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+
+
+# Hash pembanding untuk username yang tidak ada, agar waktu respons sama dengan password salah
+_DUMMY_HASH = None
+
+
+def _dummy_hash():
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password(secrets.token_hex(8))
+    return _DUMMY_HASH
+
+
+# Verifikasi username/password; mengembalikan token sesi atau None.
+# Waktu terukur termasuk menunggu giliran saat banyak login bersamaan.
+@profiling.timed('auth.login')
+def login(username, password):
+    stored, role = database.get_credentials(username)
+    with _verify_slots:
+        if stored is None:
+            verify_password(password, _dummy_hash())
+            return None
+        if not verify_password(password, stored):
+            return None
+        rehashed = hash_password(password) if needs_rehash(stored) else None
+    if rehashed is not None:
+        database.set_password_hash(username, rehashed)
+    return issue_token(username, role)
+
+
+def _sign(payload):
+    return _b64(hmac.new(SESSION_SECRET, payload.encode('utf-8'), hashlib.sha256).digest())
+
+
+def issue_token(username, role, ttl=TOKEN_TTL):
+    payload = _b64(f"{username}\n{role}\n{int(time.time() + ttl)}".encode('utf-8'))
+    return f"{payload}.{_sign(payload)}"
+
+
+# (username, role) dari token yang sah dan belum kedaluwarsa, selain itu None
+def session_user(token):
+    if not token or '.' not in token:
+        return None
+    payload, signature = token.rsplit('.', 1)
+    if not hmac.compare_digest(signature.encode('utf-8'), _sign(payload).encode('utf-8')):
+        return None
+    try:
+        username, role, expires = _unb64(payload).decode('utf-8').split('\n')
+        expires = int(expires)
+    except ValueError:
+        return None
+    if expires < time.time():
+        return None
+    return username, role
+
+
+# Waktu satu verifikasi (median) untuk beberapa nilai n
+def measure_cost(ns, repeat=5):
+    results = []
+    for n in ns:
+        stored = hash_password('pengukuran', n)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            verify_password('pengukuran', stored)
+            times.append(time.perf_counter() - start)
+        results.append((n, sorted(times)[len(times) // 2]))
+    return results
+
+
+# n terbesar yang satu verifikasinya masih di bawah target
+def tune_cost(target=TARGET_SECONDS, ns=tuple(2 ** k for k in range(12, 19))):
+    results = measure_cost(ns)
+    fitting = [n for n, seconds in results if seconds <= target]
+    return (fitting[-1] if fitting else ns[0]), results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pengaturan password pengguna")
+    parser.add_argument('--tune', action='store_true', help="Ukur biaya scrypt dan sarankan nilai n")
+    parser.add_argument('--target', type=float, default=TARGET_SECONDS,
+                        help="Target waktu satu verifikasi untuk --tune (default: %(default)s detik)")
+    parser.add_argument('--set-password', metavar='USERNAME', help="Ganti password pengguna")
+    parser.add_argument('--db', default=database.DB_PATH, help="File database SQLite (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.tune:
+        n, results = tune_cost(args.target)
+        for cost, seconds in results:
+            print(f"n={cost:>7}  {seconds * 1000:8.1f} ms  {128 * cost * SCRYPT_R / 2 ** 20:6.0f} MiB")
+        print(f"Saran: TMA_SCRYPT_N={n} (target {args.target * 1000:.0f} ms, "
+              f"{VERIFY_WORKERS} verifikasi bersamaan)")
+        return
+
+    if args.set_password:
+        database.use_database(args.db)
+        if database.get_credentials(args.set_password)[0] is None:
+            parser.error(f"Pengguna tidak ditemukan: {args.set_password}")
+        password = getpass.getpass("Password baru: ")
+        if password != getpass.getpass("Ulangi password: "):
+            parser.error("Password tidak sama")
+        database.set_password_hash(args.set_password, hash_password(password))
+        return
+
+    parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# backtest.py - Backtest walk-forward Moving Average untuk semua periode sekaligus
+import numpy as np
+import pandas as pd
+import profiling
+
+
+# Prediksi satu langkah ke depan untuk setiap window 1..max_window.
+# counts: jumlah banjir per tahun, bentuk (tahun,) atau (tahun, threshold).
+# Hasil: array (window, tahun, threshold); prediksi[w-1, y] = rata-rata counts[y-w:y], NaN jika y < w.
+def moving_average_predictions(counts, max_window):
+    counts = np.asarray(counts, dtype=np.float64)
+    if counts.ndim == 1:
+        counts = counts[:, None]
+    n_years = counts.shape[0]
+    cumsum = np.vstack([np.zeros((1, counts.shape[1])), np.cumsum(counts, axis=0)])
+
+    windows = np.arange(1, max_window + 1)[:, None]
+    years = np.arange(n_years)[None, :]
+    start = years - windows
+    valid = start >= 0
+    predictions = (cumsum[years] - cumsum[np.where(valid, start, 0)]) / windows[:, :, None]
+    predictions[~valid] = np.nan
+    return predictions
+
+
+# MAE, MAPE dan RMSE per window (dan per threshold).
+# MAPE memakai aturan calculate_mape: tahun dengan aktual 0 diabaikan, inf jika semua aktual 0.
+# common_period=True mengevaluasi semua window pada tahun yang sama (mulai tahun ke-max_window)
+# agar perbandingan antar window adil.
+def evaluate_windows(counts, max_window, common_period=True):
+    counts = np.asarray(counts, dtype=np.float64)
+    squeeze = counts.ndim == 1
+    if squeeze:
+        counts = counts[:, None]
+    predictions = moving_average_predictions(counts, max_window)
+
+    actual = np.broadcast_to(counts[None, :, :], predictions.shape)
+    valid = ~np.isnan(predictions)
+    if common_period:
+        valid &= (np.arange(counts.shape[0]) >= max_window)[None, :, None]
+
+    error = np.where(valid, actual - predictions, 0.0)
+    n = valid.sum(axis=1)
+    nonzero = valid & (actual != 0)
+    n_nonzero = nonzero.sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mae = np.abs(error).sum(axis=1) / n
+        rmse = np.sqrt((error ** 2).sum(axis=1) / n)
+        pct = np.where(nonzero, np.abs(error) / np.where(nonzero, actual, 1.0), 0.0)
+        mape = np.where(n_nonzero > 0, pct.sum(axis=1) / n_nonzero * 100, np.inf)
+
+    if squeeze:
+        return mae[:, 0], mape[:, 0], rmse[:, 0], n[:, 0]
+    return mae, mape, rmse, n
+
+
+# Tabel perbandingan window terurut dari MAPE terkecil
+@profiling.timed('backtest.ranking_table')
+def ranking_table(yearly_floods, max_window=None, common_period=True):
+    counts = yearly_floods['banjir'].to_numpy(dtype=np.float64)
+    if max_window is None:
+        max_window = len(counts) - 1
+    max_window = min(max_window, len(counts) - 1)
+    if max_window < 1:
+        return pd.DataFrame(columns=['window', 'mae', 'mape', 'rmse', 'jumlah_tahun', 'peringkat'])
+
+    mae, mape, rmse, n = evaluate_windows(counts, max_window, common_period)
+    table = pd.DataFrame({
+        'window': np.arange(1, max_window + 1),
+        'mae': mae,
+        'mape': mape,
+        'rmse': rmse,
+        'jumlah_tahun': n,
+    })
+    table = table.sort_values(['mape', 'mae'], kind='stable').reset_index(drop=True)
+    table['peringkat'] = np.arange(1, len(table) + 1)
+    return table
+
+
+# Matriks metrik window x threshold dalam format panjang (untuk banyak threshold sekaligus)
+def window_threshold_matrix(counts, thresholds, max_window, common_period=True):
+    mae, mape, rmse, n = evaluate_windows(counts, max_window, common_period)
+    windows, thr = np.meshgrid(np.arange(1, max_window + 1), np.asarray(thresholds, dtype=np.float64), indexing='ij')
+    return pd.DataFrame({
+        'window': windows.ravel(),
+        'threshold': thr.ravel(),
+        'mae': mae.ravel(),
+        'mape': mape.ravel(),
+        'rmse': rmse.ravel(),
+        'jumlah_tahun': n.ravel(),
+    })
@@ -0,0 +1,373 @@
+# benchmark.py - Benchmark kinerja tanpa browser pada data TMA sintetis (1x, 10x, 100x data saat ini)
+#
+# Contoh:
+#   python benchmark.py                                   # semua benchmark, skala 1 10 100
+#   python benchmark.py --scales 1 10 --repeat 5 --output hasil.json
+#   python benchmark.py --only ingest_csv forecast --compare hasil_lama.json
+#   python benchmark.py --only startup --scales 1         # cek anggaran waktu start aplikasi
+#
+# Anggaran start: impor modul yang dimuat app.py sampai halaman login tampil (di luar streamlit yang
+# sudah dimuat server) ditambah init_db() harus selesai dalam STARTUP_BUDGET detik, dan modul di
+# LAZY_MODULES tidak boleh ikut termuat. Rincian per modul: python -X importtime -c "import data_access"
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import aggregates
+import archive
+import auth
+import backtest
+import charts
+import database
+import forecasting
+import ingestion
+import models
+import quality
+import snapshot
+import synthetic
+import thresholds
+
+# Skala relatif terhadap data saat ini (1 stasiun, 6 tahun harian): (jumlah stasiun, jumlah tahun)
+SCALES = {1: (1, 6), 10: (5, 12), 100: (20, 30)}
+# Median baru / median lama di atas batas ini ditandai sebagai regresi pada --compare
+REGRESSION_RATIO = 1.2
+# Batas waktu start aplikasi (detik, median) dan modul berat yang baru boleh dimuat saat dibutuhkan
+STARTUP_BUDGET = 0.75
+LAZY_MODULES = ['matplotlib', 'sklearn']
+# Jumlah login bersamaan pada benchmark login_burst
+LOGIN_BURST = 10
+# Jumlah proses worker pada benchmark snapshot_load_<n> (permintaan total sama, lihat snapshot.load_test)
+LOAD_WORKERS = [1, 2, 4]
+# Dijalankan di proses Python baru: argv[1] = path database, argv[2:] = LAZY_MODULES
+STARTUP_SCRIPT = '''
+import sys
+import time
+import streamlit
+start = time.perf_counter()
+import auth, database, data_access, jobs, profiling
+database.DB_PATH = sys.argv[1]
+database.init_db()
+database.init_db()
+print(time.perf_counter() - start)
+print(' '.join(name for name in sys.argv[2:] if name in sys.modules))
+'''
+
+BENCHMARKS = OrderedDict()
+
+
+# Daftarkan benchmark; setup dijalankan sebelum setiap pengulangan dan tidak ikut diukur.
+# Jika fungsi benchmark mengembalikan angka, angka itu dipakai sebagai waktu terukur (detik).
+def benchmark(name, setup=None):
+    def register(fn):
+        BENCHMARKS[name] = (fn, setup)
+        return fn
+    return register
+
+
+def _upload(content, name):
+    buffer = io.BytesIO(content)
+    buffer.name = name
+    return buffer
+
+
+def _reset(ctx):
+    database.reset_tma()
+
+
+def _drop_archive(ctx):
+    archive.drop()
+
+
+def _freeze_archive(ctx):
+    database.freeze_archive(before_year=9999)
+
+
+def _clear_charts(ctx):
+    charts.clear_cache()
+
+
+# Waktu start di proses baru; skema sudah terkini sehingga init_db() tidak menjalankan DDL
+@benchmark('startup')
+def bench_startup(ctx):
+    result = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, database.DB_PATH] + LAZY_MODULES,
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    elapsed, loaded = (result.stdout.splitlines() + [''])[:2]
+    if loaded:
+        raise ValueError(f"Modul berat ikut dimuat saat start: {loaded}")
+    return float(elapsed)
+
+
+# Waktu sampai LOGIN_BURST login yang datang bersamaan selesai diverifikasi (biaya scrypt saat ini)
+@benchmark('login_burst')
+def bench_login_burst(ctx):
+    with ThreadPoolExecutor(max_workers=LOGIN_BURST) as pool:
+        tokens = list(pool.map(lambda _: auth.login('123', '123'), range(LOGIN_BURST)))
+    if None in tokens:
+        raise ValueError("Login gagal pada benchmark")
+
+
+@benchmark('ingest_excel', setup=_reset)
+def bench_ingest_excel(ctx):
+    ingestion.ingest_file(_upload(ctx['xlsx'], 'data.xlsx'))
+
+
+@benchmark('ingest_csv', setup=_reset)
+def bench_ingest_csv(ctx):
+    ingestion.ingest_file(_upload(ctx['csv'], 'data.csv'))
+
+
+@benchmark('db_load_sqlite', setup=_drop_archive)
+def bench_db_load_sqlite(ctx):
+    for stasiun in ctx['stations']:
+        database.load_series(stasiun)
+
+
+@benchmark('db_load_archive', setup=_freeze_archive)
+def bench_db_load_archive(ctx):
+    for stasiun in ctx['stations']:
+        database.load_series(stasiun)
+
+
+@benchmark('db_load_year', setup=_freeze_archive)
+def bench_db_load_year(ctx):
+    for stasiun in ctx['stations']:
+        database.load_series(stasiun, [ctx['years'][len(ctx['years']) // 2]])
+
+
+@benchmark('db_page', setup=_drop_archive)
+def bench_db_page(ctx):
+    start, end = f"{ctx['years'][0]}-01-01", f"{ctx['years'][-1] + 1}-01-01"
+    for stasiun in ctx['stations']:
+        database.count_tma(stasiun, start, end, forecasting.DEFAULT_THRESHOLD)
+        database.load_tma_page(stasiun, start, end, sort='tma_max', descending=True, limit=100, offset=100)
+
+
+@benchmark('aggregate_rebuild')
+def bench_aggregate_rebuild(ctx):
+    with database.transaction() as conn:
+        aggregates.rebuild(conn)
+
+
+@benchmark('aggregate_read')
+def bench_aggregate_read(ctx):
+    conn = database.get_connection()
+    try:
+        for stasiun in ctx['stations']:
+            for tahun in ctx['years']:
+                database.load_monthly_stats(tahun, forecasting.DEFAULT_THRESHOLD, stasiun, conn=conn)
+            database.load_yearly_floods(forecasting.DEFAULT_THRESHOLD, stasiun, conn=conn)
+    finally:
+        conn.close()
+
+
+@benchmark('threshold_sweep')
+def bench_threshold_sweep(ctx):
+    for series in ctx['series'].values():
+        sweep = thresholds.ThresholdSweep.by_year(series['tanggal'], series['tma_max'])
+        thresholds.sensitivity_table(sweep, 3)
+        thresholds.ThresholdSweep.by_month(series['tanggal'], series['tma_max']).sweep()
+
+
+@benchmark('quality')
+def bench_quality(ctx):
+    for series in ctx['series'].values():
+        quality.check_series(series)
+
+
+@benchmark('forecast')
+def bench_forecast(ctx):
+    all_yearly = database.load_all_yearly_floods(forecasting.DEFAULT_THRESHOLD)
+    all_monthly = database.load_all_monthly_floods(forecasting.DEFAULT_THRESHOLD)
+    for name in models.MODELS:
+        forecasting.station_ranking(all_yearly, name, 3, all_monthly)
+
+
+@benchmark('backtest')
+def bench_backtest(ctx):
+    for stasiun in ctx['stations']:
+        backtest.ranking_table(database.load_yearly_floods(forecasting.DEFAULT_THRESHOLD, stasiun))
+
+
+@benchmark('chart_render', setup=_clear_charts)
+def bench_chart_render(ctx):
+    stasiun = ctx['stations'][0]
+    series = ctx['series'][stasiun]
+    tahun = ctx['years'][-1]
+    year_series = series.year(tahun)
+    charts.render('bulanan', (stasiun, tahun), year_series, tahun)
+    monthly_stats = database.load_monthly_stats(tahun, forecasting.DEFAULT_THRESHOLD, stasiun)
+    charts.render('tahunan', (stasiun, tahun), monthly_stats, year_series, forecasting.DEFAULT_THRESHOLD)
+    yearly_floods = database.load_yearly_floods(forecasting.DEFAULT_THRESHOLD, stasiun)
+    table = forecasting.moving_average_table(yearly_floods, 3)
+    eval_data, _, _ = forecasting.evaluate(table)
+    charts.render('prediksi', (stasiun,), table, eval_data, '3-MA')
+
+
+@benchmark('snapshot_publish')
+def bench_snapshot_publish(ctx):
+    snapshot.publish(force=True)
+
+
+def _publish_snapshot(ctx):
+    snapshot.publish()
+
+
+# Throughput mode multi-worker: waktu sampai snapshot.LOAD_REQUESTS permintaan selesai dibagi ke n proses
+def _snapshot_load(workers):
+    def run(ctx):
+        elapsed, memory = snapshot.load_test(workers)
+        if memory is not None:
+            print(f"      snapshot_load_{workers}: memori privat per worker +{memory:.1f} MB", file=sys.stderr)
+        return elapsed
+    return run
+
+
+for _workers in LOAD_WORKERS:
+    benchmark(f'snapshot_load_{_workers}', setup=_publish_snapshot)(_snapshot_load(_workers))
+
+
+# Data sintetis dan file upload untuk satu skala; file Excel hanya dibuat jika dibutuhkan
+def prepare(scale, seed, names):
+    stations, years = SCALES[scale]
+    data = synthetic.generate(stations, years, seed=seed)
+    upload = synthetic.to_upload_frame(data, decimal_comma=True)
+    ctx = {
+        'rows': len(data),
+        'stations': sorted(data['stasiun'].unique().tolist()),
+        'years': sorted(data['tanggal'].dt.year.unique().tolist()),
+        'csv': upload.to_csv(index=False).encode('utf-8'),
+    }
+    if 'ingest_excel' in names:
+        buffer = io.BytesIO()
+        upload.to_excel(buffer, index=False)
+        ctx['xlsx'] = buffer.getvalue()
+    return ctx
+
+
+def run_scale(scale, names, repeat, seed, workdir):
+    database.DB_PATH = os.path.join(workdir, 'benchmark.db')
+    snapshot.SNAPSHOT_DIR = os.path.join(workdir, 'snapshot')
+    database.init_db()
+
+    ctx = prepare(scale, seed, names)
+    # Data awal agar benchmark baca tidak bergantung pada urutan benchmark ingestion
+    ingestion.ingest_file(_upload(ctx['csv'], 'data.csv'))
+    ctx['series'] = {stasiun: database.load_series(stasiun) for stasiun in ctx['stations']}
+
+    results = []
+    for name in names:
+        fn, setup = BENCHMARKS[name]
+        times = []
+        for _ in range(repeat):
+            if setup is not None:
+                setup(ctx)
+            start = time.perf_counter()
+            measured = fn(ctx)
+            times.append(measured if measured is not None else time.perf_counter() - start)
+        results.append({
+            'benchmark': name,
+            'scale': scale,
+            'stations': len(ctx['stations']),
+            'years': len(ctx['years']),
+            'rows': ctx['rows'],
+            'repeat': repeat,
+            'min': min(times),
+            'median': float(np.median(times)),
+            'times': times,
+        })
+        print(f"{scale:>4}x  {name:<20} median {results[-1]['median']:9.4f} s  min {results[-1]['min']:9.4f} s",
+              file=sys.stderr)
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+    }
+
+
+# Bandingkan median dengan hasil sebelumnya per (benchmark, skala)
+def compare(results, previous):
+    old = {(r['benchmark'], r['scale']): r['median'] for r in previous['results']}
+    rows = []
+    for r in results:
+        before = old.get((r['benchmark'], r['scale']))
+        ratio = r['median'] / before if before else None
+        rows.append({
+            'benchmark': r['benchmark'],
+            'scale': r['scale'],
+            'sebelum': before,
+            'sesudah': r['median'],
+            'rasio': ratio,
+            'regresi': ratio is not None and ratio > REGRESSION_RATIO,
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark kinerja aplikasi prediksi TMA pada data sintetis")
+    parser.add_argument('--scales', nargs='+', type=int, default=list(SCALES), choices=list(SCALES),
+                        help="Skala data relatif terhadap data saat ini (default: %(default)s)")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Jalankan benchmark tertentu saja")
+    parser.add_argument('--repeat', type=int, default=3, help="Jumlah pengulangan (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed generator data (default: %(default)s)")
+    parser.add_argument('--output', '-o', help="File hasil JSON (default: ke stdout)")
+    parser.add_argument('--compare', help="File hasil JSON sebelumnya untuk mendeteksi regresi")
+    args = parser.parse_args(argv)
+
+    names = args.only or list(BENCHMARKS)
+    results = []
+    for scale in args.scales:
+        workdir = tempfile.mkdtemp(prefix=f'benchmark_{scale}x_')
+        try:
+            results.extend(run_scale(scale, names, args.repeat, args.seed, workdir))
+        finally:
+            database.close_connections()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {'meta': metadata(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    over_budget = [r for r in results if r['benchmark'] == 'startup' and r['median'] > STARTUP_BUDGET]
+    for r in over_budget:
+        print(f"Start aplikasi {r['median']:.3f} s melebihi anggaran {STARTUP_BUDGET} s", file=sys.stderr)
+
+    regression = False
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare(results, json.load(f))
+        print(comparison.to_string(index=False), file=sys.stderr)
+        regression = comparison['regresi'].any()
+    if over_budget or regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# charts.py - Pembuatan grafik TMA dengan cache PNG (LRU) yang dipakai bersama antar sesi
+import io
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import profiling
+from series import MONTH_NAMES
+
+CACHE_SIZE = 128
+# Sama dengan pengaturan st.pyplot
+SAVEFIG_KWARGS = {'format': 'png', 'dpi': 200, 'bbox_inches': 'tight'}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# Pecah data satu tahun (terurut) menjadi potongan per bulan dalam satu lintasan
+def split_by_month(year_series):
+    bulan = year_series['bulan']
+    months, starts = np.unique(bulan, return_index=True)
+    bounds = list(starts[1:])
+    return zip(months.tolist(), np.split(year_series['hari'], bounds), np.split(year_series['tma_rata'], bounds))
+
+
+def draw_daily(fig, month_series, month):
+    ax = fig.subplots()
+    ax.plot(month_series['hari'], month_series['tma_rata'], 'o-', color='blue')
+    ax.set_xlabel('Tanggal')
+    ax.set_ylabel('Tinggi Air (m)')
+    ax.set_title(f'Tinggi Muka Air Rata-rata Harian (Bulan {month})')
+    ax.grid(True)
+
+
+def draw_hourly(fig, month_series):
+    ax = fig.subplots()
+    for jam in ['jam_06', 'jam_12', 'jam_18']:
+        ax.plot(month_series['hari'], month_series[jam], 'o-', label=jam)
+    ax.set_xlabel('Tanggal')
+    ax.set_ylabel('Tinggi Air (m)')
+    ax.set_title('Tinggi Air Per Jam')
+    ax.legend()
+    ax.grid(True)
+
+
+def draw_comparison(fig, month_series):
+    ax = fig.subplots()
+    ax.plot(month_series['hari'], month_series['tma_min'], 's-', label='Minimum')
+    ax.plot(month_series['hari'], month_series['tma_max'], '^-', label='Maksimum')
+    ax.plot(month_series['hari'], month_series['tma_rata'], 'o-', label='Rata-rata')
+    ax.set_xlabel('Tanggal')
+    ax.set_ylabel('Tinggi Air (m)')
+    ax.set_title('Perbandingan Tinggi Air Harian')
+    ax.legend()
+    ax.grid(True)
+
+
+def _plot_months(ax, year_series):
+    for bulan, hari, tma_rata in split_by_month(year_series):
+        ax.plot(hari, tma_rata, label=MONTH_NAMES[bulan - 1], marker='o')
+
+
+def draw_monthly_comparison(fig, year_series, year):
+    ax = fig.subplots()
+    _plot_months(ax, year_series)
+    ax.set_title(f'Perbandingan Bulanan Tinggi Air Rata-rata ({year})')
+    ax.set_ylabel('Tinggi Air (m)')
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+
+
+def draw_annual(fig, monthly_stats, year_series, threshold):
+    ax6, ax7 = fig.subplots(1, 2)
+
+    # Grafik batang hari banjir
+    ax6.bar(monthly_stats['nama_bulan'], monthly_stats['hari_banjir'], color='salmon')
+    ax6.set_title(f'Hari dengan Banjir per Bulan (Threshold: {threshold}m)')
+    ax6.set_ylabel('Jumlah Hari')
+    ax6.tick_params(axis='x', rotation=45)
+    ax6.grid(axis='y')
+
+    # Grafik perkembangan TMA
+    _plot_months(ax7, year_series)
+    ax7.set_title('Perkembangan Tinggi Air Rata-rata')
+    ax7.set_xlabel('Hari dalam Bulan')
+    ax7.set_ylabel('Tinggi Air (m)')
+    ax7.legend()
+    ax7.grid(True)
+    fig.tight_layout()
+
+
+def draw_forecast(fig, validation_data, eval_data, label):
+    ax = fig.subplots()
+
+    # Plot data aktual
+    ax.plot(validation_data['tahun'], validation_data['banjir'], 'bo-', label='Aktual')
+
+    # Plot prediksi untuk tahun yang bisa diprediksi
+    ax.plot(eval_data['tahun'], eval_data['prediksi'], 'r--o', label=f'Prediksi ({label})')
+
+    # Plot prediksi tahun berikutnya jika ada
+    if len(validation_data) > len(eval_data):
+        next_year_data = validation_data.iloc[-1]
+        ax.plot(next_year_data['tahun'], next_year_data['prediksi'], 'gs--', label='Prediksi Tahun Depan')
+        ax.text(next_year_data['tahun'], next_year_data['prediksi'] - 2,
+                f"{next_year_data['prediksi']:.1f}*", ha='center', color='green')
+
+    # Anotasi nilai
+    eval_years = set(eval_data['tahun'].values)
+    for tahun, banjir, prediksi in zip(validation_data['tahun'], validation_data['banjir'], validation_data['prediksi']):
+        if not pd.isna(banjir):
+            ax.text(tahun, banjir + 2, f"{banjir:.0f}", ha='center')
+        if not pd.isna(prediksi) and tahun in eval_years:
+            ax.text(tahun, prediksi - 2, f"{prediksi:.1f}", ha='center', color='red')
+
+    ax.set_xlabel('Tahun')
+    ax.set_ylabel('Hari Banjir')
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.7)
+
+
+# Telemetri pada level piramida tertentu: pita min-maks dan garis rata-rata
+def draw_telemetry(fig, frame, level, threshold):
+    ax = fig.subplots()
+    if level != 'mentah':
+        ax.fill_between(frame['waktu'], frame['tma_min'], frame['tma_max'], color='lightblue', label='Min-Maks')
+    ax.plot(frame['waktu'], frame['tma_rata'], color='blue', label='Rata-rata' if level != 'mentah' else 'TMA')
+    ax.axhline(threshold, color='red', linestyle='--', label=f'Threshold {threshold}m')
+    ax.set_xlabel('Waktu')
+    ax.set_ylabel('Tinggi Air (m)')
+    ax.set_title(f'Telemetri TMA (level: {level})')
+    ax.legend()
+    ax.grid(True)
+    fig.autofmt_xdate()
+
+
+CHART_KINDS = {
+    'harian': (draw_daily, (10, 4)),
+    'per_jam': (draw_hourly, (10, 4)),
+    'perbandingan': (draw_comparison, (10, 4)),
+    'bulanan': (draw_monthly_comparison, (12, 6)),
+    'tahunan': (draw_annual, (16, 6)),
+    'prediksi': (draw_forecast, (10, 5)),
+    'telemetri': (draw_telemetry, (10, 4)),
+}
+
+
+# Gambar satu grafik menjadi PNG tanpa cache (juga dipakai di proses worker laporan)
+def draw_png(kind, *data, dpi=SAVEFIG_KWARGS['dpi']):
+    draw, figsize = CHART_KINDS[kind]
+    with profiling.timed(f'chart.{kind}'):
+        # matplotlib baru dimuat saat grafik pertama digambar, bukan saat aplikasi start
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=figsize)
+        draw(fig, *data)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, **dict(SAVEFIG_KWARGS, dpi=dpi))
+        return buffer.getvalue()
+
+
+# Ambil PNG dari cache; jika belum ada, gambar dengan data yang diberikan.
+# key harus memuat semua hal yang menentukan isi grafik, minimal versi data,
+# misalnya (versi, tahun, bulan, threshold).
+def render(kind, key, *data):
+    cache_key = (kind,) + tuple(key)
+    with _cache_lock:
+        png = _cache.get(cache_key)
+        if png is not None:
+            _cache.move_to_end(cache_key)
+            return png
+
+    png = draw_png(kind, *data)
+    with _cache_lock:
+        _cache[cache_key] = png
+        _cache.move_to_end(cache_key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return png
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+# Data untuk grafik bawaan Streamlit (st.line_chart / Vega-Lite), indeks = hari dalam bulan
+def native_frame(kind, data):
+    if kind == 'harian':
+        return pd.DataFrame({'tma_rata': data['tma_rata']}, index=pd.Index(data['hari'], name='hari'))
+    if kind == 'per_jam':
+        return pd.DataFrame({jam: data[jam] for jam in ['jam_06', 'jam_12', 'jam_18']},
+                            index=pd.Index(data['hari'], name='hari'))
+    if kind == 'perbandingan':
+        return pd.DataFrame({'Minimum': data['tma_min'], 'Maksimum': data['tma_max'], 'Rata-rata': data['tma_rata']},
+                            index=pd.Index(data['hari'], name='hari'))
+    if kind == 'bulanan':
+        columns = {MONTH_NAMES[bulan - 1]: pd.Series(tma_rata, index=hari)
+                   for bulan, hari, tma_rata in split_by_month(data)}
+        return pd.DataFrame(columns).rename_axis('hari')
+    if kind == 'telemetri':
+        return data.set_index('waktu')[['tma_min', 'tma_max', 'tma_rata']]
+    raise ValueError(f"Grafik '{kind}' tidak tersedia dalam mode interaktif")
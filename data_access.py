@@ -0,0 +1,275 @@
+# data_access.py - Akses data TMA yang di-cache dan dipakai bersama oleh semua sesi
+import threading
+import streamlit as st
+import charts
+import database
+import forecasting
+import profiling
+import quality
+import snapshot
+import thresholds
+
+# Koneksi dipinjam dari pool baca database; sesi-sesi membaca paralel tanpa menunggu upload
+def _with_connection(fn, *args, **kwargs):
+    with profiling.timed(f'db.{fn.__name__}'):
+        with database.connect() as conn:
+            return fn(*args, conn=conn, **kwargs)
+
+
+# Status job upload selalu dibaca langsung (berubah selama job berjalan)
+def load_jobs(ids=None, username=None):
+    return _with_connection(database.load_jobs, ids, username)
+
+
+def load_job_quality(ids):
+    return _with_connection(database.load_job_quality, ids)
+
+
+# Peringatan ditulis oleh alert_service.py (proses lain), selalu dibaca langsung
+def load_alerts(stasiun=None, limit=50):
+    return _with_connection(database.load_alerts, stasiun, limit)
+
+
+def get_data_version():
+    return _with_connection(database.get_data_version)
+
+
+# Loader di-cache berdasarkan versi data: penulisan menaikkan versi sehingga
+# entri lama tidak terpakai lagi dan tergusur oleh max_entries.
+# TMASeries bersifat read-only sehingga aman dibagi langsung (cache_resource, tanpa salinan per sesi).
+# source = versi data, atau nama snapshot (str) yang dibaca memory-mapped dan dibagi antar proses.
+# Stasiun yang tidak ada di snapshot (baru ditambahkan, atau versinya sudah dihapus) dibaca dari SQLite.
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _load_tma(source, stasiun):
+    if isinstance(source, str):
+        try:
+            return snapshot.load_series(source, stasiun)
+        except FileNotFoundError:
+            pass
+    return _with_connection(database.load_series, stasiun)
+
+
+# Satu tahun saja: hanya partisi arsip / rentang SQLite tahun tersebut yang dibaca
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _load_tma_year(source, stasiun, tahun):
+    if isinstance(source, str):
+        return _load_tma(source, stasiun).year(tahun)
+    return _with_connection(database.load_series, stasiun, [tahun])
+
+
+# Halaman tabel data: biaya sebanding dengan ukuran halaman, bukan seluruh arsip
+@st.cache_data(max_entries=64, show_spinner=False)
+def _count_tma(version, stasiun, start, end, threshold):
+    return _with_connection(database.count_tma, stasiun, start, end, threshold)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _load_tma_page(version, stasiun, start, end, columns, threshold, sort, descending, limit, offset):
+    return _with_connection(database.load_tma_page, stasiun, start, end, list(columns), threshold,
+                            sort, descending, limit, offset)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _date_range(version, stasiun):
+    return _with_connection(database.date_range, stasiun)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _load_monthly_stats(version, stasiun, tahun, threshold):
+    return _with_connection(database.load_monthly_stats, tahun, threshold, stasiun)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _load_yearly_stats(version, stasiun):
+    return _with_connection(database.load_yearly_stats, stasiun)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _load_yearly_floods(version, stasiun, threshold):
+    return _with_connection(database.load_yearly_floods, threshold, stasiun)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _load_monthly_floods(version, stasiun, threshold):
+    return _with_connection(database.load_monthly_floods, threshold, stasiun)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _list_stations(version):
+    return _with_connection(database.list_stations)
+
+
+# Data semua stasiun sekaligus untuk peringkat antar stasiun
+@st.cache_data(max_entries=8, show_spinner=False)
+def _load_all_yearly_floods(version, threshold):
+    return _with_connection(database.load_all_yearly_floods, threshold)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _load_all_monthly_floods(version, threshold):
+    return _with_connection(database.load_all_monthly_floods, threshold)
+
+
+# Data telemetri per level piramida; start/end berupa teks tanggal agar kunci cache stabil
+@st.cache_data(max_entries=32, show_spinner=False)
+def _load_telemetry(version, stasiun, level, start, end):
+    return _with_connection(database.load_telemetry, stasiun, level, start, end)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _telemetry_range(version, stasiun):
+    return _with_connection(database.telemetry_range, stasiun)
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _load_flood_sweep(source, stasiun, by):
+    if isinstance(source, str):
+        try:
+            return snapshot.load_sweep(source, stasiun, by)
+        except FileNotFoundError:
+            pass
+    series = _load_tma(source, stasiun)
+    if by == 'year':
+        return thresholds.ThresholdSweep.by_year(series['tanggal'], series['tma_max'])
+    return thresholds.ThresholdSweep.by_month(series['tanggal'], series['tma_max'])
+
+
+# Pemeriksaan kualitas seluruh deret satu stasiun (celah, pencilan, aturan per baris)
+@st.cache_data(max_entries=16, show_spinner=False)
+def _load_quality(source, stasiun, threshold):
+    return quality.check_series(_load_tma(source, stasiun), threshold)
+
+
+# Kunci cache deret TMA: nama snapshot terkini dalam mode multi-worker (snapshot.py), selain itu
+# versi data. Worker berpindah ke snapshot baru begitu loader mengganti CURRENT.
+def _series_source():
+    if snapshot.enabled():
+        name = snapshot.current()
+        if name is not None:
+            return name
+    return get_data_version()
+
+
+def load_tma(stasiun=database.DEFAULT_STATION):
+    return _load_tma(_series_source(), stasiun)
+
+
+def load_tma_year(tahun, stasiun=database.DEFAULT_STATION):
+    return _load_tma_year(_series_source(), stasiun, int(tahun))
+
+
+def count_tma(stasiun, start, end, threshold=None):
+    threshold = None if threshold is None else float(threshold)
+    return _count_tma(get_data_version(), stasiun, str(start), str(end), threshold)
+
+
+def load_tma_page(stasiun, start, end, columns, threshold=None, sort='tanggal', descending=False, limit=50, offset=0):
+    threshold = None if threshold is None else float(threshold)
+    return _load_tma_page(get_data_version(), stasiun, str(start), str(end), tuple(columns), threshold,
+                          sort, bool(descending), int(limit), int(offset))
+
+
+def date_range(stasiun=database.DEFAULT_STATION):
+    return _date_range(get_data_version(), stasiun)
+
+
+def load_monthly_stats(tahun, threshold, stasiun=database.DEFAULT_STATION):
+    return _load_monthly_stats(get_data_version(), stasiun, int(tahun), float(threshold))
+
+
+def load_yearly_stats(stasiun=database.DEFAULT_STATION):
+    return _load_yearly_stats(get_data_version(), stasiun)
+
+
+def load_yearly_floods(threshold, stasiun=database.DEFAULT_STATION):
+    return _load_yearly_floods(get_data_version(), stasiun, float(threshold))
+
+
+def load_monthly_floods(threshold, stasiun=database.DEFAULT_STATION):
+    return _load_monthly_floods(get_data_version(), stasiun, float(threshold))
+
+
+def load_flood_sweep(by='month', stasiun=database.DEFAULT_STATION):
+    return _load_flood_sweep(_series_source(), stasiun, by)
+
+
+def load_quality(threshold, stasiun=database.DEFAULT_STATION):
+    return _load_quality(_series_source(), stasiun, float(threshold))
+
+
+def list_stations():
+    return _list_stations(get_data_version())
+
+
+# State prediksi satu (stasiun, threshold, model, window) dengan lock sendiri: sesi yang memakai
+# kombinasi lain tidak ikut menunggu
+class _ForecastSlot:
+    def __init__(self, model_name, window):
+        self.lock = threading.Lock()
+        self.version = None
+        self.state = forecasting.ForecastState(model_name, window)
+
+
+# Dibatasi max_entries seperti loader lain, sehingga slider threshold tidak menumpuk state tanpa batas
+@st.cache_resource(max_entries=64, show_spinner=False)
+def _forecast_slot(stasiun, threshold, model_name, window):
+    return _ForecastSlot(model_name, window)
+
+
+# Hasil prediksi (tabel, baris evaluasi, MAE, MAPE) dipakai bersama semua sesi. Saat versi data
+# berubah, state hanya memproses tahun yang jumlah hari banjirnya berubah (lihat ForecastState);
+# state tidak ikut dikosongkan oleh invalidate() agar pembaruan tetap inkremental.
+# Data dibaca di luar lock; versi data hanya naik, jadi state tidak pernah dimundurkan ke versi lama.
+def load_forecast(model_name, window, threshold, stasiun=database.DEFAULT_STATION):
+    version = get_data_version()
+    slot = _forecast_slot(stasiun, float(threshold), model_name, int(window))
+    if slot.version is None or slot.version < version:
+        yearly_floods = load_yearly_floods(threshold, stasiun)
+        monthly_floods = load_monthly_floods(threshold, stasiun) if slot.state.model.needs_monthly else None
+        with slot.lock:
+            if slot.version is None or slot.version < version:
+                with profiling.timed('forecast.update'):
+                    slot.state.update(yearly_floods, monthly_floods)
+                slot.version = version
+    with slot.lock:
+        return slot.state.result()
+
+
+def load_all_yearly_floods(threshold):
+    return _load_all_yearly_floods(get_data_version(), float(threshold))
+
+
+def load_all_monthly_floods(threshold):
+    return _load_all_monthly_floods(get_data_version(), float(threshold))
+
+
+def load_telemetry(stasiun, level, start, end):
+    return _load_telemetry(get_data_version(), stasiun, level, str(start), str(end))
+
+
+def telemetry_range(stasiun=database.DEFAULT_STATION):
+    return _telemetry_range(get_data_version(), stasiun)
+
+
+# Kosongkan cache setelah upload/reset agar memori versi lama langsung dilepas.
+# Dalam mode multi-worker snapshot versi baru diterbitkan dulu jika loader belum melakukannya.
+def invalidate():
+    if snapshot.enabled():
+        snapshot.publish()
+    _load_tma.clear()
+    _load_tma_year.clear()
+    _date_range.clear()
+    _count_tma.clear()
+    _load_tma_page.clear()
+    _load_monthly_stats.clear()
+    _load_yearly_stats.clear()
+    _load_yearly_floods.clear()
+    _load_monthly_floods.clear()
+    _load_flood_sweep.clear()
+    _load_quality.clear()
+    _list_stations.clear()
+    _load_all_yearly_floods.clear()
+    _load_all_monthly_floods.clear()
+    _load_telemetry.clear()
+    _telemetry_range.clear()
+    charts.clear_cache()
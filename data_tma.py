@@ -1,256 +1,306 @@
 # data_tma.py
 import streamlit as st
 import pandas as pd
-import sqlite3
-from datetime import datetime
-import matplotlib.pyplot as plt
+from datetime import datetime, timedelta
 import numpy as np
+import database
+import charts
+import data_access
+import jobs
+import quality
+import telemetry
+from series import MONTH_NAMES
+
+PAGE_SIZES = [31, 100, 500]
+# Interval pembaruan status upload selama masih ada job yang berjalan (detik)
+POLL_SECONDS = 1.0
+
+
+# Tabel data dengan filter, urutan, kolom dan halaman yang dijalankan di SQLite;
+# hanya satu halaman yang dimuat dan dikirim ke browser
+def _paged_table(key, stasiun, start, end, threshold=None):
+    total = data_access.count_tma(stasiun, start, end, threshold)
+    col1, col2, col3, col4 = st.columns(4)
+    sort = col1.selectbox("Urutkan", database.TMA_COLUMNS, key=f'{key}_sort')
+    descending = col2.checkbox("Menurun", key=f'{key}_desc')
+    page_size = col3.selectbox("Baris per halaman", PAGE_SIZES, key=f'{key}_size')
+    pages = max(1, -(-total // page_size))
+    page = col4.number_input("Halaman", 1, pages, 1, key=f'{key}_page')
+    columns = st.multiselect("Kolom", database.NUMERIC_COLUMNS, default=database.NUMERIC_COLUMNS, key=f'{key}_cols')
+
+    frame = data_access.load_tma_page(stasiun, start, end, columns, threshold, sort, descending,
+                                      page_size, (min(page, pages) - 1) * page_size)
+    frame['tahun'] = frame['tanggal'].dt.year
+    frame['bulan'] = frame['tanggal'].dt.month
+    frame['nama_bulan'] = [MONTH_NAMES[bulan - 1] for bulan in frame['bulan']]
+    frame['hari'] = frame['tanggal'].dt.day
+    st.dataframe(frame)
+    st.caption(f"Menampilkan {len(frame)} dari {total} baris (halaman {min(page, pages)}/{pages})")
+
+
+# Ringkasan pelanggaran kualitas data yang ditemukan saat upload, per job
+def _quality_notes(job_table):
+    done = job_table.loc[job_table['status'] == 'selesai', 'id'].tolist()
+    if not done:
+        return {}
+    counts = data_access.load_job_quality(done)
+    counts = counts[counts['jumlah'] > 0]
+    return {job_id: "; ".join(f"{row.stasiun} - {quality.RULE_LABELS[row.aturan]}: {row.jumlah}"
+                              for row in sorted(group.itertuples(index=False),
+                                                key=lambda row: (row.stasiun, quality.RULES.index(row.aturan))))
+            for job_id, group in counts.groupby('job_id')}
+
+
+# Status job upload yang dikirim pada sesi ini. Saat dijalankan sebagai fragment berkala (polling),
+# halaman dimuat ulang penuh begitu ada job yang selesai agar data baru langsung tampil.
+def _upload_status(job_table, polling=False):
+    if polling:
+        job_table = data_access.load_jobs(st.session_state['upload_jobs'])
+
+    notes = _quality_notes(job_table)
+    for job in job_table.itertuples(index=False):
+        label = f"{job.nama_file} ({job.stasiun})"
+        if job.status == 'antri':
+            st.progress(0.0, text=f"{label}: menunggu giliran...")
+        elif job.status == 'berjalan':
+            st.progress(min(job.progres or 0.0, 1.0), text=f"{label}: memproses file... {job.baris} baris tersimpan")
+        elif job.status == 'selesai':
+            if job.dibuang:
+                st.warning(f"{label}: ada {job.dibuang} baris data yang kosong atau tidak valid. "
+                           "Data tersebut dibersihkan otomatis.")
+            st.success(f"{label}: data berhasil diupload dan disimpan ke database! "
+                       f"Stasiun: {job.hasil_stasiun}, Tahun data: [{job.hasil_tahun}]")
+            if job.id in notes:
+                st.info(f"{label}: pemeriksaan kualitas data (baris tetap disimpan) - {notes[job.id]}")
+        else:
+            st.error(f"{label} - Error: {job.pesan}")
+
+    finished = set(job_table.loc[~job_table['status'].isin(database.ACTIVE_JOB_STATUSES), 'id'].tolist())
+    new = finished - st.session_state.setdefault('upload_finished', set())
+    if new:
+        st.session_state['upload_finished'] |= new
+        # Data baru dimuat ulang dari database (sudah unik per tanggal)
+        data_access.invalidate()
+        if polling:
+            st.rerun()
+
 
 def show():
     st.title("📊 Data Tinggi Muka Air (TMA)")
     
-    # Fungsi untuk menyimpan data ke database
-    def save_to_db(df):
-        conn = sqlite3.connect('flood_prediction.db')
-        df.to_sql('tma_data', conn, if_exists='append', index=False)
-        conn.close()
-    
-    # Fungsi untuk memuat semua data dari database
-    def load_all_data():
-        conn = sqlite3.connect('flood_prediction.db')
-        query = "SELECT tanggal, jam_06, jam_12, jam_18, tma_min, tma_max, tma_rata FROM tma_data"
-        df = pd.read_sql(query, conn, parse_dates=['tanggal'])
-        conn.close()
-        return df
-    
-    # Fungsi untuk memproses file yang diupload
-    def process_uploaded_file(uploaded_file):
+    # Upload file baru (kolom 'stasiun' pada file diutamakan)
+    upload_station = st.text_input("Nama stasiun untuk file tanpa kolom 'stasiun'",
+                                   st.session_state.get('stasiun', database.DEFAULT_STATION),
+                                   key='upload_station')
+    # Beberapa file (misalnya satu per tahun) bisa diupload sekaligus; key uploader diganti
+    # setelah file masuk antrian agar file yang sama tidak dikirim ulang pada rerun berikutnya
+    upload_key = st.session_state.get('upload_key', 0)
+    uploaded_files = st.file_uploader("Upload file data TMA (CSV/Excel)", type=['xlsx', 'csv'],
+                                      accept_multiple_files=True, key=f'upload_files_{upload_key}')
+    fill_gaps = st.checkbox(f"Isi celah pendek (maksimal {quality.MAX_FILL_DAYS} hari) dengan interpolasi",
+                            key='upload_fill_gaps')
+
+    if uploaded_files:
         try:
-            # Baca file sesuai format
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file, decimal=',', parse_dates=['tanggal'], dayfirst=True)
-            else:
-                df = pd.read_excel(uploaded_file, decimal=',')
-            
-            # Pastikan kolom yang diperlukan ada
-            required_cols = ['tanggal', 'jam_06', 'jam_12', 'jam_18', 'tma_min', 'tma_max', 'tma_rata']
-            if not all(col in df.columns for col in required_cols):
-                raise ValueError("Format file tidak sesuai. Pastikan kolom yang diperlukan ada.")
-            
-            # Konversi format tanggal
-            df['tanggal'] = pd.to_datetime(df['tanggal'], format='%d/%m/%Y', errors='coerce')
-            
-            # Konversi nilai numerik
-            numeric_cols = ['jam_06', 'jam_12', 'jam_18', 'tma_min', 'tma_max', 'tma_rata']
-            for col in numeric_cols:
-                if df[col].dtype == object:
-                    df[col] = df[col].astype(str).str.replace(',', '.').astype(float)
-            
-            # Bersihkan data yang hilang
-            if df.isnull().values.any():
-                st.warning("Ada data yang kosong. Data akan dibersihkan otomatis.")
-                df = df.dropna()
-            
-            return df
-        
+            # File diproses dan disimpan per chunk di latar belakang; halaman tetap bisa dipakai
+            for uploaded_file in uploaded_files:
+                job_id = jobs.submit(uploaded_file, upload_station.strip() or database.DEFAULT_STATION,
+                                     st.session_state.get('username'), fill_gaps)
+                st.session_state.setdefault('upload_jobs', []).append(job_id)
+            st.session_state['upload_key'] = upload_key + 1
+            st.rerun()
         except Exception as e:
-            raise ValueError(f"Gagal memproses file: {str(e)}")
+            st.error(f"Error: {str(e)}")
 
-    # Coba muat data yang sudah ada dari database
-    if 'current_data' not in st.session_state:
-        saved_data = load_all_data()
-        if not saved_data.empty:
-            st.session_state['current_data'] = saved_data
-            st.success("berhasil dimuat!")
+    if st.session_state.get('upload_jobs'):
+        job_table = data_access.load_jobs(st.session_state['upload_jobs'])
+        if job_table['status'].isin(database.ACTIVE_JOB_STATUSES).any():
+            st.fragment(run_every=POLL_SECONDS)(_upload_status)(job_table, polling=True)
+        else:
+            _upload_status(job_table)
+            if st.button("Tutup status upload", key='clear_upload_status'):
+                st.session_state['upload_jobs'] = []
+                st.rerun()
 
-    # Upload file baru
-    uploaded_file = st.file_uploader("Upload file data TMA (CSV/Excel)", type=['xlsx', 'csv'])
+    with st.expander("Riwayat upload"):
+        history = data_access.load_jobs(username=st.session_state.get('username'))
+        st.dataframe(history[['dibuat', 'nama_file', 'stasiun', 'status', 'baris', 'dibuang', 'pesan']])
 
-    if uploaded_file is not None:
-        try:
-            # Proses data
-            new_data = process_uploaded_file(uploaded_file)
-            
-            # Simpan ke database
-            save_to_db(new_data)
-            
-            # Gabungkan dengan data existing jika ada
-            if 'current_data' in st.session_state:
-                combined_data = pd.concat([st.session_state['current_data'], new_data], ignore_index=True)
-                combined_data = combined_data.drop_duplicates(subset=['tanggal'], keep='last')
-                combined_data = combined_data.sort_values('tanggal')
-            else:
-                combined_data = new_data
-            
-            st.session_state['current_data'] = combined_data
-            st.success(f"Data berhasil diupload dan disimpan ke database! Tahun data: {new_data['tanggal'].dt.year.unique()}")
-            
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
+    # Pilih stasiun (pilihan disimpan di session agar sama dengan halaman Prediksi)
+    stations = data_access.list_stations()
+    stasiun = st.session_state.get('stasiun', database.DEFAULT_STATION)
+    if stations:
+        stasiun = st.selectbox("Pilih Stasiun", stations,
+                               index=stations.index(stasiun) if stasiun in stations else 0,
+                               key='station_filter')
+        st.session_state['stasiun'] = stasiun
+
+    # Ringkasan dibaca dari indeks dan tabel agregat; data harian dimuat per tahun saja
+    # (dari arsip kolumnar jika tahun tersebut sudah dibekukan)
+    period = data_access.date_range(stasiun)
 
     # Tampilkan data 
-    if 'current_data' in st.session_state and not st.session_state['current_data'].empty:
-        df = st.session_state['current_data']
+    if period is not None:
+        if not st.session_state.get('data_loaded'):
+            st.session_state['data_loaded'] = True
+            st.success("berhasil dimuat!")
         
-        # Tambahkan kolom analisis
-        df['tahun'] = df['tanggal'].dt.year
-        df['bulan'] = df['tanggal'].dt.month
-        df['nama_bulan'] = df['tanggal'].dt.month_name()
-        df['hari'] = df['tanggal'].dt.day
+        yearly_stats = data_access.load_yearly_stats(stasiun)
         
         # Info data
         st.subheader("Informasi Data")
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Periode Awal", df['tanggal'].min().strftime('%d/%m/%Y'))
+            st.metric("Periode Awal", period[0].strftime('%d/%m/%Y'))
         with col2:
-            st.metric("Periode Akhir", df['tanggal'].max().strftime('%d/%m/%Y'))
+            st.metric("Periode Akhir", period[1].strftime('%d/%m/%Y'))
         with col3:
-            st.metric("Jumlah Data", len(df))
+            st.metric("Jumlah Data", int(yearly_stats['jumlah_hari'].sum()))
         
         # Daftar tahun yang tersedia
-        available_years = sorted(df['tahun'].unique())
+        available_years = yearly_stats['tahun'].tolist()
         st.write(f"Tahun tersedia: {', '.join(map(str, available_years))}")
         
-        # Tab utama
-        tab1, tab2 = st.tabs(["📋 Data dan Visualisasi", "📈 Analisis Tahunan"])
+        # Tab utama (hanya tab yang dipilih yang dihitung dan digambar)
+        version = data_access.get_data_version()
+        main_tab = st.radio("Tab", ["📋 Data dan Visualisasi", "📈 Analisis Tahunan"],
+                            horizontal=True, label_visibility="collapsed", key='main_tab')
         
-        with tab1:
+        if main_tab == "📋 Data dan Visualisasi":
             # Filter data
             st.subheader("Filter Data")
             col1, col2 = st.columns(2)
             with col1:
                 selected_year = st.selectbox("Pilih Tahun", available_years, key='year_filter')
+            year_series = data_access.load_tma_year(selected_year, stasiun)
             with col2:
                 selected_month = st.selectbox("Pilih Bulan", 
-                                            sorted(df[df['tahun'] == selected_year]['bulan'].unique()), 
+                                            year_series.months(), 
                                             key='month_filter')
             
-            filtered_data = df[(df['tahun'] == selected_year) & (df['bulan'] == selected_month)]
+            # Potongan data satu bulan (view read-only dari data bersama)
+            filtered_data = year_series.month(selected_year, selected_month)
             
-            # Tampilkan data
-            st.subheader(f"Data Bulan {selected_month}/{selected_year}")
-            st.dataframe(filtered_data)
+            # Tampilkan data (filter dan halaman dijalankan di database)
+            month_start = pd.Timestamp(year=selected_year, month=selected_month, day=1)
+            month_end = month_start + pd.DateOffset(months=1)
+            table_scope = st.radio("Rentang tabel", ["Bulan terpilih", "Tahun terpilih", "Semua data"],
+                                   horizontal=True, key='table_scope')
+            if table_scope == "Bulan terpilih":
+                st.subheader(f"Data Bulan {selected_month}/{selected_year}")
+                table_start, table_end = month_start, month_end
+            elif table_scope == "Tahun terpilih":
+                st.subheader(f"Data Tahun {selected_year}")
+                table_start, table_end = pd.Timestamp(year=selected_year, month=1, day=1), pd.Timestamp(year=selected_year + 1, month=1, day=1)
+            else:
+                st.subheader("Semua Data")
+                table_start, table_end = period[0], period[1] + pd.Timedelta(days=1)
+            _paged_table('data_table', stasiun, table_start.date(), table_end.date())
             
             # Visualisasi
             st.subheader("Grafik Tinggi Muka Air")
             
-            chart_tab1, chart_tab2, chart_tab3, chart_tab4 = st.tabs(["Rata-rata Harian", "Per Jam", "Perbandingan", "Perbandingan Bulanan"])
-            
-            with chart_tab1:
-                fig1, ax1 = plt.subplots(figsize=(10, 4))
-                ax1.plot(filtered_data['hari'], filtered_data['tma_rata'], 'o-', color='blue')
-                ax1.set_xlabel('Tanggal')
-                ax1.set_ylabel('Tinggi Air (m)')
-                ax1.set_title(f'Tinggi Muka Air Rata-rata Harian (Bulan {selected_month})')
-                ax1.grid(True)
-                st.pyplot(fig1)
+            chart_tabs = {
+                "Rata-rata Harian": 'harian',
+                "Per Jam": 'per_jam',
+                "Perbandingan": 'perbandingan',
+                "Perbandingan Bulanan": 'bulanan',
+            }
+            chart_tab = st.radio("Grafik", list(chart_tabs), horizontal=True,
+                                 label_visibility="collapsed", key='chart_tab')
+            chart_kind = chart_tabs[chart_tab]
+            interactive = st.checkbox("Grafik interaktif (lebih ringan)", key='interactive_chart')
             
-            with chart_tab2:
-                fig2, ax2 = plt.subplots(figsize=(10, 4))
-                jam_cols = ['jam_06', 'jam_12', 'jam_18']
-                for jam in jam_cols:
-                    ax2.plot(filtered_data['hari'], filtered_data[jam], 'o-', label=jam)
-                ax2.set_xlabel('Tanggal')
-                ax2.set_ylabel('Tinggi Air (m)')
-                ax2.set_title('Tinggi Air Per Jam')
-                ax2.legend()
-                ax2.grid(True)
-                st.pyplot(fig2)
-            
-            with chart_tab3:
-                fig3, ax3 = plt.subplots(figsize=(10, 4))
-                ax3.plot(filtered_data['hari'], filtered_data['tma_min'], 's-', label='Minimum')
-                ax3.plot(filtered_data['hari'], filtered_data['tma_max'], '^-', label='Maksimum')
-                ax3.plot(filtered_data['hari'], filtered_data['tma_rata'], 'o-', label='Rata-rata')
-                ax3.set_xlabel('Tanggal')
-                ax3.set_ylabel('Tinggi Air (m)')
-                ax3.set_title('Perbandingan Tinggi Air Harian')
-                ax3.legend()
-                ax3.grid(True)
-                st.pyplot(fig3)
-                
-            with chart_tab4:
+            if chart_kind == 'bulanan':
                 # Perbandingan bulanan untuk tahun yang dipilih
-                year_data = df[df['tahun'] == selected_year]
-                fig4, ax4 = plt.subplots(figsize=(12, 6))
-                
-                for bulan in sorted(year_data['bulan'].unique()):
-                    bulan_data = year_data[year_data['bulan'] == bulan]
-                    ax4.plot(bulan_data['hari'], bulan_data['tma_rata'], 
-                            label=bulan_data['nama_bulan'].iloc[0],
-                            marker='o')
-                
-                ax4.set_title(f'Perbandingan Bulanan Tinggi Air Rata-rata ({selected_year})')
-                ax4.set_ylabel('Tinggi Air (m)')
-                ax4.legend()
-                ax4.grid(True)
-                
-                plt.tight_layout()
-                st.pyplot(fig4)
+                chart_data = year_series
+                chart_key = (version, stasiun, selected_year)
+                chart_args = (chart_data, selected_year)
+            else:
+                chart_data = filtered_data
+                chart_key = (version, stasiun, selected_year, selected_month)
+                chart_args = (chart_data, selected_month) if chart_kind == 'harian' else (chart_data,)
             
-            plt.close('all')
+            if interactive:
+                st.line_chart(charts.native_frame(chart_kind, chart_data))
+            else:
+                st.image(charts.render(chart_kind, chart_key, *chart_args))
 
             # Hitung statistik banjir bulanan
             st.subheader("Statistik Banjir Bulanan")
             threshold = st.slider("Threshold Banjir (meter)", 1.0, 3.0, 1.60, 0.1, key='monthly_threshold')
             
-            flood_days = filtered_data[filtered_data['tma_max'] > threshold]
-            st.metric("Hari dengan Banjir", f"{len(flood_days)} hari")
+            flood_count = data_access.count_tma(stasiun, month_start.date(), month_end.date(), threshold)
+            st.metric("Hari dengan Banjir", f"{flood_count} hari")
             
-            if not flood_days.empty:
+            if flood_count:
                 st.write("Detail Hari Banjir:")
-                st.dataframe(flood_days)
+                _paged_table('flood_table', stasiun, month_start.date(), month_end.date(), threshold)
+            
+            # Telemetri frekuensi tinggi: level piramida (mentah/jam/hari/bulan) dipilih sesuai rentang
+            telemetry_range = data_access.telemetry_range(stasiun)
+            if telemetry_range is not None:
+                st.subheader("Telemetri Resolusi Tinggi")
+                first_day, last_day = telemetry_range[0].date(), telemetry_range[1].date()
+                zoom = st.date_input("Rentang Waktu", (max(first_day, last_day - timedelta(days=6)), last_day),
+                                     min_value=first_day, max_value=last_day, key='telemetry_zoom')
+                if len(zoom) == 2:
+                    start, end = zoom[0], zoom[1] + timedelta(days=1)
+                    level = telemetry.choose_level(start, end)
+                    frame = data_access.load_telemetry(stasiun, level, start, end)
+                    st.caption(f"Level data: {level} ({len(frame)} titik)")
+                    if interactive:
+                        st.line_chart(charts.native_frame('telemetri', frame))
+                    else:
+                        st.image(charts.render('telemetri', (version, stasiun, level, start, end, round(threshold, 2)),
+                                               frame, level, threshold))
+                    
+                    # Hari banjir cukup dibaca dari level hari (maksimum harian), bukan dari data mentah
+                    daily = frame if level == 'hari' else data_access.load_telemetry(stasiun, 'hari', start, end)
+                    telemetry_floods = int((daily['tma_max'].to_numpy(np.float32) > np.float32(threshold)).sum())
+                    st.metric("Hari dengan Banjir pada Rentang", f"{telemetry_floods} hari")
+            
+            # Peringatan dari layanan real-time (alert_service.py)
+            recent_alerts = data_access.load_alerts(stasiun, 20)
+            if not recent_alerts.empty:
+                with st.expander("🚨 Peringatan Terbaru"):
+                    st.dataframe(recent_alerts.drop(columns=['stasiun']), hide_index=True)
+
+            # Pemeriksaan kualitas seluruh data stasiun (hanya ditandai, data tidak diubah)
+            with st.expander("🧪 Kualitas Data"):
+                report = data_access.load_quality(threshold, stasiun)
+                counts = quality.counts_table({stasiun: report.jumlah}).drop(index='celah_diisi')
+                st.dataframe(counts, hide_index=True)
+                col1, col2 = st.columns(2)
+                col1.write("Celah tanggal:")
+                col1.dataframe(report.celah, hide_index=True)
+                col2.write("Pencilan tma_max:")
+                col2.dataframe(report.pencilan, hide_index=True)
         
-        with tab2:
+        else:
             # Analisis tahunan
             st.subheader("Analisis Tahunan")
             analysis_year = st.selectbox("Pilih Tahun untuk Analisis", available_years, key='analysis_year')
             
-            year_data = df[df['tahun'] == analysis_year]
+            year_data = data_access.load_tma_year(analysis_year, stasiun)
             
             # Statistik banjir tahunan
             st.subheader(f"Statistik Banjir Tahun {analysis_year}")
             annual_threshold = st.slider("Threshold Banjir (meter)", 1.0, 3.0, 1.60, 0.1, key='annual_threshold')
             
-            # Hitung statistik per bulan
-            monthly_stats = year_data.groupby(['bulan', 'nama_bulan']).agg(
-                hari_banjir=('tma_max', lambda x: sum(x > annual_threshold)),
-                tma_rata_rata=('tma_rata', 'mean'),
-                tma_tertinggi=('tma_max', 'max'),
-                tma_terendah=('tma_min', 'min')
-            ).reset_index()
+            # Statistik per bulan dan tahunan dibaca dari tabel agregat
+            monthly_stats = data_access.load_monthly_stats(analysis_year, annual_threshold, stasiun)
+            year_stats = yearly_stats[yearly_stats['tahun'] == analysis_year].iloc[0]
             
             # Tampilkan metrik utama
             col1, col2, col3 = st.columns(3)
             col1.metric("Total Hari Banjir", monthly_stats['hari_banjir'].sum())
-            col2.metric("TMA Rata-rata Tahunan", f"{year_data['tma_rata'].mean():.2f} m")
-            col3.metric("TMA Tertinggi Tahunan", f"{year_data['tma_max'].max():.2f} m")
+            col2.metric("TMA Rata-rata Tahunan", f"{year_stats['tma_rata']:.2f} m")
+            col3.metric("TMA Tertinggi Tahunan", f"{year_stats['tma_max']:.2f} m")
             
             # Visualisasi
-            fig5, (ax6, ax7) = plt.subplots(1, 2, figsize=(16, 6))
-            
-            # Grafik batang hari banjir
-            ax6.bar(monthly_stats['nama_bulan'], monthly_stats['hari_banjir'], color='salmon')
-            ax6.set_title(f'Hari dengan Banjir per Bulan (Threshold: {annual_threshold}m)')
-            ax6.set_ylabel('Jumlah Hari')
-            ax6.tick_params(axis='x', rotation=45)
-            ax6.grid(axis='y')
-            
-            # Grafik perkembangan TMA
-            for bulan in sorted(year_data['bulan'].unique()):
-                bulan_data = year_data[year_data['bulan'] == bulan]
-                ax7.plot(bulan_data['hari'], bulan_data['tma_rata'], 
-                        label=bulan_data['nama_bulan'].iloc[0],
-                        marker='o')
-            ax7.set_title('Perkembangan Tinggi Air Rata-rata')
-            ax7.set_xlabel('Hari dalam Bulan')
-            ax7.set_ylabel('Tinggi Air (m)')
-            ax7.legend()
-            ax7.grid(True)
-            
-            plt.tight_layout()
-            st.pyplot(fig5)
+            st.image(charts.render('tahunan', (version, stasiun, analysis_year, round(annual_threshold, 2)),
+                                   monthly_stats, year_data, annual_threshold))
             
             # Tabel statistik bulanan
             st.subheader("Detail Statistik Bulanan")
@@ -258,18 +308,24 @@ def show():
         
         # Tombol manajemen data
         st.subheader("Manajemen Data")
+        if st.button(f"🗑️ Reset Data Stasiun {stasiun}"):
+            database.reset_tma(stasiun)
+            data_access.invalidate()
+            st.success(f"Data stasiun {stasiun} berhasil direset dari database!")
+            st.rerun()
+        
         if st.button("♻️ Reset Semua Data"):
-            conn = sqlite3.connect('flood_prediction.db')
-            c = conn.cursor()
-            c.execute("DELETE FROM tma_data")
-            conn.commit()
-            conn.close()
-            del st.session_state['current_data']
+            database.reset_tma()
+            data_access.invalidate()
             st.success("Data berhasil direset dari database!")
             st.rerun()
         
+        if st.button("🧊 Arsipkan Tahun Lama"):
+            frozen = database.freeze_archive(stasiun)
+            st.success(f"{len(frozen)} tahun data stasiun {stasiun} disimpan ke arsip kolumnar.")
+        
         if st.button("🔄 Muat Ulang Data"):
-            del st.session_state['current_data']
+            data_access.invalidate()
             st.rerun()
     else:
         st.warning("Belum ada data TMA yang tersimpan di database. Silakan upload file data TMA.")
\ No newline at end of file
@@ -0,0 +1,762 @@
+# database.py - Lapisan penyimpanan data TMA (SQLite)
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import aggregates
+import alerts
+import archive
+import profiling
+import telemetry
+from series import TMASeries
+
+# Path absolut agar tidak bergantung pada direktori kerja; bisa diganti lewat variabel TMA_DB_PATH
+DB_PATH = os.path.abspath(os.environ.get('TMA_DB_PATH') or
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flood_prediction.db'))
+DEFAULT_STATION = 'utama'
+SCHEMA_VERSION = 13
+
+# Pengaturan setiap koneksi: WAL agar pembaca tidak menunggu penulis, synchronous NORMAL
+# (aman untuk WAL, fsync hanya saat checkpoint), cache 32 MB dan mmap 256 MB untuk pembacaan
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-32000",
+    "PRAGMA mmap_size=268435456",
+]
+# Detik menunggu lock SQLite sebelum BUSY; BEGIN IMMEDIATE diulang dengan jeda bertambah
+BUSY_TIMEOUT = 2.0
+WRITE_RETRIES = 5
+RETRY_DELAY = 0.05
+# Koneksi baca yang disimpan per file database untuk dipakai ulang
+POOL_SIZE = 8
+
+_pools = {}
+_writers = {}
+_pool_lock = threading.Lock()
+# Satu penulis per proses; antar proses diatur oleh lock SQLite + retry
+_write_lock = threading.Lock()
+
+# File database yang skemanya sudah dipastikan terkini di proses ini
+_initialized = set()
+_init_lock = threading.Lock()
+
+TMA_COLUMNS = ['tanggal', 'jam_06', 'jam_12', 'jam_18', 'tma_min', 'tma_max', 'tma_rata']
+NUMERIC_COLUMNS = TMA_COLUMNS[1:]
+
+CREATE_TMA_TABLE = '''CREATE TABLE IF NOT EXISTS tma_data
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  stasiun TEXT NOT NULL DEFAULT 'utama',
+                  tanggal TEXT NOT NULL,
+                  jam_06 REAL,
+                  jam_12 REAL,
+                  jam_18 REAL,
+                  tma_min REAL,
+                  tma_max REAL,
+                  tma_rata REAL,
+                  tanggal_hari INTEGER)'''
+
+CREATE_TMA_INDEX = '''CREATE UNIQUE INDEX IF NOT EXISTS idx_tma_stasiun_tanggal
+                      ON tma_data (stasiun, tanggal)'''
+
+# tanggal_hari = jumlah hari sejak 1970-01-01, kunci integer untuk range scan berindeks
+CREATE_TMA_DAY_INDEX = '''CREATE INDEX IF NOT EXISTS idx_tma_stasiun_hari
+                          ON tma_data (stasiun, tanggal_hari)'''
+EPOCH_DAY_SQL = "CAST(julianday({}) - 2440587.5 AS INTEGER)"
+
+# Versi data terakhir yang mengubah setiap (stasiun, tahun), kunci cache bagian laporan per tahun.
+# Nilainya diambil dari data_version yang selalu naik, jadi tidak pernah dipakai ulang (juga setelah reset).
+CREATE_YEAR_VERSION_TABLE = '''CREATE TABLE IF NOT EXISTS versi_tahun
+                               (stasiun TEXT NOT NULL,
+                                tahun INTEGER NOT NULL,
+                                versi INTEGER NOT NULL,
+                                PRIMARY KEY (stasiun, tahun))'''
+
+# Antrian upload yang diproses di latar belakang (lihat jobs.py).
+# status: 'antri' -> 'berjalan' -> 'selesai' / 'gagal'; pid = proses yang memegang job,
+# berkas = salinan file upload di disk (dihapus setelah diproses), isi_celah = opsi fill_gaps,
+# host = hostname/boot id tempat pid berlaku, instans = id acak proses pemilik,
+# detak = waktu UTC terakhir pemilik menandai job masih dipegang
+CREATE_JOB_TABLE = '''CREATE TABLE IF NOT EXISTS antrian_upload
+                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                       username TEXT,
+                       nama_file TEXT NOT NULL,
+                       stasiun TEXT NOT NULL,
+                       pid INTEGER,
+                       status TEXT NOT NULL DEFAULT 'antri',
+                       progres REAL,
+                       baris INTEGER NOT NULL DEFAULT 0,
+                       dibuang INTEGER NOT NULL DEFAULT 0,
+                       hasil_stasiun TEXT,
+                       hasil_tahun TEXT,
+                       pesan TEXT,
+                       dibuat TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+                       diperbarui TEXT,
+                       berkas TEXT,
+                       isi_celah INTEGER NOT NULL DEFAULT 0,
+                       host TEXT,
+                       instans TEXT,
+                       detak TEXT)'''
+JOB_COLUMNS = ['id', 'username', 'nama_file', 'stasiun', 'status', 'progres', 'baris', 'dibuang',
+               'hasil_stasiun', 'hasil_tahun', 'pesan', 'dibuat', 'diperbarui']
+ACTIVE_JOB_STATUSES = ('antri', 'berjalan')
+
+# Jumlah pelanggaran aturan kualitas data per job upload dan stasiun (lihat quality.py)
+CREATE_JOB_QUALITY_TABLE = '''CREATE TABLE IF NOT EXISTS validasi_upload
+                              (job_id INTEGER NOT NULL,
+                               stasiun TEXT NOT NULL,
+                               aturan TEXT NOT NULL,
+                               jumlah INTEGER NOT NULL,
+                               PRIMARY KEY (job_id, stasiun, aturan))'''
+
+UPSERT_TMA = f'''INSERT INTO tma_data (stasiun, {', '.join(TMA_COLUMNS)}, tanggal_hari)
+                 VALUES ({', '.join(['?'] * (len(TMA_COLUMNS) + 2))})
+                 ON CONFLICT (stasiun, tanggal) DO UPDATE SET
+                 {', '.join(f'{col}=excluded.{col}' for col in NUMERIC_COLUMNS)}'''
+
+# Baris harian tma_data diturunkan dari piramida telemetri (WHERE pada SELECT luar
+# diperlukan SQLite agar ON CONFLICT tidak dianggap bagian dari SELECT)
+UPSERT_TMA_FROM_TELEMETRY = f'''INSERT INTO tma_data (stasiun, {', '.join(TMA_COLUMNS)}, tanggal_hari)
+                 SELECT t.*, {EPOCH_DAY_SQL.format('t.waktu')} FROM ({telemetry.DAILY_ROWS}) t WHERE 1
+                 ON CONFLICT (stasiun, tanggal) DO UPDATE SET
+                 {', '.join(f'{col}=excluded.{col}' for col in NUMERIC_COLUMNS)}'''
+
+
+def get_connection(check_same_thread=True):
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT, check_same_thread=check_same_thread)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _pool():
+    with _pool_lock:
+        pool = _pools.get(DB_PATH)
+        if pool is None:
+            pool = _pools[DB_PATH] = queue.LifoQueue(maxsize=POOL_SIZE)
+        return pool
+
+
+# Pakai koneksi yang diberikan, atau pinjam koneksi baca dari pool (dibuat jika pool kosong).
+# Dalam mode WAL pembacaan tidak menunggu transaksi tulis yang sedang berjalan.
+@contextmanager
+def connect(conn=None):
+    if conn is not None:
+        yield conn
+        return
+    pool = _pool()
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = get_connection(check_same_thread=False)
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def _is_busy(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+# Mulai transaksi tulis; jika proses lain sedang menulis, ulangi dengan jeda yang berlipat
+def _begin_immediate(conn):
+    delay = RETRY_DELAY
+    for attempt in range(WRITE_RETRIES):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == WRITE_RETRIES - 1:
+                raise
+            time.sleep(delay)
+            delay *= 2
+
+
+# Transaksi tulis lewat satu koneksi penulis per proses (diserialkan dengan lock), commit jika
+# berhasil dan rollback jika gagal. Jika conn diberikan (koneksi yang sudah berada di dalam transaksi
+# pemanggil), blok dijalankan di koneksi tersebut tanpa commit/rollback: transaksi luar yang menentukan.
+# Di dalam blok, panggil fungsi tulis lain dengan conn yang sama.
+@contextmanager
+def transaction(conn=None):
+    if conn is not None:
+        yield conn
+        return
+    with _write_lock:
+        conn = _writers.get(DB_PATH)
+        if conn is None:
+            conn = _writers[DB_PATH] = get_connection(check_same_thread=False)
+        _begin_immediate(conn)
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+# Tutup koneksi pool dan penulis untuk file database saat ini (misalnya sebelum file dihapus)
+def close_connections():
+    with _write_lock:
+        writer = _writers.pop(DB_PATH, None)
+        if writer is not None:
+            writer.close()
+    with _pool_lock:
+        pool = _pools.pop(DB_PATH, None)
+    while pool is not None and not pool.empty():
+        pool.get_nowait().close()
+
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+# Migrasi tabel lama (append-only, tanpa stasiun): satukan duplikat per tanggal,
+# baris terakhir yang diupload (id terbesar) yang dipertahankan
+def _migrate_v1(conn):
+    old_columns = _table_columns(conn, 'tma_data')
+    if old_columns and 'stasiun' not in old_columns:
+        conn.execute("ALTER TABLE tma_data RENAME TO tma_data_lama")
+        conn.execute(CREATE_TMA_TABLE)
+        conn.execute(f'''INSERT INTO tma_data (stasiun, {', '.join(TMA_COLUMNS)})
+                         SELECT ?, date(tanggal), {', '.join(NUMERIC_COLUMNS)}
+                         FROM tma_data_lama
+                         WHERE id IN (SELECT MAX(id) FROM tma_data_lama
+                                      WHERE date(tanggal) IS NOT NULL
+                                      GROUP BY date(tanggal))
+                         ORDER BY date(tanggal)''', (DEFAULT_STATION,))
+        conn.execute("DROP TABLE tma_data_lama")
+    else:
+        conn.execute(CREATE_TMA_TABLE)
+    conn.execute(CREATE_TMA_INDEX)
+
+
+# Tambah kolom tanggal_hari untuk data lama dan indeks (stasiun, tanggal_hari)
+def _migrate_v4(conn):
+    if 'tanggal_hari' not in _table_columns(conn, 'tma_data'):
+        conn.execute("ALTER TABLE tma_data ADD COLUMN tanggal_hari INTEGER")
+    conn.execute(f"UPDATE tma_data SET tanggal_hari = {EPOCH_DAY_SQL.format('tanggal')} WHERE tanggal_hari IS NULL")
+    conn.execute(CREATE_TMA_DAY_INDEX)
+
+
+# Peran pengguna ('admin' / 'user'); akun bawaan 123 menjadi admin
+def _migrate_v5(conn):
+    if 'role' not in _table_columns(conn, 'users'):
+        conn.execute("ALTER TABLE users ADD COLUMN role TEXT NOT NULL DEFAULT 'user'")
+        conn.execute("UPDATE users SET role='admin' WHERE username='123'")
+
+
+# Kolom berkas spool dan opsi isi celah pada antrian upload lama
+def _migrate_v10(conn):
+    columns = _table_columns(conn, 'antrian_upload')
+    if 'berkas' not in columns:
+        conn.execute("ALTER TABLE antrian_upload ADD COLUMN berkas TEXT")
+    if 'isi_celah' not in columns:
+        conn.execute("ALTER TABLE antrian_upload ADD COLUMN isi_celah INTEGER NOT NULL DEFAULT 0")
+
+
+# Pemilik job (host, instans proses) dan detak untuk mengenali job yang ditinggal proses mati
+def _migrate_v13(conn):
+    columns = _table_columns(conn, 'antrian_upload')
+    for name in ['host', 'instans', 'detak']:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE antrian_upload ADD COLUMN {name} TEXT")
+
+
+# Password lama disimpan apa adanya; ganti dengan hash scrypt bersalt
+def _migrate_v8(conn):
+    import auth
+    rows = conn.execute("SELECT username, password FROM users").fetchall()
+    conn.executemany("UPDATE users SET password=? WHERE username=?",
+                     [(auth.hash_password(password), username) for username, password in rows
+                      if password is not None and not auth.is_hashed(password)])
+
+
+# Inisialisasi database
+# Pastikan skema terkini, cukup sekali per proses untuk setiap file database.
+# Streamlit menjalankan ulang app.py pada setiap interaksi; setelah panggilan pertama
+# init_db() hanya memeriksa set di memori tanpa membuka koneksi.
+def init_db():
+    if DB_PATH in _initialized:
+        return
+    with _init_lock:
+        if DB_PATH in _initialized:
+            return
+        with connect() as conn:
+            current = conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        # DDL dan migrasi hanya dijalankan jika versi skema di file belum sama
+        if not current:
+            _create_schema()
+        _initialized.add(DB_PATH)
+
+
+# Pakai file database lain (opsi --db pada CLI): path dibuat absolut dan skemanya dipastikan terkini
+def use_database(path):
+    global DB_PATH
+    DB_PATH = os.path.abspath(path)
+    init_db()
+
+
+def _create_schema():
+    with transaction() as conn:
+        c = conn.cursor()
+
+        # Buat tabel users jika belum ada
+        c.execute('''CREATE TABLE IF NOT EXISTS users
+                     (username TEXT PRIMARY KEY, password TEXT, role TEXT NOT NULL DEFAULT 'user')''')
+
+        # Buat / migrasi tabel tma_data
+        version = c.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            _migrate_v1(conn)
+        if version < 4:
+            _migrate_v4(conn)
+        if version < 5:
+            _migrate_v5(conn)
+        if version < 8:
+            _migrate_v8(conn)
+
+        # Tabel agregat bulanan/tahunan
+        aggregates.create_tables(conn)
+        if version < 2:
+            aggregates.rebuild(conn)
+
+        # Tabel telemetri frekuensi tinggi dan piramida downsampling
+        telemetry.create_tables(conn)
+
+        # Antrian upload latar belakang
+        c.execute(CREATE_JOB_TABLE)
+        if version < 10:
+            _migrate_v10(conn)
+        if version < 13:
+            _migrate_v13(conn)
+        c.execute(CREATE_JOB_QUALITY_TABLE)
+
+        # Pengaturan threshold per stasiun dan riwayat peringatan real-time
+        alerts.create_tables(conn)
+
+        # Versi data, dinaikkan setiap kali tma_data berubah (kunci cache)
+        c.execute('''CREATE TABLE IF NOT EXISTS meta
+                     (key TEXT PRIMARY KEY, value INTEGER)''')
+        c.execute("INSERT OR IGNORE INTO meta VALUES ('data_version', 0)")
+        # Identitas acak file database, membedakan cache milik database lain dengan versi data yang sama
+        c.execute("INSERT OR IGNORE INTO meta VALUES ('db_id', abs(random()))")
+        c.execute(CREATE_YEAR_VERSION_TABLE)
+        c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        # Tambahkan user default jika belum ada
+        c.execute("SELECT COUNT(*) FROM users")
+        if c.fetchone()[0] == 0:
+            import auth
+            c.execute("INSERT INTO users VALUES (?, ?, ?)", ('123', auth.hash_password('123'), 'admin'))
+            c.execute("INSERT INTO users VALUES (?, ?, ?)", ('user', auth.hash_password('user123'), 'user'))
+
+
+# (hash password, peran) satu pengguna, (None, None) jika tidak ada
+def get_credentials(username, conn=None):
+    with connect(conn) as conn:
+        result = conn.execute("SELECT password, role FROM users WHERE username=?", (username,)).fetchone()
+    return tuple(result) if result is not None else (None, None)
+
+
+def set_password_hash(username, password_hash, conn=None):
+    with transaction(conn) as conn:
+        conn.execute("UPDATE users SET password=? WHERE username=?", (password_hash, username))
+
+
+def get_data_version(conn=None):
+    with connect(conn) as conn:
+        return conn.execute("SELECT value FROM meta WHERE key='data_version'").fetchone()[0]
+
+
+def get_database_id(conn=None):
+    with connect(conn) as conn:
+        return conn.execute("SELECT value FROM meta WHERE key='db_id'").fetchone()[0]
+
+
+# Naikkan versi data; tahun start..end milik stasiun dicatat berubah pada versi baru tersebut
+def _bump_data_version(conn, stasiun=None, start=None, end=None):
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key='data_version'")
+    if stasiun is not None:
+        conn.executemany("""INSERT OR REPLACE INTO versi_tahun
+                            SELECT ?, ?, value FROM meta WHERE key='data_version'""",
+                         [(stasiun, tahun) for tahun in range(start.year, end.year + 1)])
+
+
+# Ubah DataFrame TMA menjadi baris siap executemany
+def _to_rows(df, stasiun):
+    data = df[TMA_COLUMNS].copy()
+    tanggal = pd.to_datetime(data['tanggal'])
+    data['tanggal'] = tanggal.dt.strftime('%Y-%m-%d')
+    data[NUMERIC_COLUMNS] = data[NUMERIC_COLUMNS].astype(float)
+    data['tanggal_hari'] = tanggal.to_numpy().astype('datetime64[D]').astype(np.int64).tolist()
+    data.insert(0, 'stasiun', stasiun)
+    return data.itertuples(index=False, name=None)
+
+
+# Partisi arsip untuk tahun yang ditulis dihapus sebelum dan sesudah transaksi agar pembacaan
+# kembali ke SQLite (juga jika freeze_archive menulis partisi di antaranya)
+def _drop_archived(stasiun, start, end):
+    archive.drop_years(stasiun, range(start.year, end.year + 1))
+
+
+# Simpan data TMA (insert atau update per stasiun + tanggal) dalam satu transaksi,
+# sekaligus memperbarui agregat untuk bulan-bulan yang tersentuh
+@profiling.timed('db.upsert_tma')
+def upsert_tma(df, stasiun=DEFAULT_STATION, conn=None):
+    if df.empty:
+        return 0
+    tanggal = pd.to_datetime(df['tanggal'])
+    _drop_archived(stasiun, tanggal.min(), tanggal.max())
+    with transaction(conn) as conn:
+        conn.executemany(UPSERT_TMA, _to_rows(df, stasiun))
+        aggregates.refresh(conn, stasiun, tanggal.min(), tanggal.max())
+        _bump_data_version(conn, stasiun, tanggal.min(), tanggal.max())
+    _drop_archived(stasiun, tanggal.min(), tanggal.max())
+    return len(df)
+
+
+# Simpan bacaan telemetri (kolom waktu, tma) dalam satu transaksi: piramida jam/hari/bulan,
+# baris harian tma_data dan agregat untuk rentang yang tersentuh ikut diperbarui
+@profiling.timed('db.upsert_telemetry')
+def upsert_telemetry(df, stasiun=DEFAULT_STATION, conn=None):
+    if df.empty:
+        return 0
+    waktu = pd.to_datetime(df['waktu'])
+    _drop_archived(stasiun, waktu.min(), waktu.max())
+    with transaction(conn) as conn:
+        conn.executemany(telemetry.UPSERT_READING, telemetry.to_rows(df, stasiun))
+        lo, hi = telemetry.refresh(conn, stasiun, waktu.min(), waktu.max())
+        conn.execute(UPSERT_TMA_FROM_TELEMETRY, (stasiun, lo, hi))
+        aggregates.refresh(conn, stasiun, waktu.min(), waktu.max())
+        _bump_data_version(conn, stasiun, waktu.min(), waktu.max())
+    _drop_archived(stasiun, waktu.min(), waktu.max())
+    return len(df)
+
+
+def load_tma(stasiun=DEFAULT_STATION, columns=TMA_COLUMNS, conn=None):
+    query = f"SELECT {', '.join(columns)} FROM tma_data WHERE stasiun=? ORDER BY tanggal"
+    with connect(conn) as conn:
+        return pd.read_sql(query, conn, params=(stasiun,), parse_dates=['tanggal'])
+
+
+# Baris tma_data sebagai array (tanggal datetime64[D], bacaan float64) tanpa parsing tanggal oleh pandas.
+# years membatasi ke tahun tertentu (range scan per tahun pada indeks), exclude melewati tahun di arsip.
+def _read_series_rows(conn, stasiun, years=None, exclude=()):
+    query = f"SELECT {', '.join(TMA_COLUMNS)} FROM tma_data WHERE stasiun=?"
+    params = [stasiun]
+    if years is not None:
+        query += " AND (" + " OR ".join(["(tanggal >= ? AND tanggal < ?)"] * len(years)) + ")"
+        for year in years:
+            params += [f"{year:04d}-01-01", f"{year + 1:04d}-01-01"]
+    if exclude:
+        query += f" AND substr(tanggal, 1, 4) NOT IN ({', '.join(['?'] * len(exclude))})"
+        params += [f"{year:04d}" for year in exclude]
+    rows = conn.execute(query + " ORDER BY tanggal", params).fetchall()
+    columns = list(zip(*rows)) if rows else [()] * len(TMA_COLUMNS)
+    tanggal = np.array(columns[0], dtype='datetime64[D]')
+    readings = {name: np.array(values, dtype=np.float64) for name, values in zip(TMA_COLUMNS[1:], columns[1:])}
+    return tanggal, readings
+
+
+# Deret TMA satu stasiun (seluruhnya atau tahun tertentu). Tahun yang sudah dibekukan dibaca
+# memory-mapped dari arsip, sisanya dari SQLite. Satu partisi arsip dipakai tanpa salinan.
+def load_series(stasiun=DEFAULT_STATION, years=None, conn=None):
+    frozen = set(archive.frozen_years(stasiun))
+    wanted = None if years is None else sorted({int(year) for year in years})
+    parts = []
+    archived = []
+    for year in sorted(frozen if wanted is None else frozen.intersection(wanted)):
+        try:
+            parts.append(archive.read_year(stasiun, year))
+            archived.append(year)
+        except FileNotFoundError:
+            # Partisi baru saja dihapus oleh penulisan; baca tahun ini dari SQLite
+            pass
+
+    rest = None if wanted is None else [year for year in wanted if year not in archived]
+    if rest is None or rest:
+        with connect(conn) as conn:
+            parts.append(_read_series_rows(conn, stasiun, rest, exclude=archived if rest is None else ()))
+
+    parts = sorted((part for part in parts if len(part[0])), key=lambda part: part[0][0])
+    if len(parts) == 1:
+        return TMASeries(*parts[0])
+    if not parts:
+        return TMASeries(np.array([], dtype='datetime64[D]'),
+                         {name: np.array([], dtype=np.float32) for name in NUMERIC_COLUMNS})
+    return TMASeries(np.concatenate([part[0] for part in parts]),
+                     {name: np.concatenate([part[1][name] for part in parts]) for name in NUMERIC_COLUMNS})
+
+
+# Bekukan tahun-tahun yang sudah lewat ke arsip kolumnar. Jika ada penulisan selama proses,
+# partisi yang baru ditulis dibuang lagi agar tidak menyimpan data lama.
+def freeze_archive(stasiun=None, before_year=None, conn=None):
+    with connect(conn) as conn:
+        stations = [stasiun] if stasiun else list_stations(conn)
+        station_years = {
+            name: [row[0] for row in conn.execute("SELECT tahun FROM tma_tahunan WHERE stasiun=? ORDER BY tahun",
+                                                  (name,))]
+            for name in stations
+        }
+        version = get_data_version(conn)
+        frozen = archive.freeze(station_years, lambda name, year: _read_series_rows(conn, name, [year]),
+                                before_year)
+        if get_data_version(conn) != version:
+            for name, year in frozen:
+                archive.drop_years(name, [year])
+            return []
+    return frozen
+
+
+def _epoch_day(value):
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+
+# Filter rentang tanggal [start, end) (dan threshold tma_max) yang dijalankan di SQLite
+# sebagai range scan pada indeks (stasiun, tanggal_hari)
+def _page_filter(stasiun, start, end, threshold=None):
+    where = "stasiun=? AND tanggal_hari >= ? AND tanggal_hari < ?"
+    params = [stasiun, _epoch_day(start), _epoch_day(end)]
+    if threshold is not None:
+        where += " AND tma_max > ?"
+        params.append(float(threshold))
+    return where, params
+
+
+def count_tma(stasiun, start, end, threshold=None, conn=None):
+    where, params = _page_filter(stasiun, start, end, threshold)
+    with connect(conn) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM tma_data WHERE {where}", params).fetchone()[0]
+
+
+# Satu halaman data TMA: hanya kolom yang diminta, sudah terurut dan dibatasi LIMIT/OFFSET di SQLite
+def load_tma_page(stasiun, start, end, columns=NUMERIC_COLUMNS, threshold=None, sort='tanggal',
+                  descending=False, limit=50, offset=0, conn=None):
+    if sort not in TMA_COLUMNS:
+        raise ValueError(f"Kolom urutan tidak dikenal: {sort}")
+    columns = [col for col in NUMERIC_COLUMNS if col in columns]
+    where, params = _page_filter(stasiun, start, end, threshold)
+    direction = 'DESC' if descending else 'ASC'
+    order = f"tanggal_hari {direction}" if sort == 'tanggal' else f"{sort} {direction}, tanggal_hari"
+    query = f'''SELECT {', '.join(['tanggal'] + columns)} FROM tma_data WHERE {where}
+                ORDER BY {order} LIMIT ? OFFSET ?'''
+    with connect(conn) as conn:
+        page = pd.read_sql(query, conn, params=params + [int(limit), int(offset)])
+    page['tanggal'] = pd.to_datetime(page['tanggal'], format='%Y-%m-%d')
+    return page
+
+
+# Tanggal pertama dan terakhir satu stasiun (dua lookup pada indeks)
+def date_range(stasiun=DEFAULT_STATION, conn=None):
+    with connect(conn) as conn:
+        start, end = conn.execute("SELECT MIN(tanggal), MAX(tanggal) FROM tma_data WHERE stasiun=?",
+                                  (stasiun,)).fetchone()
+    if start is None:
+        return None
+    return pd.Timestamp(start), pd.Timestamp(end)
+
+
+def list_stations(conn=None):
+    with connect(conn) as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT stasiun FROM tma_data ORDER BY stasiun")]
+
+
+def reset_tma(stasiun=None, conn=None):
+    with transaction(conn) as conn:
+        if stasiun is None:
+            conn.execute("DELETE FROM tma_data")
+            conn.execute("DELETE FROM versi_tahun")
+        else:
+            conn.execute("DELETE FROM tma_data WHERE stasiun=?", (stasiun,))
+            conn.execute("DELETE FROM versi_tahun WHERE stasiun=?", (stasiun,))
+        aggregates.clear(conn, stasiun)
+        telemetry.clear(conn, stasiun)
+        alerts.clear(conn, stasiun)
+        archive.drop(stasiun)
+        _bump_data_version(conn)
+
+
+# Catat job upload baru dengan status 'antri', mengembalikan id job
+def create_job(nama_file, stasiun, username=None, pid=None, berkas=None, fill_gaps=False, host=None,
+               instans=None, conn=None):
+    with transaction(conn) as conn:
+        cursor = conn.execute('''INSERT INTO antrian_upload
+                                 (username, nama_file, stasiun, pid, berkas, isi_celah, host, instans, detak)
+                                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))''',
+                              (username, nama_file, stasiun, pid, berkas, int(fill_gaps), host, instans))
+    return cursor.lastrowid
+
+
+# Ambil alih job yang ditinggal pemilik lamanya (instans); False jika proses lain sudah lebih dulu mengambilnya
+def claim_job(job_id, old_instans, host, pid, instans, conn=None):
+    with transaction(conn) as conn:
+        cursor = conn.execute(f'''UPDATE antrian_upload
+                                  SET host=?, pid=?, instans=?, detak=datetime('now'), status='antri'
+                                  WHERE id=? AND instans IS ? AND status IN {ACTIVE_JOB_STATUSES}''',
+                              (host, pid, instans, job_id, old_instans))
+    return cursor.rowcount == 1
+
+
+# Tandai job aktif milik instans proses ini masih dipegang
+def heartbeat_jobs(instans, conn=None):
+    with transaction(conn) as conn:
+        conn.execute(f"""UPDATE antrian_upload SET detak=datetime('now')
+                         WHERE instans=? AND status IN {ACTIVE_JOB_STATUSES}""", (instans,))
+
+
+# UPDATE job pada koneksi yang sudah berada di dalam transaksi
+def _set_job_fields(conn, job_id, **fields):
+    fields['diperbarui'] = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+    assignments = ', '.join(f"{name}=?" for name in fields)
+    conn.execute(f"UPDATE antrian_upload SET {assignments} WHERE id=?", list(fields.values()) + [job_id])
+
+
+def _update_job(conn, job_id, **fields):
+    with transaction(conn) as conn:
+        _set_job_fields(conn, job_id, **fields)
+
+
+def start_job(job_id, conn=None):
+    _update_job(conn, job_id, status='berjalan', progres=0.0)
+
+
+def update_job_progress(job_id, progres, baris, conn=None):
+    _update_job(conn, job_id, progres=progres, baris=baris)
+
+
+# kualitas: {stasiun: {aturan: jumlah}} disimpan bersama status selesai dalam satu transaksi
+def finish_job(job_id, baris, dibuang, stations, years, kualitas=None, conn=None):
+    with transaction(conn) as conn:
+        conn.executemany("INSERT OR REPLACE INTO validasi_upload (job_id, stasiun, aturan, jumlah) VALUES (?, ?, ?, ?)",
+                         [(job_id, stasiun, aturan, jumlah) for stasiun, counts in (kualitas or {}).items()
+                          for aturan, jumlah in counts.items()])
+        _set_job_fields(conn, job_id, status='selesai', progres=1.0, baris=baris, dibuang=dibuang,
+                        hasil_stasiun=', '.join(stations), hasil_tahun=', '.join(map(str, years)))
+
+
+def fail_job(job_id, pesan, conn=None):
+    _update_job(conn, job_id, status='gagal', pesan=pesan)
+
+
+# Job berdasarkan id, atau job terbaru milik username (semua pengguna jika None)
+def load_jobs(ids=None, username=None, limit=20, conn=None):
+    query = f"SELECT {', '.join(JOB_COLUMNS)} FROM antrian_upload"
+    if ids is not None:
+        query += f" WHERE id IN ({', '.join(['?'] * len(ids))})"
+        params = list(ids)
+    elif username is not None:
+        query += " WHERE username=?"
+        params = [username]
+    else:
+        params = []
+    query += " ORDER BY id DESC LIMIT ?"
+    with connect(conn) as conn:
+        return pd.read_sql(query, conn, params=params + [limit])
+
+
+# Hitungan kualitas data job upload: kolom job_id, stasiun, aturan, jumlah
+def load_job_quality(ids, conn=None):
+    query = f'''SELECT job_id, stasiun, aturan, jumlah FROM validasi_upload
+                 WHERE job_id IN ({', '.join(['?'] * len(ids))}) ORDER BY job_id, stasiun'''
+    with connect(conn) as conn:
+        return pd.read_sql(query, conn, params=list(ids))
+
+
+# (id, host, pid, instans, basi, stasiun, berkas, isi_celah) job yang belum selesai;
+# basi = detak terakhir lebih lama dari stale_seconds (atau tidak ada)
+def unfinished_jobs(stale_seconds, conn=None):
+    with connect(conn) as conn:
+        return conn.execute(f'''SELECT id, host, pid, instans, COALESCE(detak, '') < datetime('now', ?),
+                                       stasiun, berkas, isi_celah
+                                FROM antrian_upload WHERE status IN {ACTIVE_JOB_STATUSES} ORDER BY id''',
+                            (f'-{int(stale_seconds)} seconds',)).fetchall()
+
+
+def load_monthly_stats(tahun, threshold, stasiun=DEFAULT_STATION, conn=None):
+    with connect(conn) as conn:
+        return aggregates.read_monthly_stats(conn, stasiun, tahun, threshold)
+
+
+def load_yearly_stats(stasiun=DEFAULT_STATION, conn=None):
+    with connect(conn) as conn:
+        return aggregates.read_yearly_stats(conn, stasiun)
+
+
+# Tahun yang punya data beserta versi data terakhir yang mengubahnya, {tahun: versi}.
+# Tahun yang tidak ditulis sejak tabel versi_tahun dibuat bernilai 0.
+def load_year_versions(stasiun=DEFAULT_STATION, conn=None):
+    query = '''SELECT t.tahun, COALESCE(v.versi, 0) FROM tma_tahunan t
+               LEFT JOIN versi_tahun v ON v.stasiun = t.stasiun AND v.tahun = t.tahun
+               WHERE t.stasiun = ? ORDER BY t.tahun'''
+    with connect(conn) as conn:
+        return dict(conn.execute(query, (stasiun,)).fetchall())
+
+
+def load_yearly_floods(threshold, stasiun=DEFAULT_STATION, conn=None):
+    with connect(conn) as conn:
+        return aggregates.read_yearly_floods(conn, stasiun, threshold)
+
+
+def load_monthly_floods(threshold, stasiun=DEFAULT_STATION, conn=None):
+    with connect(conn) as conn:
+        return aggregates.read_monthly_floods(conn, stasiun, threshold)
+
+
+def load_all_yearly_floods(threshold, conn=None):
+    with connect(conn) as conn:
+        return aggregates.read_all_yearly_floods(conn, threshold)
+
+
+def load_all_monthly_floods(threshold, conn=None):
+    with connect(conn) as conn:
+        return aggregates.read_all_monthly_floods(conn, threshold)
+
+
+def load_telemetry(stasiun, level, start, end, conn=None):
+    with connect(conn) as conn:
+        return telemetry.read_level(conn, stasiun, level, start, end)
+
+
+def telemetry_range(stasiun=DEFAULT_STATION, conn=None):
+    with connect(conn) as conn:
+        return telemetry.read_range(conn, stasiun)
+
+
+# {stasiun: (threshold, laju_naik)} untuk mesin peringatan
+def load_alert_settings(conn=None):
+    with connect(conn) as conn:
+        return alerts.read_settings(conn)
+
+
+def set_alert_setting(stasiun, threshold, laju_naik=None, conn=None):
+    with transaction(conn) as conn:
+        alerts.write_setting(conn, stasiun, threshold, laju_naik)
+
+
+def load_flooding_states(conn=None):
+    with connect(conn) as conn:
+        return alerts.read_flooding(conn)
+
+
+def add_alerts(new_alerts, conn=None):
+    if not new_alerts:
+        return 0
+    with transaction(conn) as conn:
+        alerts.write_alerts(conn, new_alerts)
+    return len(new_alerts)
+
+
+def load_alerts(stasiun=None, limit=50, conn=None):
+    with connect(conn) as conn:
+        return alerts.read_alerts(conn, stasiun, limit)
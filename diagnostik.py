@@ -0,0 +1,39 @@
+import streamlit as st
+import profiling
+
+
+def _show_recorder(title, recorder, prefix):
+    st.subheader(title)
+    summary = recorder.summary()
+    if summary.empty:
+        st.info("Belum ada pengukuran. Aktifkan pengukuran lalu buka halaman lain.")
+        return
+
+    st.dataframe(summary.style.format({'total_s': '{:.4f}', 'p50_s': '{:.4f}', 'p95_s': '{:.4f}'}))
+    col1, col2, col3 = st.columns(3)
+    col1.download_button("⬇️ JSON", profiling.to_json(recorder), file_name=f"{prefix}.json",
+                         mime='application/json', key=f'{prefix}_json')
+    col2.download_button("⬇️ Prometheus", profiling.to_prometheus(recorder), file_name=f"{prefix}.prom",
+                         mime='text/plain', key=f'{prefix}_prom')
+    if col3.button("🗑️ Reset", key=f'{prefix}_reset'):
+        recorder.reset()
+        st.rerun()
+
+
+def show():
+    st.title("🩺 Diagnostik")
+
+    if st.session_state.get('role') != 'admin':
+        st.error("Halaman ini hanya untuk admin")
+        return
+
+    # Pengukuran berlaku untuk seluruh proses (semua sesi) selama aktif
+    enabled = st.checkbox("Aktifkan pengukuran waktu", value=profiling.is_enabled(), key='profiling_enabled')
+    if enabled != profiling.is_enabled():
+        profiling.set_enabled(enabled)
+
+    st.caption("Durasi dalam detik; p50/p95 dihitung dari "
+               f"{profiling.MAX_SAMPLES} pengukuran terakhir per operasi.")
+
+    _show_recorder("Sesi ini", st.session_state.profiling, 'profiling_sesi')
+    _show_recorder("Semua sesi (proses)", profiling.PROCESS, 'profiling_proses')
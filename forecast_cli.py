@@ -0,0 +1,105 @@
+# forecast_cli.py - Prediksi banjir tahunan secara batch tanpa Streamlit
+#
+# Contoh:
+#   python forecast_cli.py --windows 3 4 5 --thresholds 1.5 1.6 1.7 --output prediksi.csv
+#   python forecast_cli.py --csv data_tma.csv --output prediksi.json --workers 4
+#   python forecast_cli.py --ranking --models holt --workers 0 --output peringkat.csv
+import argparse
+import os
+import sys
+import pandas as pd
+import database
+import forecasting
+import models
+
+
+def load_from_db(db_path, stations=None):
+    database.use_database(db_path)
+    stations = stations or database.list_stations()
+    data = {}
+    for stasiun in stations:
+        df = database.load_tma(stasiun, columns=['tanggal', 'tma_max'])
+        if not df.empty:
+            data[stasiun] = (df['tanggal'].to_numpy(), df['tma_max'].to_numpy())
+    return data
+
+
+# CSV minimal berisi kolom tanggal dan tma_max (opsional: stasiun), format tanggal dd/mm/yyyy
+def load_from_csv(csv_path, stations=None):
+    df = pd.read_csv(csv_path, dtype=str)
+    if 'tanggal' not in df.columns or 'tma_max' not in df.columns:
+        raise ValueError("CSV harus memiliki kolom 'tanggal' dan 'tma_max'")
+    df['tanggal'] = pd.to_datetime(df['tanggal'], dayfirst=True, errors='coerce')
+    df['tma_max'] = pd.to_numeric(df['tma_max'].str.replace(',', '.'), errors='coerce')
+    if 'stasiun' not in df.columns:
+        df['stasiun'] = database.DEFAULT_STATION
+    df = df.dropna(subset=['tanggal', 'tma_max'])
+    if stations:
+        df = df[df['stasiun'].isin(stations)]
+    return {stasiun: (group['tanggal'].to_numpy(), group['tma_max'].to_numpy())
+            for stasiun, group in df.groupby('stasiun')}
+
+
+# Peringkat antar stasiun untuk model, window dan threshold pertama yang diberikan
+def station_ranking(data, model_name, window, threshold, workers=1):
+    monthly = []
+    for stasiun, (tanggal, tma_max) in data.items():
+        frame = models.monthly_floods_from_daily(tanggal, tma_max, threshold)
+        frame.insert(0, 'stasiun', stasiun)
+        monthly.append(frame)
+    all_monthly = pd.concat(monthly, ignore_index=True)
+    all_yearly = all_monthly.groupby(['stasiun', 'tahun'], as_index=False)['hari_banjir'].sum()
+    all_yearly = all_yearly.rename(columns={'hari_banjir': 'banjir'})
+    return forecasting.station_ranking(all_yearly, model_name, window, all_monthly, workers=workers)
+
+
+def write_output(result, output):
+    if output is None:
+        result.to_csv(sys.stdout, index=False)
+    elif output.endswith('.parquet'):
+        result.to_parquet(output, index=False)
+    elif output.endswith('.json'):
+        result.to_json(output, orient='records', indent=2)
+    else:
+        result.to_csv(output, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prediksi jumlah hari banjir tahunan (Moving Average) secara batch")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--db', default=database.DB_PATH, help="File database SQLite (default: %(default)s)")
+    source.add_argument('--csv', help="File CSV sebagai sumber data (kolom tanggal, tma_max, opsional stasiun)")
+    parser.add_argument('--stations', nargs='+', help="Stasiun yang diproses (default: semua)")
+    parser.add_argument('--windows', nargs='+', type=int, default=forecasting.DEFAULT_WINDOWS,
+                        help="Periode Moving Average (default: %(default)s)")
+    parser.add_argument('--thresholds', nargs='+', type=float, default=[forecasting.DEFAULT_THRESHOLD],
+                        help="Threshold banjir dalam meter (default: %(default)s)")
+    parser.add_argument('--models', nargs='+', default=forecasting.DEFAULT_MODELS,
+                        choices=list(models.MODELS), help="Model prediksi (default: %(default)s)")
+    parser.add_argument('--ranking', action='store_true',
+                        help="Tampilkan peringkat antar stasiun (model, window dan threshold pertama)")
+    parser.add_argument('--output', '-o', help="File hasil .csv / .parquet / .json (default: CSV ke stdout)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Jumlah proses paralel, 0 = semua core (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        data = load_from_csv(args.csv, args.stations)
+    else:
+        if not os.path.exists(args.db):
+            parser.error(f"Database tidak ditemukan: {args.db}")
+        data = load_from_db(args.db, args.stations)
+    if not data:
+        parser.error("Tidak ada data TMA yang bisa diproses")
+
+    workers = args.workers or os.cpu_count() or 1
+    if args.ranking:
+        result = station_ranking(data, args.models[0], args.windows[0], args.thresholds[0], workers=workers)
+    else:
+        result = forecasting.forecast_batch(data, args.windows, args.thresholds, workers=workers,
+                                            model_names=args.models)
+    write_output(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
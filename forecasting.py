@@ -0,0 +1,362 @@
+# forecasting.py - Inti prediksi banjir tahunan dan evaluasinya (tanpa Streamlit)
+import numpy as np
+import pandas as pd
+import models
+import profiling
+from thresholds import ThresholdSweep
+
+DEFAULT_THRESHOLD = 1.60
+DEFAULT_WINDOWS = [3, 4]
+DEFAULT_MODELS = ['sma']
+
+TABLE_COLUMNS = ['tahun', 'banjir', 'prediksi', 'error', 'absolute_error', 'mape']
+
+
+def calculate_moving_average(data, window=3):
+    return data.rolling(window=window, min_periods=1).mean()
+
+
+# MAPE (%) dengan mengabaikan nilai aktual 0; inf jika semua aktual 0
+def calculate_mape(actual, predicted):
+    actual = np.asarray(actual, dtype=np.float64)
+    predicted = np.asarray(predicted, dtype=np.float64)
+    mask = actual != 0
+    if mask.sum() == 0:
+        return float('inf')
+    return float(np.mean(np.abs(actual[mask] - predicted[mask]) / np.abs(actual[mask])) * 100)
+
+
+# Jumlah hari banjir per tahun (kolom: tahun, banjir) dari deret harian
+def yearly_flood_counts(tanggal, tma_max, threshold=DEFAULT_THRESHOLD):
+    sweep = ThresholdSweep.by_year(tanggal, tma_max)
+    counts = sweep.sweep([threshold])[:, 0]
+    return pd.DataFrame({'tahun': sweep.buckets.astype(int), 'banjir': counts})
+
+
+# Tabel prediksi seperti di halaman Prediksi dari array prediksi model
+# (panjang jumlah tahun + 1; elemen terakhir = prediksi tahun berikutnya)
+def forecast_table(yearly_floods, predictions):
+    table = yearly_floods[['tahun', 'banjir']].astype({'banjir': float}).reset_index(drop=True)
+    table['prediksi'] = predictions[:-1]
+
+    if not np.isnan(predictions[-1]):
+        next_row = {
+            'tahun': table['tahun'].max() + 1,
+            'banjir': np.nan,
+            'prediksi': predictions[-1]
+        }
+        table = pd.concat([table, pd.DataFrame([next_row])], ignore_index=True)
+
+    table['error'] = table['banjir'] - table['prediksi']
+    table['absolute_error'] = table['error'].abs()
+    table['mape'] = (table['absolute_error'] / table['banjir']) * 100
+    return table[TABLE_COLUMNS]
+
+
+@profiling.timed('forecast.model_table')
+def model_table(data, yearly_floods, model_name, window):
+    return forecast_table(yearly_floods, models.get_model(model_name).predict(data, window))
+
+
+# prediksi_t = rata-rata `window` tahun sebelumnya
+def moving_average_table(yearly_floods, window):
+    return model_table(models.model_data(yearly_floods), yearly_floods, 'sma', window)
+
+
+# State prediksi satu (model, window) yang diperbarui inkremental saat jumlah banjir tahunan berubah.
+# Untuk model dengan kernel jendela (SMA, WMA) disimpan jumlah berbobot per jendela dan akumulator
+# error: perubahan satu tahun hanya menyentuh `window` prediksi sesudahnya, tahun baru di akhir hanya
+# menambah satu prediksi. Model lain, atau tahun yang hilang/disisipkan, dihitung ulang penuh.
+class ForecastState:
+    def __init__(self, model_name, window):
+        self.model = models.get_model(model_name)
+        self.window = window
+        self.kernel = self.model.kernel(window)
+        self.years = np.array([], dtype=np.int64)
+        self.counts = np.array([], dtype=np.float64)
+        self.predictions = np.full(1, np.nan)
+        self._sums = np.full(1, np.nan)
+        self._result = None
+        self._reset_errors()
+
+    def _reset_errors(self):
+        self._abs_sum = 0.0
+        self._eval_rows = 0
+        self._ape_sum = 0.0
+        self._ape_rows = 0
+        self._ape_inf = 0
+
+    # Tambah (sign=1) atau keluarkan (sign=-1) kontribusi error tahun ke-i, sama seperti evaluate()
+    def _accumulate(self, i, sign):
+        if i >= len(self.counts) or np.isnan(self.predictions[i]):
+            return
+        actual = self.counts[i]
+        abs_error = abs(actual - self.predictions[i])
+        self._abs_sum += sign * abs_error
+        self._eval_rows += sign
+        if actual == 0:
+            if abs_error == 0:
+                return
+            self._ape_inf += sign
+        else:
+            self._ape_sum += sign * abs_error / actual * 100
+        self._ape_rows += sign
+
+    # Jumlah berbobot jendela untuk prediksi indeks j (j = jumlah tahun: tahun berikutnya)
+    def _window_sum(self, j):
+        if j < self.window:
+            return np.nan
+        return float(np.dot(self.counts[j - self.window:j], self.kernel))
+
+    # Hitung ulang penuh dari tabel tahunan (dan bulanan untuk model musiman)
+    def rebuild(self, yearly_floods, monthly_floods=None):
+        data = models.model_data(yearly_floods, monthly_floods)
+        self.years, self.counts = data.years, data.counts.copy()
+        if self.kernel is None:
+            self.predictions = self.model.predict(data, self.window)
+        else:
+            self._sums = np.array([self._window_sum(j) for j in range(len(self.counts) + 1)])
+            self.predictions = self._sums / self.kernel.sum()
+        self._reset_errors()
+        for i in range(len(self.counts)):
+            self._accumulate(i, 1)
+        self._result = None
+
+    def _set_count(self, i, value):
+        n = len(self.counts)
+        affected = range(i + 1, min(i + self.window, n) + 1)
+        rows = [i] + [j for j in affected if j < n]
+        for row in rows:
+            self._accumulate(row, -1)
+        delta = value - self.counts[i]
+        self.counts[i] = value
+        for j in affected:
+            if j >= self.window:
+                self._sums[j] += delta * self.kernel[i - (j - self.window)]
+                self.predictions[j] = self._sums[j] / self.kernel.sum()
+        for row in rows:
+            self._accumulate(row, 1)
+
+    # Prediksi tahun berikutnya yang lama menjadi prediksi tahun baru; satu prediksi baru ditambahkan
+    def _append(self, year, value):
+        n = len(self.counts)
+        self.years = np.append(self.years, year)
+        self.counts = np.append(self.counts, value)
+        self._accumulate(n, 1)
+        self._sums = np.append(self._sums, self._window_sum(n + 1))
+        self.predictions = np.append(self.predictions, self._sums[-1] / self.kernel.sum())
+
+    # Perbarui state dari jumlah banjir tahunan terbaru; mengembalikan tahun yang dihitung ulang
+    def update(self, yearly_floods, monthly_floods=None):
+        years = yearly_floods['tahun'].to_numpy(dtype=np.int64)
+        counts = yearly_floods['banjir'].to_numpy(dtype=np.float64)
+        n = len(self.years)
+        if (self.kernel is None or n == 0 or len(years) < n or not np.array_equal(years[:n], self.years)):
+            self.rebuild(yearly_floods, monthly_floods)
+            return years.tolist()
+
+        changed = np.flatnonzero(counts[:n] != self.counts)
+        for i in changed:
+            self._set_count(i, counts[i])
+        for i in range(n, len(years)):
+            self._append(years[i], counts[i])
+        if len(changed) or len(years) > n:
+            self._result = None
+        return years[changed].tolist() + years[n:].tolist()
+
+    # (tabel prediksi, baris evaluasi, MAE, MAPE) seperti model_table() + evaluate(); di-cache
+    # sampai update berikutnya mengubah data
+    def result(self):
+        if self._result is None:
+            table = forecast_table(pd.DataFrame({'tahun': self.years, 'banjir': self.counts}), self.predictions)
+            eval_data = table.dropna(subset=['prediksi', 'banjir'])
+            mae = self._abs_sum / self._eval_rows if self._eval_rows else np.nan
+            if not self._ape_rows:
+                mape = np.nan
+            elif self._ape_inf:
+                mape = float('inf')
+            else:
+                mape = self._ape_sum / self._ape_rows
+            self._result = (table, eval_data, mae, mape)
+        return self._result
+
+
+# Baris yang punya nilai aktual dan prediksi, beserta MAE dan MAPE rata-ratanya
+def evaluate(table):
+    eval_data = table.dropna(subset=['prediksi', 'banjir'])
+    mae = eval_data['absolute_error'].mean()
+    mape = eval_data['mape'].mean()
+    return eval_data, mae, mape
+
+
+def mape_category(mape):
+    if mape < 10:
+        return "SANGAT AKURAT <10%", "green"
+    elif mape < 20:
+        return "BAIK 10-20%", "blue"
+    elif mape < 50:
+        return "CUKUP 20-50%", "orange"
+    return "TIDAK AKURAT >50%", "red"
+
+
+# Ringkasan satu kombinasi: prediksi tahun depan dan metrik evaluasi
+def forecast_summary(table, n_years):
+    eval_data, mae, mape = evaluate(table)
+    has_next = len(table) > n_years
+    return {
+        'tahun_prediksi': int(table['tahun'].iloc[-1]) if has_next else None,
+        'prediksi': float(table['prediksi'].iloc[-1]) if has_next else np.nan,
+        'mae': float(mae) if len(eval_data) else np.nan,
+        'mape': float(mape) if len(eval_data) else np.nan,
+        'jumlah_tahun_evaluasi': len(eval_data),
+    }
+
+
+# Bandingkan semua model terdaftar dengan evaluasi MAE/MAPE yang sama
+@profiling.timed('forecast.compare_models')
+def compare_models(data, yearly_floods, window, model_names=None):
+    rows = []
+    for name in model_names or list(models.MODELS):
+        model = models.get_model(name)
+        if model.needs_monthly and data.monthly_floods is None:
+            continue
+        row = {'model': name, 'label': model.label}
+        row.update(forecast_summary(model_table(data, yearly_floods, name, window), len(yearly_floods)))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+# Prediksi satu stasiun untuk semua kombinasi model x window x threshold.
+# Fungsi tingkat modul agar bisa dijalankan di process pool.
+def forecast_station(stasiun, tanggal, tma_max, windows=DEFAULT_WINDOWS, thresholds=(DEFAULT_THRESHOLD,),
+                     model_names=DEFAULT_MODELS):
+    rows = []
+    for threshold in thresholds:
+        data = models.model_data_from_daily(tanggal, tma_max, threshold)
+        yearly_floods = pd.DataFrame({'tahun': data.years, 'banjir': data.counts})
+        for name in model_names:
+            model = models.get_model(name)
+            for window in (windows if model.uses_window else windows[:1]):
+                table = model_table(data, yearly_floods, name, window)
+                row = {'stasiun': stasiun, 'model': name, 'threshold': float(threshold),
+                       'window': int(window) if model.uses_window else None}
+                row.update(forecast_summary(table, len(yearly_floods)))
+                rows.append(row)
+    return rows
+
+
+# Jalankan prediksi untuk banyak stasiun; data = {stasiun: (tanggal, tma_max)}
+def forecast_batch(data, windows=DEFAULT_WINDOWS, thresholds=(DEFAULT_THRESHOLD,), workers=1,
+                   model_names=DEFAULT_MODELS):
+    windows = list(windows)
+    thresholds = list(thresholds)
+    model_names = list(model_names)
+    rows = []
+    if workers > 1 and len(data) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(forecast_station, stasiun, tanggal, tma_max, windows, thresholds, model_names)
+                       for stasiun, (tanggal, tma_max) in data.items()]
+            for future in futures:
+                rows.extend(future.result())
+    else:
+        for stasiun, (tanggal, tma_max) in data.items():
+            rows.extend(forecast_station(stasiun, tanggal, tma_max, windows, thresholds, model_names))
+    result = pd.DataFrame(rows)
+    if 'window' in result:
+        result['window'] = result['window'].astype('Int64')
+    return result
+
+
+# Tabel prediksi (tahun, banjir, prediksi) satu stasiun untuk satu model.
+# Fungsi tingkat modul agar bisa dijalankan di process pool.
+def station_predictions(stasiun, yearly_floods, monthly_floods, model_name, window):
+    data = models.model_data(yearly_floods, monthly_floods)
+    table = model_table(data, yearly_floods, model_name, window)[['tahun', 'banjir', 'prediksi']]
+    table.insert(0, 'stasiun', stasiun)
+    return table
+
+
+# Moving Average untuk semua stasiun sekaligus: satu cumsum atas tabel panjang terurut
+# (stasiun, tahun); posisi dalam grup memastikan jendela tidak melewati batas stasiun.
+def _sma_all_stations(all_yearly, window):
+    frame = all_yearly[['stasiun', 'tahun', 'banjir']].sort_values(['stasiun', 'tahun'], kind='stable')
+    frame = frame.astype({'banjir': float}).reset_index(drop=True)
+    counts = frame['banjir'].to_numpy()
+    position = frame.groupby('stasiun', sort=False).cumcount().to_numpy()
+    cumsum = np.concatenate([[0.0], np.cumsum(counts)])
+
+    rows = np.flatnonzero(position >= window)
+    predictions = np.full(len(frame), np.nan)
+    predictions[rows] = (cumsum[rows] - cumsum[rows - window]) / window
+    frame['prediksi'] = predictions
+
+    # Prediksi tahun berikutnya dari `window` tahun terakhir tiap stasiun
+    last = frame.groupby('stasiun', sort=False).tail(1)
+    last = last[position[last.index] + 1 >= window]
+    end = last.index.to_numpy() + 1
+    next_rows = pd.DataFrame({
+        'stasiun': last['stasiun'].to_numpy(),
+        'tahun': last['tahun'].to_numpy() + 1,
+        'banjir': np.nan,
+        'prediksi': (cumsum[end] - cumsum[end - window]) / window,
+    })
+    return pd.concat([frame, next_rows], ignore_index=True)
+
+
+# Ringkasan per stasiun dari tabel prediksi panjang, sama dengan forecast_summary per stasiun
+def summarize_stations(predictions):
+    eval_data = predictions.dropna(subset=['prediksi', 'banjir'])
+    absolute_error = (eval_data['banjir'] - eval_data['prediksi']).abs()
+    metrics = pd.DataFrame({
+        'stasiun': eval_data['stasiun'],
+        'mae': absolute_error,
+        'mape': absolute_error / eval_data['banjir'] * 100,
+    }).groupby('stasiun').agg(mae=('mae', 'mean'), mape=('mape', 'mean'),
+                              jumlah_tahun_evaluasi=('mae', 'size'))
+    next_year = predictions[predictions['banjir'].isna() & predictions['prediksi'].notna()]
+    next_year = next_year.set_index('stasiun')[['tahun', 'prediksi']].rename(columns={'tahun': 'tahun_prediksi'})
+
+    stations = pd.Index(predictions['stasiun'].unique(), name='stasiun')
+    summary = next_year.reindex(stations).join(metrics)
+    summary['jumlah_tahun_evaluasi'] = summary['jumlah_tahun_evaluasi'].fillna(0).astype(int)
+    summary['tahun_prediksi'] = summary['tahun_prediksi'].astype('Int64')
+    return summary.reset_index()
+
+
+# Peringkat antar stasiun berdasarkan prediksi hari banjir tahun berikutnya (terbanyak di atas).
+# all_yearly: kolom stasiun, tahun, banjir untuk semua stasiun; all_monthly hanya dipakai model
+# yang membutuhkan data bulanan. Moving Average dihitung vektor untuk semua stasiun sekaligus,
+# model lain per stasiun (opsional paralel dengan workers > 1).
+@profiling.timed('forecast.station_ranking')
+def station_ranking(all_yearly, model_name='sma', window=3, all_monthly=None, workers=1):
+    columns = ['peringkat', 'stasiun', 'tahun_prediksi', 'prediksi', 'mae', 'mape', 'jumlah_tahun_evaluasi']
+    if all_yearly.empty:
+        return pd.DataFrame(columns=columns)
+
+    model = models.get_model(model_name)
+    if model_name == 'sma':
+        predictions = _sma_all_stations(all_yearly, window)
+    else:
+        monthly_groups = {}
+        if model.needs_monthly and all_monthly is not None:
+            monthly_groups = {stasiun: group.drop(columns='stasiun')
+                              for stasiun, group in all_monthly.groupby('stasiun')}
+        tasks = [(stasiun, group[['tahun', 'banjir']].reset_index(drop=True), monthly_groups.get(stasiun),
+                  model_name, window)
+                 for stasiun, group in all_yearly.groupby('stasiun')]
+        if workers > 1 and len(tasks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                tables = list(pool.map(station_predictions, *zip(*tasks)))
+        else:
+            tables = [station_predictions(*task) for task in tasks]
+        predictions = pd.concat(tables, ignore_index=True)
+
+    ranking = summarize_stations(predictions)
+    ranking = ranking.sort_values(['prediksi', 'mape'], ascending=[False, True], na_position='last',
+                                  kind='stable').reset_index(drop=True)
+    ranking['peringkat'] = np.arange(1, len(ranking) + 1)
+    return ranking[columns]
@@ -0,0 +1,200 @@
+# ingestion.py - Pembacaan file upload TMA secara bertahap (per chunk)
+import warnings
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import database
+import profiling
+import quality
+
+CHUNK_SIZE = 50000
+REQUIRED_COLUMNS = database.TMA_COLUMNS
+NUMERIC_COLUMNS = database.NUMERIC_COLUMNS
+# Format telemetri: satu bacaan per baris dengan waktu (tanggal + jam) dari logger otomatis
+TELEMETRY_COLUMNS = ['waktu', 'tma']
+
+STATION_COLUMN = 'stasiun'
+
+# kualitas: {stasiun: {aturan: jumlah pelanggaran}} (lihat quality.RULES)
+IngestResult = namedtuple('IngestResult', ['rows', 'dropped', 'years', 'stations', 'kualitas'])
+
+
+# Format file: 'harian' (bacaan manual jam 06/12/18) atau 'telemetri' (waktu, tma)
+def detect_format(columns):
+    if all(col in columns for col in REQUIRED_COLUMNS):
+        return 'harian'
+    if all(col in columns for col in TELEMETRY_COLUMNS):
+        return 'telemetri'
+    raise ValueError("Format file tidak sesuai. Pastikan kolom yang diperlukan ada.")
+
+
+def _file_size(uploaded_file):
+    size = getattr(uploaded_file, 'size', None)
+    if size is None:
+        pos = uploaded_file.tell()
+        uploaded_file.seek(0, 2)
+        size = uploaded_file.tell()
+        uploaded_file.seek(pos)
+    return size or None
+
+
+# CSV dibaca per chunk sebagai teks, konversi dilakukan di normalize_chunk
+def iter_csv_chunks(uploaded_file, chunksize=CHUNK_SIZE):
+    size = _file_size(uploaded_file)
+    reader = pd.read_csv(uploaded_file, chunksize=chunksize, dtype=str)
+    for chunk in reader:
+        detect_format(chunk.columns)
+        fraction = uploaded_file.tell() / size if size else None
+        yield chunk, fraction
+
+
+# Excel dibaca dengan mode read-only openpyxl (streaming baris demi baris)
+def iter_excel_chunks(uploaded_file, chunksize=CHUNK_SIZE):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        total_rows = ws.max_row - 1 if ws.max_row else None
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(col).strip() if col is not None else '' for col in header]
+        detect_format(header)
+
+        batch = []
+        done = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunksize:
+                done += len(batch)
+                yield pd.DataFrame.from_records(batch, columns=header), _fraction(done, total_rows)
+                batch = []
+        if batch:
+            done += len(batch)
+            yield pd.DataFrame.from_records(batch, columns=header), _fraction(done, total_rows)
+    finally:
+        wb.close()
+
+
+def _fraction(done, total):
+    return min(done / total, 1.0) if total else None
+
+
+def _parse_dates(values, fmt='%d/%m/%Y'):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+    # Fallback hanya untuk baris yang tidak sesuai format utama
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            parsed[retry] = pd.to_datetime(values[retry], dayfirst=True, errors='coerce')
+    return parsed
+
+
+# Normalisasi satu chunk: tanggal diparse sekali, koma desimal diganti sekaligus,
+# baris yang tidak valid dibuang. Kolom stasiun (opsional) ikut dipertahankan.
+@profiling.timed('upload.normalize')
+def normalize_chunk(chunk):
+    columns = REQUIRED_COLUMNS + ([STATION_COLUMN] if STATION_COLUMN in chunk.columns else [])
+    chunk = _normalize_stations(chunk[columns].copy())
+    chunk['tanggal'] = _parse_dates(chunk['tanggal'])
+
+    text_cols = [col for col in NUMERIC_COLUMNS if not pd.api.types.is_numeric_dtype(chunk[col])]
+    if text_cols:
+        chunk[text_cols] = chunk[text_cols].replace(',', '.', regex=True)
+    chunk[NUMERIC_COLUMNS] = chunk[NUMERIC_COLUMNS].apply(pd.to_numeric, errors='coerce')
+
+    valid = chunk.notna().all(axis=1)
+    return chunk[valid], int((~valid).sum())
+
+
+def _normalize_stations(chunk):
+    if STATION_COLUMN in chunk.columns:
+        names = chunk[STATION_COLUMN].astype('string').str.strip()
+        chunk[STATION_COLUMN] = names.mask(names == '')
+    return chunk
+
+
+# Normalisasi chunk telemetri: waktu dd/mm/yyyy HH:MM, tma dengan koma atau titik desimal
+@profiling.timed('upload.normalize_telemetry')
+def normalize_telemetry_chunk(chunk):
+    columns = TELEMETRY_COLUMNS + ([STATION_COLUMN] if STATION_COLUMN in chunk.columns else [])
+    chunk = _normalize_stations(chunk[columns].copy())
+    chunk['waktu'] = _parse_dates(chunk['waktu'], '%d/%m/%Y %H:%M')
+    if not pd.api.types.is_numeric_dtype(chunk['tma']):
+        chunk['tma'] = chunk['tma'].replace(',', '.', regex=True)
+    chunk['tma'] = pd.to_numeric(chunk['tma'], errors='coerce')
+
+    valid = chunk.notna().all(axis=1)
+    return chunk[valid], int((~valid).sum())
+
+
+# Pecah chunk per stasiun: kolom stasiun pada file diutamakan, jika tidak ada
+# semua baris masuk ke stasiun yang dipilih saat upload
+def split_stations(clean, stasiun):
+    if STATION_COLUMN not in clean.columns:
+        return [(stasiun, clean)]
+    return [(name, group.drop(columns=STATION_COLUMN)) for name, group in clean.groupby(STATION_COLUMN, sort=False)]
+
+
+# Baca, validasi dan simpan file upload chunk demi chunk.
+# Setiap chunk ditulis dalam satu transaksi per stasiun lewat penulis bersama (database.transaction),
+# sehingga upload lain dan pembaca bisa bergantian di antara chunk; progress(fraction, rows) dipanggil per chunk.
+# Aturan kualitas per baris dihitung per chunk; tanggal ganda, celah dan pencilan diperiksa setelah
+# semua chunk tersimpan pada rentang tanggal file (fill_gaps: isi celah pendek dengan interpolasi).
+@profiling.timed('upload.total')
+def ingest_file(uploaded_file, stasiun=database.DEFAULT_STATION, chunksize=CHUNK_SIZE, progress=None,
+                fill_gaps=False):
+    try:
+        if uploaded_file.name.endswith('.csv'):
+            chunks = iter_csv_chunks(uploaded_file, chunksize)
+        else:
+            chunks = iter_excel_chunks(uploaded_file, chunksize)
+
+        rows = 0
+        dropped = 0
+        years = set()
+        stations = set()
+        kualitas = {}
+        # Rentang tanggal per stasiun, dan hari (sejak epoch) setiap baris harian untuk menghitung tanggal ganda
+        ranges = {}
+        days = {}
+        for chunk, fraction in chunks:
+            if detect_format(chunk.columns) == 'telemetri':
+                clean, n_dropped = normalize_telemetry_chunk(chunk)
+                upsert, date_column = database.upsert_telemetry, 'waktu'
+            else:
+                clean, n_dropped = normalize_chunk(chunk)
+                upsert, date_column = database.upsert_tma, 'tanggal'
+            dropped += n_dropped
+            for name, group in split_stations(clean, stasiun):
+                if group.empty:
+                    continue
+                upsert(group, name)
+                rows += len(group)
+                stations.add(name)
+                years.update(group[date_column].dt.year.unique().tolist())
+                quality.add_counts(kualitas, name, quality.row_counts(group))
+                day = group[date_column].to_numpy().astype('datetime64[D]')
+                lo, hi = ranges.get(name, (day.min(), day.max()))
+                ranges[name] = (min(lo, day.min()), max(hi, day.max()))
+                if date_column == 'tanggal':
+                    days.setdefault(name, []).append(day.astype(np.int64))
+            if progress is not None:
+                progress(fraction, rows)
+
+        for name, (start, end) in ranges.items():
+            report = quality.check_stored(name, start, end, fill=fill_gaps)
+            counts = {rule: report.jumlah[rule] for rule in quality.SERIES_RULES}
+            if name in days:
+                counts['tanggal_ganda'] = quality.duplicate_count(np.concatenate(days[name]))
+            quality.add_counts(kualitas, name, counts)
+
+        return IngestResult(rows, dropped, sorted(years), sorted(stations), kualitas)
+
+    except Exception as e:
+        raise ValueError(f"Gagal memproses file: {str(e)}")
@@ -0,0 +1,168 @@
+# jobs.py - Antrian upload di latar belakang: file diproses oleh pool thread, status di tabel antrian_upload
+#
+# File upload disalin ke folder spool di samping database saat job dibuat (bukan ke memori, sehingga
+# antrian panjang tidak menahan isi semua file) dan dihapus setelah diproses. Proses tetap berjalan
+# walaupun pengguna pindah halaman; job milik proses yang berhenti dilanjutkan dari salinan tersebut.
+# Halaman cukup membaca status, progres dan hasil job dari database.
+#
+# Setiap proses (start(), dipanggil app.py saat proses dimulai) memperbarui detak job miliknya dan
+# memeriksa job yang ditinggal: pemilik di host yang sama dengan pid yang sudah mati, atau detak yang
+# tidak diperbarui selama STALE_SECONDS (pemilik di host/container lain, atau pid sudah dipakai ulang).
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import database
+import ingestion
+import snapshot
+
+# Jumlah file yang diproses bersamaan
+WORKERS = 2
+INTERRUPTED_MESSAGE = "Proses aplikasi berhenti sebelum upload selesai. Silakan upload ulang file."
+SPOOL_SUFFIX = '.upload'
+# Interval detak dan pemeriksaan job yang ditinggal, dan batas umur detak (detik)
+HEARTBEAT_SECONDS = 10
+STALE_SECONDS = 60
+
+
+def _boot_id():
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+# pid hanya bermakna di host (namespace PID) dan boot yang sama; INSTANCE_ID membedakan proses baru
+# yang kebetulan mendapat pid yang sama dengan proses lama
+HOST_ID = f"{socket.gethostname()}/{_boot_id()}"
+INSTANCE_ID = uuid.uuid4().hex
+
+_executor = None
+_executor_lock = threading.Lock()
+_monitor = None
+
+
+def _pid_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Folder salinan file upload, di samping file database yang sedang dipakai
+def spool_dir():
+    return database.DB_PATH + SPOOL_SUFFIX
+
+
+def _remove(path):
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _abandoned(host, pid, instans, stale):
+    if instans == INSTANCE_ID:
+        return False
+    return bool(stale) or (host == HOST_ID and not _pid_alive(pid))
+
+
+# Job aktif yang ditinggal pemiliknya: dilanjutkan jika salinan filenya masih ada,
+# selain itu ditandai gagal. Mengembalikan (id dilanjutkan, id gagal).
+def recover_interrupted(executor):
+    resumed, failed = [], []
+    for job_id, host, pid, instans, stale, stasiun, berkas, isi_celah in database.unfinished_jobs(STALE_SECONDS):
+        if not _abandoned(host, pid, instans, stale):
+            continue
+        if not database.claim_job(job_id, instans, HOST_ID, os.getpid(), INSTANCE_ID):
+            continue
+        if berkas and os.path.exists(berkas):
+            executor.submit(_run, job_id, berkas, stasiun, bool(isi_celah))
+            resumed.append(job_id)
+        else:
+            database.fail_job(job_id, INTERRUPTED_MESSAGE)
+            _remove(berkas)
+            failed.append(job_id)
+    return resumed, failed
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='upload')
+        return _executor
+
+
+def _watch():
+    while True:
+        try:
+            database.heartbeat_jobs(INSTANCE_ID)
+            recover_interrupted(_get_executor())
+        except Exception as e:
+            print(f"Gagal memeriksa antrian upload: {str(e)}", file=sys.stderr)
+        time.sleep(HEARTBEAT_SECONDS)
+
+
+# Mulai thread detak/pemulihan sekali per proses; pemanggilan berikutnya tidak melakukan apa-apa
+def start():
+    global _monitor
+    with _executor_lock:
+        if _monitor is None:
+            _monitor = threading.Thread(target=_watch, name='upload-monitor', daemon=True)
+            _monitor.start()
+
+
+# Ekstensi dipertahankan karena ingestion memilih pembaca CSV/Excel dari nama file
+def _spool(uploaded_file):
+    os.makedirs(spool_dir(), exist_ok=True)
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(dir=spool_dir(), suffix=os.path.splitext(uploaded_file.name)[1],
+                                     delete=False) as spool:
+        shutil.copyfileobj(uploaded_file, spool)
+    return spool.name
+
+
+def _run(job_id, berkas, stasiun, fill_gaps=False):
+    try:
+        database.start_job(job_id)
+        with open(berkas, 'rb') as f:
+            result = ingestion.ingest_file(
+                f, stasiun, progress=lambda fraction, rows: database.update_job_progress(job_id, fraction, rows),
+                fill_gaps=fill_gaps)
+        # Mode multi-worker: snapshot baru siap sebelum job ditandai selesai
+        if snapshot.enabled():
+            snapshot.publish()
+    except Exception as e:
+        database.fail_job(job_id, str(e))
+    else:
+        database.finish_job(job_id, result.rows, result.dropped, result.stations, result.years, result.kualitas)
+    finally:
+        _remove(berkas)
+
+
+# Masukkan file upload ke antrian, mengembalikan id job (fill_gaps: isi celah pendek dengan interpolasi)
+def submit(uploaded_file, stasiun=database.DEFAULT_STATION, username=None, fill_gaps=False):
+    start()
+    executor = _get_executor()
+    berkas = _spool(uploaded_file)
+    try:
+        job_id = database.create_job(uploaded_file.name, stasiun, username, os.getpid(), berkas, fill_gaps,
+                                     HOST_ID, INSTANCE_ID)
+    except Exception:
+        _remove(berkas)
+        raise
+    executor.submit(_run, job_id, berkas, stasiun, fill_gaps)
+    return job_id
@@ -0,0 +1,56 @@
+import streamlit as st
+import data_access
+import database
+import forecasting
+import models
+import reports
+
+FORMAT_LABELS = {
+    'xlsx': "Excel (.xlsx)",
+    'pdf': "PDF",
+    'csv': "CSV (zip)",
+    'png': "Grafik PNG (zip)",
+}
+
+
+def show():
+    st.title("📄 Laporan")
+
+    stations = data_access.list_stations()
+    if not stations:
+        st.warning("⚠️ Silakan proses data TMA terlebih dahulu di halaman **Data TMA**.")
+        return
+
+    stasiun = st.session_state.get('stasiun', database.DEFAULT_STATION)
+    selected_stations = st.multiselect("Stasiun", stations, default=[stasiun] if stasiun in stations else stations[:1],
+                                       key='report_stations')
+    years = sorted({int(tahun) for name in selected_stations
+                    for tahun in data_access.load_yearly_stats(name)['tahun']})
+    selected_years = st.multiselect("Tahun", years, default=years, key='report_years')
+
+    col1, col2 = st.columns(2)
+    threshold = col1.slider("Threshold Banjir (meter)", 1.0, 3.0, forecasting.DEFAULT_THRESHOLD, 0.1,
+                            key='report_threshold')
+    model_labels = dict(models.model_options())
+    model_name = col2.selectbox("Model prediksi", list(model_labels), format_func=lambda name: model_labels[name],
+                                key='report_model')
+    col1, col2 = st.columns(2)
+    window = col1.selectbox("Periode Moving Average", [3, 4], key='report_window')
+    fmt = col2.selectbox("Format", reports.FORMATS, format_func=lambda name: FORMAT_LABELS[name],
+                         key='report_format')
+
+    if st.button("📝 Buat Laporan", type="primary", disabled=not (selected_stations and selected_years)):
+        try:
+            with st.spinner("Membuat laporan..."):
+                report = reports.generate(selected_stations, selected_years, threshold, model_name, window,
+                                          workers=reports.WORKERS)
+                st.session_state.report_file = (fmt, reports.export(report, fmt))
+            st.success(f"Laporan selesai: {report.dirender} bagian dibuat, "
+                       f"{report.dari_cache} bagian dipakai ulang dari cache.")
+        except ValueError as e:
+            st.error(f"Error: {str(e)}")
+
+    if 'report_file' in st.session_state:
+        fmt, content = st.session_state.report_file
+        st.download_button(f"⬇️ Unduh {FORMAT_LABELS[fmt]}", content,
+                           file_name=f"laporan_tma.{reports.EXTENSIONS[fmt]}", mime=reports.MIME_TYPES[fmt])
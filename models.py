@@ -0,0 +1,213 @@
+# models.py - Registry model prediksi jumlah hari banjir tahunan (NumPy, tanpa dependensi tambahan)
+#
+# Setiap model menerima ModelData dan window, lalu mengembalikan array prediksi sepanjang
+# jumlah tahun + 1: prediksi[i] adalah prediksi satu langkah untuk tahun ke-i (NaN jika belum
+# bisa diprediksi) dan elemen terakhir adalah prediksi tahun berikutnya.
+import calendar
+from collections import OrderedDict, namedtuple
+import numpy as np
+import pandas as pd
+from thresholds import ThresholdSweep
+
+# counts: (tahun,) jumlah hari banjir; monthly_floods / monthly_days: (tahun, 12) atau None
+ModelData = namedtuple('ModelData', ['years', 'counts', 'monthly_floods', 'monthly_days'])
+
+MODELS = OrderedDict()
+
+
+def register(cls):
+    MODELS[cls.name] = cls()
+    return cls
+
+
+def get_model(name):
+    return MODELS[name]
+
+
+def model_data(yearly_floods, monthly=None):
+    years = yearly_floods['tahun'].to_numpy(dtype=np.int64)
+    counts = yearly_floods['banjir'].to_numpy(dtype=np.float64)
+    if monthly is None:
+        return ModelData(years, counts, None, None)
+    floods = np.zeros((len(years), 12))
+    days = np.zeros((len(years), 12))
+    rows = np.searchsorted(years, monthly['tahun'].to_numpy())
+    found = (rows < len(years)) & (years[np.minimum(rows, len(years) - 1)] == monthly['tahun'].to_numpy())
+    cols = monthly['bulan'].to_numpy() - 1
+    floods[rows[found], cols[found]] = monthly['hari_banjir'].to_numpy()[found]
+    days[rows[found], cols[found]] = monthly['jumlah_hari'].to_numpy()[found]
+    return ModelData(years, counts, floods, days)
+
+
+# Hari banjir dan jumlah hari terukur per bulan dari deret harian
+# (kolom sama dengan aggregates.read_monthly_floods)
+def monthly_floods_from_daily(tanggal, tma_max, threshold):
+    sweep = ThresholdSweep.by_month(tanggal, tma_max)
+    keys = sweep.buckets.astype(np.int64)
+    return pd.DataFrame({
+        'tahun': keys // 100,
+        'bulan': keys % 100,
+        'hari_banjir': sweep.sweep([threshold])[:, 0],
+        'jumlah_hari': sweep.bucket_sizes(),
+    })
+
+
+def yearly_from_monthly(monthly):
+    return monthly.groupby('tahun', as_index=False)['hari_banjir'].sum().rename(columns={'hari_banjir': 'banjir'})
+
+
+# Bangun ModelData langsung dari deret harian (dipakai CLI / batch)
+def model_data_from_daily(tanggal, tma_max, threshold):
+    monthly = monthly_floods_from_daily(tanggal, tma_max, threshold)
+    return model_data(yearly_from_monthly(monthly), monthly)
+
+
+class Model:
+    name = None
+    label = None
+    uses_window = True
+    needs_monthly = False
+
+    def predict(self, data, window):
+        raise NotImplementedError
+
+    # Jumlah tahun minimal agar ada satu tahun yang bisa dievaluasi (tahun training + 1 tahun prediksi)
+    def min_years(self, window):
+        return window + 1
+
+    # Bobot jendela (tahun terlama -> terbaru) jika prediksi = sum(bobot * jumlah) / sum(bobot);
+    # None jika prediksi bergantung pada seluruh deret (tidak bisa diperbarui inkremental)
+    def kernel(self, window):
+        return None
+
+
+@register
+class SimpleMovingAverage(Model):
+    name = 'sma'
+    label = 'Moving Average'
+
+    def kernel(self, window):
+        return np.ones(window)
+
+    def predict(self, data, window):
+        counts = data.counts
+        predictions = np.full(len(counts) + 1, np.nan)
+        if len(counts) >= window:
+            cumsum = np.concatenate([[0.0], np.cumsum(counts)])
+            predictions[window:] = (cumsum[window:] - cumsum[:-window]) / window
+        return predictions
+
+
+# Bobot 1..window, tahun terbaru mendapat bobot terbesar
+@register
+class WeightedMovingAverage(Model):
+    name = 'wma'
+    label = 'Weighted Moving Average'
+
+    def kernel(self, window):
+        return np.arange(1, window + 1, dtype=np.float64)
+
+    def predict(self, data, window):
+        counts = data.counts
+        predictions = np.full(len(counts) + 1, np.nan)
+        if len(counts) >= window:
+            weights = np.arange(window, 0, -1, dtype=np.float64)
+            predictions[window:] = np.convolve(counts, weights, 'valid') / weights.sum()
+        return predictions
+
+
+# Bentuk tertutup: level_t = (1-a)^t c_0 + a * sum_k (1-a)^(t-k) c_k, alpha dipilih dari grid
+# dengan SSE prediksi satu langkah terkecil (semua alpha dihitung sekaligus)
+@register
+class ExponentialSmoothing(Model):
+    name = 'ses'
+    label = 'Exponential Smoothing'
+    uses_window = False
+    alphas = np.linspace(0.05, 0.95, 19)
+
+    def min_years(self, window):
+        return 2
+
+    def levels(self, counts, alphas):
+        n = len(counts)
+        t = np.arange(n)
+        lag = t[:, None] - t[None, :]
+        decay = 1.0 - alphas[:, None, None]
+        weights = np.where(lag >= 0, alphas[:, None, None] * decay ** np.maximum(lag, 0), 0.0)
+        weights[:, :, 0] = decay[:, :, 0] ** t[None, :]
+        return weights @ counts
+
+    def predict(self, data, window):
+        counts = data.counts
+        predictions = np.full(len(counts) + 1, np.nan)
+        if len(counts) < 2:
+            return predictions
+        levels = self.levels(counts, self.alphas)
+        sse = ((levels[:, :-1] - counts[None, 1:]) ** 2).sum(axis=1)
+        predictions[1:] = levels[np.argmin(sse)]
+        return predictions
+
+
+# Holt linear trend; recursi per tahun, semua kombinasi (alpha, beta) dihitung sekaligus
+@register
+class HoltLinearTrend(Model):
+    name = 'holt'
+    label = 'Holt Linear Trend'
+    uses_window = False
+    grid = np.linspace(0.1, 0.9, 9)
+
+    def min_years(self, window):
+        return 3
+
+    def predict(self, data, window):
+        counts = data.counts
+        n = len(counts)
+        predictions = np.full(n + 1, np.nan)
+        if n < 3:
+            return predictions
+        alpha, beta = (g.ravel() for g in np.meshgrid(self.grid, self.grid, indexing='ij'))
+        level = np.full(alpha.shape, counts[0])
+        trend = np.full(alpha.shape, counts[1] - counts[0])
+        fitted = np.empty((n + 1, len(alpha)))
+        fitted[:2] = np.nan
+        for t in range(1, n):
+            previous = level
+            level = alpha * counts[t] + (1 - alpha) * (level + trend)
+            trend = beta * (level - previous) + (1 - beta) * trend
+            fitted[t + 1] = np.maximum(level + trend, 0.0)
+        sse = ((fitted[2:n] - counts[2:, None]) ** 2).sum(axis=0)
+        predictions[2:] = fitted[2:, np.argmin(sse)]
+        return predictions
+
+
+# Musiman bulanan: peluang banjir per bulan dari `window` tahun sebelumnya (hari banjir /
+# hari terukur), lalu dijumlahkan menjadi hari banjir tahunan. Tahun evaluasi memakai jumlah
+# hari terukur tahun tersebut; tahun berikutnya memakai jumlah hari kalender penuh.
+@register
+class MonthlySeasonal(Model):
+    name = 'seasonal'
+    label = 'Musiman Bulanan'
+    needs_monthly = True
+
+    def predict(self, data, window):
+        floods, days = data.monthly_floods, data.monthly_days
+        n = len(data.counts)
+        predictions = np.full(n + 1, np.nan)
+        if floods is None or n < window:
+            return predictions
+        cum_floods = np.vstack([np.zeros((1, 12)), np.cumsum(floods, axis=0)])
+        cum_days = np.vstack([np.zeros((1, 12)), np.cumsum(days, axis=0)])
+        past_floods = cum_floods[window:] - cum_floods[:-window]
+        past_days = cum_days[window:] - cum_days[:-window]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            probability = np.where(past_days > 0, past_floods / past_days, 0.0)
+
+        next_year = int(data.years[-1]) + 1
+        calendar_days = np.array([calendar.monthrange(next_year, m)[1] for m in range(1, 13)], dtype=np.float64)
+        target_days = np.vstack([days[window:], calendar_days[None, :]])
+        predictions[window:] = (probability * target_days).sum(axis=1)
+        return predictions
+
+
+def model_options():
+    return [(name, model.label) for name, model in MODELS.items()]
@@ -1,28 +1,31 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.metrics import mean_absolute_percentage_error, mean_absolute_error, mean_squared_error
+import pandas as pd
+import backtest
+import charts
+import data_access
+import database
+import forecasting
+import models
+import thresholds
 
 
 def show():
     st.title("🔮 Prediksi Banjir")
 
-    def calculate_moving_average(data, window=3):
-        return data.rolling(window=window, min_periods=1).mean()
+    # Pilih stasiun (pilihan disimpan di session agar sama dengan halaman Data TMA)
+    stations = data_access.list_stations()
+    stasiun = st.session_state.get('stasiun', database.DEFAULT_STATION)
+    if stations:
+        stasiun = st.selectbox("Pilih Stasiun", stations,
+                               index=stations.index(stasiun) if stasiun in stations else 0,
+                               key='station_filter')
+        st.session_state['stasiun'] = stasiun
 
-    def calculate_mape(actual, predicted):
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        mask = actual != 0
-        if sum(mask) == 0:
-            return float('inf')
-        return mean_absolute_percentage_error(actual[mask], predicted[mask]) * 100
+    # Jumlah hari banjir per tahun dibaca dari tabel agregat
+    yearly_floods = data_access.load_yearly_floods(forecasting.DEFAULT_THRESHOLD, stasiun)
 
-    if 'current_data' in st.session_state:
-        df = st.session_state['current_data']
-        df['banjir'] = (df['tma_max'] > 1.60).astype(int)
-        yearly_floods = df.groupby('tahun')['banjir'].sum().reset_index()
+    if not yearly_floods.empty:
         
         # ===== Otomatis deteksi tahun tersedia =====
         available_years = sorted(yearly_floods['tahun'].unique())
@@ -31,47 +34,43 @@ def show():
         
         # ===== Pilihan Periode Moving Average =====
         st.subheader("⚙️ Pengaturan Prediksi")
-        ma_period = st.selectbox(
-            "Pilih jumlah periode Moving Average:",
-            ["3 periode", "4 periode"],
-            index=0
+        model_labels = dict(models.model_options())
+        model_name = st.selectbox(
+            "Pilih model prediksi:",
+            list(model_labels),
+            format_func=lambda name: model_labels[name],
+            index=0,
+            key='model'
         )
-        window_size = 3 if ma_period == "3 periode" else 4
+        model = models.get_model(model_name)
+        # Periode hanya dipilih untuk model berbasis periode; model lain memakai periode bawaan
+        # untuk perbandingan model dan analisis di bawah
+        window_size = forecasting.DEFAULT_WINDOWS[0]
+        if model.uses_window:
+            ma_period = st.selectbox(
+                "Pilih jumlah periode Moving Average:",
+                ["3 periode", "4 periode"],
+                index=0
+            )
+            window_size = 3 if ma_period == "3 periode" else 4
+        prediction_label = f'{window_size}-Periode' if model.uses_window else model.label
         
         # ===== Hitung range tahun prediksi =====
-        min_required_years = window_size + 1  # Minimal n tahun training + 1 tahun prediksi
+        min_required_years = model.min_years(window_size)  # Minimal n tahun training + 1 tahun prediksi
         if len(available_years) >= min_required_years:
-            validation_data = yearly_floods.copy()
-            
             st.success(f"✅ Data tersedia: {min_year}-{max_year}")
             
-            # ===== Perhitungan Prediksi & Metrik =====
-            validation_data['prediksi'] = validation_data['banjir'].rolling(window_size).mean().shift(1)
-            
-            # ===== Tambahkan prediksi untuk tahun berikutnya =====
-            if len(validation_data) >= window_size:
-                last_years = validation_data['banjir'].tail(window_size).values
-                next_year_pred = np.mean(last_years)
-                next_year = max_year + 1
-                
-                # Tambahkan baris prediksi tahun berikutnya
-                new_row = {
-                    'tahun': next_year,
-                    'banjir': np.nan,
-                    'prediksi': next_year_pred
-                }
-                validation_data = pd.concat([validation_data, pd.DataFrame([new_row])], ignore_index=True)
-            
-            validation_data['error'] = validation_data['banjir'] - validation_data['prediksi']
-            validation_data['absolute_error'] = validation_data['error'].abs()
-            validation_data['mape'] = (validation_data['absolute_error'] / validation_data['banjir']) * 100
+            # ===== Perhitungan Prediksi & Metrik (termasuk prediksi tahun berikutnya) =====
+            # Hasil di-cache per stasiun/model/periode dan diperbarui inkremental setelah upload
+            validation_data, eval_data, mae, mape = data_access.load_forecast(
+                model_name, window_size, forecasting.DEFAULT_THRESHOLD, stasiun)
 
             # ===== Tabel Utama =====
             st.subheader("📊 Tabel Prediksi Banjir Tahunan")
             display_df = validation_data.rename(columns={
                 'tahun': 'Tahun',
                 'banjir': 'Aktual',
-                'prediksi': f'Prediksi ({window_size}-Periode)',
+                'prediksi': f'Prediksi ({prediction_label})',
                 'error': 'Error',
                 'absolute_error': '|Error|',
                 'mape': 'MAPE (%)'
@@ -79,57 +78,50 @@ def show():
             st.dataframe(
                 display_df.style.format({
                     'Aktual': '{:.0f}', 
-                    f'Prediksi ({window_size}-Periode)': '{:.1f}',
+                    f'Prediksi ({prediction_label})': '{:.1f}',
                     'Error': '{:.1f}', 
                     '|Error|': '{:.1f}', 
                     'MAPE (%)': '{:.1f}'
                 }).map(lambda x: 'color: red' if pd.isna(x) else '', subset=['Aktual'])
             )
 
-            # ===== Hitung Metrik Hanya untuk Tahun yang Bisa Diprediksi =====
-            eval_data = validation_data.dropna(subset=['prediksi', 'banjir'])  # Hanya tahun dengan aktual dan prediksi
+            # ===== Metrik Hanya untuk Tahun yang Bisa Diprediksi (eval_data: tahun dengan aktual dan prediksi) =====
             
             if not eval_data.empty:
                 # ===== Metrik Evaluasi =====
                 st.subheader("📈 Metrik Evaluasi Prediksi")
-                mae = eval_data['absolute_error'].mean()
-                mape = eval_data['mape'].mean()
                 
+                # MAPE tidak terdefinisi jika semua tahun evaluasi memiliki 0 hari banjir aktual
+                mape_valid = bool(np.isfinite(mape))
                 col1, col2 = st.columns(2)
                 col1.metric("MAE", f"{mae:.1f} ", help="Rata-rata error absolut")
-                col2.metric("MAPE", f"{mape:.1f}%", help="Error persentase rata-rata")
+                col2.metric("MAPE", f"{mape:.1f}%" if mape_valid else "–", help="Error persentase rata-rata")
 
                 # ===== Kategori MAPE =====
-                if mape < 10:
-                    eval_msg = "SANGAT AKURAT <10%"
-                    eval_color = "green"
-                elif mape < 20:
-                    eval_msg = "BAIK 10-20%"
-                    eval_color = "blue"
-                elif mape < 50:
-                    eval_msg = "CUKUP 20-50%"
-                    eval_color = "orange"
+                if mape_valid:
+                    eval_msg, eval_color = forecasting.mape_category(mape)
+                    st.markdown(f"**Kategori Akurasi:** <span style='color:{eval_color};font-weight:bold'>{eval_msg}</span>", unsafe_allow_html=True)
                 else:
-                    eval_msg = "TIDAK AKURAT >50%"
-                    eval_color = "red"
-                
-                st.markdown(f"**Kategori Akurasi:** <span style='color:{eval_color};font-weight:bold'>{eval_msg}</span>", unsafe_allow_html=True)
+                    st.info("MAPE tidak dapat dihitung karena jumlah hari banjir aktual 0 pada tahun evaluasi.")
 
                 # ===== Detail Perhitungan =====
                 with st.expander("🧮 DETAIL PERHITUNGAN", expanded=False):
                     # Bagian 1: Perhitungan Prediksi
                     st.markdown("### 🔢 Perhitungan Prediksi")
-                    st.latex(fr"""
-                    \text{{Prediksi}}_t = \frac{{\text{{Aktual}}_{{t-1}} + \text{{Aktual}}_{{t-2}} + \cdots + \text{{Aktual}}_{{t-{window_size}}}}}{{{window_size}}}
-                    """)
-                    
-                    contoh_tahun = eval_data['tahun'].iloc[-1]
-                    tahun_prediksi = [contoh_tahun-i for i in range(1, window_size+1)]
-                    train_data = validation_data[validation_data['tahun'].isin(tahun_prediksi)]
-                    
-                    st.write(f"**Contoh Prediksi {contoh_tahun}:**")
-                    st.write("= (" + " + ".join([f"{x:.0f}" for x in train_data['banjir']]) + f") / {window_size}")
-                    st.write(f"= **{validation_data.loc[validation_data['tahun']==contoh_tahun, 'prediksi'].values[0]:.1f}** ")
+                    if model_name == 'sma':
+                        st.latex(fr"""
+                        \text{{Prediksi}}_t = \frac{{\text{{Aktual}}_{{t-1}} + \text{{Aktual}}_{{t-2}} + \cdots + \text{{Aktual}}_{{t-{window_size}}}}}{{{window_size}}}
+                        """)
+                        
+                        contoh_tahun = eval_data['tahun'].iloc[-1]
+                        tahun_prediksi = [contoh_tahun-i for i in range(1, window_size+1)]
+                        train_data = validation_data[validation_data['tahun'].isin(tahun_prediksi)]
+                        
+                        st.write(f"**Contoh Prediksi {contoh_tahun}:**")
+                        st.write("= (" + " + ".join([f"{x:.0f}" for x in train_data['banjir']]) + f") / {window_size}")
+                        st.write(f"= **{validation_data.loc[validation_data['tahun']==contoh_tahun, 'prediksi'].values[0]:.1f}** ")
+                    else:
+                        st.write(f"Prediksi dihitung dengan model **{model.label}** dari data tahun-tahun sebelumnya.")
                     
                     # Bagian 2: Perhitungan Error
                     st.markdown("---\n### 📉 Perhitungan Error")
@@ -152,11 +144,10 @@ def show():
                     \text{MAPE} = \left(\frac{1}{n}\sum_{i=1}^n \frac{|\text{Error}_i|}{\text{Aktual}_i}\right) \times 100\%
                     """)
                     st.write("**Perhitungan:**")
-                    mape_calcs = []
-                    for _, row in eval_data.iterrows():
-                        mape_calcs.append(f"({row['absolute_error']:.1f}/{row['banjir']})")
+                    mape_calcs = [f"({abs_err:.1f}/{banjir})"
+                                  for abs_err, banjir in zip(eval_data['absolute_error'], eval_data['banjir'])]
                     st.write("= (" + " + ".join(mape_calcs) + f") / {len(eval_data)} × 100%")
-                    st.write(f"= **{mape:.1f}%**")
+                    st.write(f"= **{mape:.1f}%**" if mape_valid else "= – (pembagian dengan aktual 0)")
                     
                     # Bagian 5: Penjelasan Kategori MAPE
                     st.markdown("---\n### 📚 Kategori MAPE (Berdasarkan Skripsi Referensi)")
@@ -173,41 +164,117 @@ def show():
 
                 # ===== Visualisasi =====
                 st.subheader("📉 Grafik Prediksi vs Aktual")
-                fig, ax = plt.subplots(figsize=(10,5))
-                
-                # Plot data aktual
-                ax.plot(validation_data['tahun'], validation_data['banjir'], 'bo-', label='Aktual')
+                version = data_access.get_data_version()
+                chart_label = f'{window_size}-MA' if model_name == 'sma' else prediction_label
+                st.image(charts.render('prediksi', (version, stasiun, forecasting.DEFAULT_THRESHOLD, model_name, window_size),
+                                       validation_data, eval_data, chart_label))
                 
-                # Plot prediksi untuk tahun yang bisa diprediksi
-                ax.plot(eval_data['tahun'], eval_data['prediksi'], 'r--o', label=f'Prediksi ({window_size}-MA)')
-                
-                # Plot prediksi tahun berikutnya jika ada
+                # Keterangan prediksi tahun depan
                 if len(validation_data) > len(eval_data):
-                    next_year_data = validation_data.iloc[-1]
-                    ax.plot(next_year_data['tahun'], next_year_data['prediksi'], 'gs--', label='Prediksi Tahun Depan')
-                    ax.text(next_year_data['tahun'], next_year_data['prediksi']-2, 
-                           f"{next_year_data['prediksi']:.1f}*", ha='center', color='green')
+                    if model_name == 'sma':
+                        st.markdown(f"> *Prediksi untuk tahun depan menggunakan metode {window_size}-MA (Moving Average {window_size} tahun terakhir)*")
+                    else:
+                        st.markdown(f"> *Prediksi untuk tahun depan menggunakan model {model.label}*")
                 
-                # Anotasi nilai
-                for _, row in validation_data.iterrows():
-                    if not pd.isna(row['banjir']):
-                        ax.text(row['tahun'], row['banjir']+2, f"{row['banjir']:.0f}", ha='center')
-                    if not pd.isna(row['prediksi']) and row['tahun'] in eval_data['tahun'].values:
-                        ax.text(row['tahun'], row['prediksi']-2, f"{row['prediksi']:.1f}", 
-                            ha='center', color='red')
+                # ===== Perbandingan Model =====
+                st.subheader("🧪 Perbandingan Model Prediksi")
+                if st.checkbox("Bandingkan semua model dengan MAE/MAPE yang sama", key='compare_models'):
+                    all_data = models.model_data(yearly_floods, data_access.load_monthly_floods(forecasting.DEFAULT_THRESHOLD, stasiun))
+                    comparison = forecasting.compare_models(all_data, yearly_floods, window_size)
+                    st.dataframe(
+                        comparison.rename(columns={
+                            'label': 'Model',
+                            'prediksi': f'Prediksi {max_year + 1}',
+                            'mae': 'MAE',
+                            'mape': 'MAPE (%)',
+                            'jumlah_tahun_evaluasi': 'Jumlah Tahun Evaluasi'
+                        })[['Model', f'Prediksi {max_year + 1}', 'MAE', 'MAPE (%)', 'Jumlah Tahun Evaluasi']].style.format({
+                            f'Prediksi {max_year + 1}': '{:.1f}',
+                            'MAE': '{:.1f}',
+                            'MAPE (%)': '{:.1f}'
+                        })
+                    )
+                    st.caption(f"Model berbasis periode memakai {window_size} periode; tahun evaluasi tiap model bisa berbeda.")
                 
-                ax.set_xlabel('Tahun')
-                ax.set_ylabel('Hari Banjir')
-                ax.legend()
-                ax.grid(True, linestyle='--', alpha=0.7)
-                st.pyplot(fig)
+                # ===== Analisis Sensitivitas Threshold =====
+                st.subheader("🎚️ Analisis Sensitivitas Threshold")
+                if st.checkbox("Tampilkan prediksi dan MAPE untuk semua threshold (1.0 - 3.0 m)", key='sensitivity'):
+                    sweep = data_access.load_flood_sweep('year', stasiun)
+                    sensitivity = thresholds.sensitivity_table(sweep, window_size)
+                    st.dataframe(
+                        sensitivity.rename(columns={
+                            'threshold': 'Threshold (m)',
+                            'prediksi_tahun_depan': f'Prediksi {max_year + 1}',
+                            'mae': 'MAE',
+                            'mape': 'MAPE (%)'
+                        }).style.format({
+                            'Threshold (m)': '{:.1f}',
+                            f'Prediksi {max_year + 1}': '{:.1f}',
+                            'MAE': '{:.1f}',
+                            'MAPE (%)': '{:.1f}'
+                        })
+                    )
+                    st.caption("MAPE pada tabel ini mengabaikan tahun dengan jumlah hari banjir aktual 0.")
                 
-                # Keterangan prediksi tahun depan
-                if len(validation_data) > len(eval_data):
-                    st.markdown(f"> *Prediksi untuk tahun depan menggunakan metode {window_size}-MA (Moving Average {window_size} tahun terakhir)*")
+                # ===== Perbandingan Periode Moving Average (Backtest) =====
+                st.subheader("🏆 Perbandingan Periode Moving Average")
+                max_window_limit = len(available_years) - 1
+                if max_window_limit > 1:
+                    max_window = st.slider("Periode maksimum yang dibandingkan", 1, max_window_limit,
+                                           min(max(window_size, max_window_limit - 1), max_window_limit),
+                                           key='max_window')
+                else:
+                    max_window = max_window_limit
+                common_period = st.checkbox("Evaluasi semua periode pada tahun yang sama", value=True,
+                                            key='common_period',
+                                            help="Semua periode dinilai mulai tahun ke-(periode maksimum + 1) agar perbandingan adil")
+                ranking = backtest.ranking_table(yearly_floods, max_window, common_period)
+                st.dataframe(
+                    ranking.rename(columns={
+                        'peringkat': 'Peringkat',
+                        'window': 'Periode',
+                        'mae': 'MAE',
+                        'mape': 'MAPE (%)',
+                        'rmse': 'RMSE',
+                        'jumlah_tahun': 'Jumlah Tahun Evaluasi'
+                    })[['Peringkat', 'Periode', 'MAE', 'MAPE (%)', 'RMSE', 'Jumlah Tahun Evaluasi']].style.format({
+                        'MAE': '{:.1f}',
+                        'MAPE (%)': '{:.1f}',
+                        'RMSE': '{:.1f}'
+                    })
+                )
+                if not ranking.empty:
+                    st.caption(f"Periode terbaik: {ranking['window'].iloc[0]} tahun. "
+                               "MAPE mengabaikan tahun dengan jumlah hari banjir aktual 0.")
+                
+                # ===== Peringkat Antar Stasiun =====
+                if len(stations) > 1:
+                    st.subheader("🌐 Peringkat Antar Stasiun")
+                    if st.checkbox(f"Bandingkan prediksi {len(stations)} stasiun dengan model yang sama", key='station_ranking'):
+                        all_monthly = data_access.load_all_monthly_floods(forecasting.DEFAULT_THRESHOLD) if model.needs_monthly else None
+                        ranking = forecasting.station_ranking(
+                            data_access.load_all_yearly_floods(forecasting.DEFAULT_THRESHOLD),
+                            model_name, window_size, all_monthly
+                        )
+                        st.dataframe(
+                            ranking.rename(columns={
+                                'peringkat': 'Peringkat',
+                                'stasiun': 'Stasiun',
+                                'tahun_prediksi': 'Tahun Prediksi',
+                                'prediksi': 'Prediksi Hari Banjir',
+                                'mae': 'MAE',
+                                'mape': 'MAPE (%)',
+                                'jumlah_tahun_evaluasi': 'Jumlah Tahun Evaluasi'
+                            }).style.format({
+                                'Prediksi Hari Banjir': '{:.1f}',
+                                'MAE': '{:.1f}',
+                                'MAPE (%)': '{:.1f}'
+                            }, na_rep='-')
+                        )
+                        st.caption("Stasiun diurutkan dari prediksi hari banjir tahun berikutnya yang terbanyak.")
                 
             else:
-                st.warning(f"⚠️ Belum ada tahun yang bisa diprediksi (butuh minimal {window_size} tahun data historis)")
+                st.warning(f"⚠️ Belum ada tahun yang bisa diprediksi (butuh minimal {min_required_years - 1} tahun data historis)")
         else:
             st.error(f"❌ Data tidak cukup! Butuh minimal {min_required_years} tahun data (tersedia: {len(available_years)} tahun)")
     else:
@@ -0,0 +1,141 @@
+# profiling.py - Pengukuran waktu ringan (context manager / decorator) per sesi dan per proses
+#
+# Nonaktif secara default; saat nonaktif timed() hanya memeriksa satu flag. Setiap sesi Streamlit
+# memasang Recorder miliknya dengan use_session() di awal run; hasil juga dikumpulkan ke
+# Recorder proses yang dipakai bersama semua sesi.
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+import numpy as np
+import pandas as pd
+
+# Jumlah sampel terakhir per nama yang disimpan untuk menghitung p50/p95
+MAX_SAMPLES = 1000
+
+_enabled = False
+_local = threading.local()
+
+
+class Recorder:
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._counts = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+                self._counts[name] = 0
+                self._totals[name] = 0.0
+            samples.append(seconds)
+            self._counts[name] += 1
+            self._totals[name] += seconds
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._totals.clear()
+
+    # Ringkasan per nama: jumlah panggilan, total, p50 dan p95 (detik) dari sampel terakhir
+    def summary(self):
+        with self._lock:
+            rows = [(name, self._counts[name], self._totals[name], np.array(samples))
+                    for name, samples in self._samples.items()]
+        table = pd.DataFrame([{
+            'nama': name,
+            'jumlah': count,
+            'total_s': total,
+            'p50_s': float(np.percentile(samples, 50)),
+            'p95_s': float(np.percentile(samples, 95)),
+        } for name, count, total, samples in rows], columns=['nama', 'jumlah', 'total_s', 'p50_s', 'p95_s'])
+        return table.sort_values('total_s', ascending=False).reset_index(drop=True)
+
+
+PROCESS = Recorder()
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+# Pasang Recorder sesi untuk thread yang sedang menjalankan script sesi tersebut
+def use_session(recorder):
+    _local.recorder = recorder
+
+
+def _record(name, seconds):
+    PROCESS.record(name, seconds)
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is not None:
+        recorder.record(name, seconds)
+
+
+@contextmanager
+def _timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+@contextmanager
+def _noop():
+    yield
+
+
+# Bisa dipakai sebagai `with timed('db.load'):` atau sebagai decorator `@timed('db.load')`
+class timed:
+    def __init__(self, name):
+        self.name = name
+        self._context = None
+
+    def __enter__(self):
+        self._context = _timer(self.name) if _enabled else _noop()
+        return self._context.__enter__()
+
+    def __exit__(self, *exc):
+        return self._context.__exit__(*exc)
+
+    def __call__(self, fn):
+        name = self.name
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(name, time.perf_counter() - start)
+        return wrapper
+
+
+def to_json(recorder):
+    return json.dumps(recorder.summary().to_dict(orient='records'), indent=2)
+
+
+# Format teks Prometheus: summary dengan kuantil 0.5 dan 0.95
+def to_prometheus(recorder, metric='tma_timing_seconds'):
+    lines = [f'# HELP {metric} Durasi operasi aplikasi prediksi TMA', f'# TYPE {metric} summary']
+    for row in recorder.summary().itertuples(index=False):
+        label = row.nama.replace('\\', '\\\\').replace('"', '\\"')
+        lines.append(f'{metric}{{name="{label}",quantile="0.5"}} {row.p50_s:.6f}')
+        lines.append(f'{metric}{{name="{label}",quantile="0.95"}} {row.p95_s:.6f}')
+        lines.append(f'{metric}_sum{{name="{label}"}} {row.total_s:.6f}')
+        lines.append(f'{metric}_count{{name="{label}"}} {row.jumlah}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,279 @@
+# quality.py - Validasi kualitas data TMA harian: aturan per baris, celah tanggal dan pencilan
+#
+# Semua pemeriksaan berupa operasi array (numpy/pandas) tanpa loop per baris, sehingga bisa dijalankan
+# pada setiap upload dan pada seluruh tma_data. Pemeriksaan hanya menandai dan menghitung pelanggaran;
+# baris tetap disimpan (data lapangan sering memakai 0 untuk bacaan yang tidak tercatat). Celah pendek
+# bisa diisi dengan interpolasi linear (opsional).
+#
+#   python quality.py                          # jumlah pelanggaran per stasiun
+#   python quality.py --stations utama --detail
+#   python quality.py --fill-gaps              # isi celah <= MAX_FILL_DAYS hari lalu simpan
+import argparse
+import os
+import sys
+from collections import OrderedDict, namedtuple
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+import database
+import forecasting
+import profiling
+
+# Batas fisik bacaan (m) dan toleransi pembulatan untuk perbandingan antar kolom (m)
+VALID_RANGE = (0.0, 10.0)
+TOLERANCE = 0.005
+# tma_rata dianggap tidak sesuai jika berbeda lebih dari ini dari rata-rata jam 06/12/18 (m)
+MEAN_TOLERANCE = 0.05
+# Pencilan (filter Hampel pada tma_max): |x - median bergulir| > OUTLIER_K * 1.4826 * MAD bergulir,
+# minimal OUTLIER_MIN_DEVIATION m. Jendela pendek agar banjir yang bertahan beberapa hari tidak ikut.
+OUTLIER_WINDOW = 7
+OUTLIER_K = 5.0
+OUTLIER_MIN_DEVIATION = 0.3
+# Celah sampai sepanjang ini (hari) boleh diisi interpolasi
+MAX_FILL_DAYS = 3
+
+ROW_RULES = ['di_luar_rentang', 'min_lebih_dari_max', 'jam_di_luar_min_max', 'rata_di_luar_min_max',
+             'rata_tidak_sesuai']
+SERIES_RULES = ['tanggal_ganda', 'tanggal_hilang', 'celah', 'pencilan', 'pencilan_banjir', 'celah_diisi']
+RULES = ROW_RULES + SERIES_RULES
+RULE_LABELS = {
+    'di_luar_rentang': f"Bacaan di luar {VALID_RANGE[0]:g}-{VALID_RANGE[1]:g} m",
+    'min_lebih_dari_max': "tma_min lebih besar dari tma_max",
+    'jam_di_luar_min_max': "Bacaan jam 06/12/18 di luar tma_min-tma_max",
+    'rata_di_luar_min_max': "tma_rata di luar tma_min-tma_max",
+    'rata_tidak_sesuai': f"tma_rata berbeda > {MEAN_TOLERANCE} m dari rata-rata bacaan jam",
+    'tanggal_ganda': "Tanggal ganda pada file",
+    'tanggal_hilang': "Hari tanpa data",
+    'celah': "Jumlah celah tanggal",
+    'pencilan': "Pencilan tma_max (lonjakan sensor)",
+    'pencilan_banjir': "Pencilan yang terhitung sebagai hari banjir",
+    'celah_diisi': "Hari yang diisi interpolasi",
+}
+
+# jumlah: {aturan: jumlah}; celah: DataFrame (mulai, selesai, hari); pencilan: DataFrame (tanggal, tma_max, median, batas)
+QualityReport = namedtuple('QualityReport', ['jumlah', 'celah', 'pencilan'])
+
+
+def _outside(values, low, high):
+    return (values < low) | (values > high)
+
+
+# Mask pelanggaran per aturan; columns = {kolom: array} atau DataFrame dengan database.NUMERIC_COLUMNS
+def row_violations(columns):
+    jam = [np.asarray(columns[name], dtype=np.float64) for name in database.NUMERIC_COLUMNS[:3]]
+    low, high, mean = (np.asarray(columns[name], dtype=np.float64) for name in database.NUMERIC_COLUMNS[3:])
+    out_of_range = _outside(low, *VALID_RANGE) | _outside(high, *VALID_RANGE) | _outside(mean, *VALID_RANGE)
+    outside_min_max = np.zeros(len(low), dtype=bool)
+    for values in jam:
+        out_of_range |= _outside(values, *VALID_RANGE)
+        outside_min_max |= _outside(values, low - TOLERANCE, high + TOLERANCE)
+    return OrderedDict([
+        ('di_luar_rentang', out_of_range),
+        ('min_lebih_dari_max', low > high + TOLERANCE),
+        ('jam_di_luar_min_max', outside_min_max),
+        ('rata_di_luar_min_max', _outside(mean, low - TOLERANCE, high + TOLERANCE)),
+        ('rata_tidak_sesuai', np.abs(mean - (jam[0] + jam[1] + jam[2]) / 3) > MEAN_TOLERANCE),
+    ])
+
+
+# Jumlah pelanggaran aturan baris pada satu chunk upload; telemetri (kolom tma) hanya dicek rentangnya
+@profiling.timed('quality.rows')
+def row_counts(frame):
+    if 'tma' in frame.columns:
+        tma = frame['tma'].to_numpy(np.float64)
+        return {'di_luar_rentang': int(_outside(tma, *VALID_RANGE).sum())}
+    masks = row_violations(frame)
+    return {rule: int(mask.sum()) for rule, mask in masks.items()}
+
+
+# Jumlah baris yang tanggalnya sudah muncul sebelumnya (days: hari sejak epoch, urutan bebas)
+def duplicate_count(days):
+    return int(len(days) - len(pd.unique(np.asarray(days))))
+
+
+# Reindex deret harian terurut ke kalender penuh [hari pertama, hari terakhir]; hari tanpa bacaan = NaN
+def reindex(tanggal, values):
+    days = np.asarray(tanggal, dtype='datetime64[D]').astype(np.int64)
+    full = np.full(int(days[-1] - days[0]) + 1, np.nan)
+    full[days - days[0]] = values
+    return days[0], full
+
+
+# Awal (indeks) dan panjang setiap rangkaian True
+def runs(mask):
+    edges = np.diff(np.concatenate([[0], mask.view(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    return starts, np.flatnonzero(edges == -1) - starts
+
+
+# Median bergulir terpusat yang mengabaikan NaN (minimal window // 2 + 1 nilai): jendela diurutkan
+# sekaligus sebagai view (NaN ke ujung), lebih cepat dari rolling().median() pandas untuk jendela kecil
+def rolling_median(values, window):
+    half = window // 2
+    padded = np.concatenate([np.full(half, np.nan), values, np.full(window - 1 - half, np.nan)])
+    ordered = np.sort(sliding_window_view(padded, window), axis=1)
+    valid = np.convolve(~np.isnan(padded), np.ones(window, dtype=np.int64), 'valid')
+    rows = np.arange(len(values))
+    lower = ordered[rows, np.maximum(valid - 1, 0) // 2]
+    upper = ordered[rows, valid // 2]
+    return np.where(valid >= half + 1, (lower + upper) / 2, np.nan)
+
+
+# Filter Hampel: MAD bergulir didekati dengan median bergulir dari |x - median bergulir|
+def outliers(full, window=OUTLIER_WINDOW, k=OUTLIER_K, min_deviation=OUTLIER_MIN_DEVIATION):
+    median = rolling_median(full, window)
+    deviation = np.abs(full - median)
+    limit = np.maximum(k * 1.4826 * rolling_median(deviation, window), min_deviation)
+    with np.errstate(invalid='ignore'):
+        return deviation > limit, median, limit
+
+
+def _epoch_day(value):
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+
+def _dates(first_day, offsets):
+    return (first_day + offsets).astype('datetime64[D]').astype('datetime64[ns]')
+
+
+# Pemeriksaan deret satu stasiun (TMASeries atau frame dengan tanggal + kolom bacaan, terurut dan unik).
+# start/end membatasi hitungan ke rentang tanggal (misalnya rentang file upload); konteks di luar rentang
+# tetap dipakai untuk median bergulir.
+@profiling.timed('quality.series')
+def check_series(series, threshold=forecasting.DEFAULT_THRESHOLD, start=None, end=None):
+    counts = OrderedDict((rule, 0) for rule in RULES)
+    if len(series['tanggal']) == 0:
+        return QualityReport(counts, pd.DataFrame(columns=['mulai', 'selesai', 'hari']),
+                             pd.DataFrame(columns=['tanggal', 'tma_max', 'median', 'batas']))
+
+    tanggal = np.asarray(series['tanggal'], dtype='datetime64[D]')
+    first_day, full = reindex(tanggal, series['tma_max'])
+    lo, hi = 0, len(full)
+    if start is not None:
+        lo = max(_epoch_day(start) - first_day, 0)
+    if end is not None:
+        hi = min(_epoch_day(end) - first_day + 1, hi)
+    in_range = np.zeros(len(full), dtype=bool)
+    in_range[lo:hi] = True
+
+    row_lo, row_hi = np.searchsorted(tanggal.astype(np.int64), [first_day + lo, first_day + hi])
+    for rule, mask in row_violations({name: series[name][row_lo:row_hi]
+                                      for name in database.NUMERIC_COLUMNS}).items():
+        counts[rule] = int(mask.sum())
+
+    missing = np.isnan(full) & in_range
+    gap_starts, gap_lengths = runs(missing)
+    counts['tanggal_hilang'] = int(missing.sum())
+    counts['celah'] = len(gap_starts)
+
+    flagged, median, limit = outliers(full)
+    flagged &= in_range
+    counts['pencilan'] = int(flagged.sum())
+    counts['pencilan_banjir'] = int((flagged & (full > np.float32(threshold))).sum())
+
+    outlier_idx = np.flatnonzero(flagged)
+    return QualityReport(
+        counts,
+        pd.DataFrame({'mulai': _dates(first_day, gap_starts), 'selesai': _dates(first_day, gap_starts + gap_lengths - 1),
+                      'hari': gap_lengths}),
+        pd.DataFrame({'tanggal': _dates(first_day, outlier_idx), 'tma_max': full[outlier_idx],
+                      'median': median[outlier_idx], 'batas': limit[outlier_idx]}),
+    )
+
+
+# Baris interpolasi linear untuk celah <= max_days hari (format tma_data, siap untuk upsert_tma).
+# Celah di luar start/end tidak diisi.
+def fill_gaps(series, max_days=MAX_FILL_DAYS, start=None, end=None):
+    tanggal = np.asarray(series['tanggal'], dtype='datetime64[D]')
+    if len(tanggal) < 2:
+        return pd.DataFrame(columns=database.TMA_COLUMNS)
+    days = tanggal.astype(np.int64)
+    missing = np.ones(int(days[-1] - days[0]) + 1, dtype=bool)
+    missing[days - days[0]] = False
+    # Panjang celah untuk setiap hari yang hilang (runs terurut sama dengan posisi hari hilang)
+    gap_lengths = runs(missing)[1]
+    fill = np.flatnonzero(missing)[np.repeat(gap_lengths, gap_lengths) <= max_days] + days[0]
+    if start is not None:
+        fill = fill[fill >= _epoch_day(start)]
+    if end is not None:
+        fill = fill[fill <= _epoch_day(end)]
+    frame = pd.DataFrame({'tanggal': fill.astype('datetime64[D]').astype('datetime64[ns]')})
+    for name in database.NUMERIC_COLUMNS:
+        frame[name] = np.round(np.interp(fill, days, np.asarray(series[name], dtype=np.float64)), 3)
+    return frame
+
+
+# Pemeriksaan (dan pengisian celah) untuk rentang yang baru diupload, dibaca dari tma_data
+# termasuk OUTLIER_WINDOW hari di sekitarnya sebagai konteks median bergulir
+def check_stored(stasiun, start, end, threshold=forecasting.DEFAULT_THRESHOLD, fill=False):
+    first, last = _epoch_day(start) - OUTLIER_WINDOW, _epoch_day(end) + OUTLIER_WINDOW
+    years = range(pd.Timestamp(start).year - 1, pd.Timestamp(end).year + 2)
+    series = database.load_series(stasiun, years)
+    lo, hi = np.searchsorted(series['tanggal'].astype(np.int64), [first, last + 1])
+    window = {name: series[name][lo:hi] for name in database.TMA_COLUMNS}
+    filled = 0
+    if fill:
+        rows = fill_gaps(window, start=start, end=end)
+        if len(rows):
+            filled = database.upsert_tma(rows, stasiun)
+            merged = pd.concat([pd.DataFrame(window), rows]).sort_values('tanggal')
+            window = {name: merged[name].to_numpy() for name in database.TMA_COLUMNS}
+    report = check_series(window, threshold, start, end)
+    report.jumlah['celah_diisi'] = filled
+    return report
+
+
+# Kumpulkan hitungan per stasiun: {stasiun: {aturan: jumlah}}
+def add_counts(total, stasiun, counts):
+    station = total.setdefault(stasiun, OrderedDict((rule, 0) for rule in RULES))
+    for rule, count in counts.items():
+        station[rule] += count
+    return total
+
+
+# Tabel hitungan: baris = aturan (dengan keterangan), kolom = stasiun
+def counts_table(counts):
+    table = pd.DataFrame({stasiun: pd.Series(rules) for stasiun, rules in counts.items()}, index=RULES).fillna(0)
+    table.insert(0, 'keterangan', [RULE_LABELS[rule] for rule in RULES])
+    return table.astype({stasiun: int for stasiun in counts})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validasi kualitas data TMA di database")
+    parser.add_argument('--db', default=database.DB_PATH, help="File database SQLite (default: %(default)s)")
+    parser.add_argument('--stations', nargs='+', help="Stasiun yang diperiksa (default: semua)")
+    parser.add_argument('--threshold', type=float, default=forecasting.DEFAULT_THRESHOLD,
+                        help="Threshold banjir untuk pencilan_banjir (default: %(default)s)")
+    parser.add_argument('--fill-gaps', action='store_true',
+                        help=f"Isi celah <= {MAX_FILL_DAYS} hari dengan interpolasi dan simpan")
+    parser.add_argument('--detail', action='store_true', help="Tampilkan daftar celah dan pencilan")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"Database tidak ditemukan: {args.db}")
+    database.use_database(args.db)
+
+    counts = {}
+    for stasiun in args.stations or database.list_stations():
+        series = database.load_series(stasiun)
+        if series.empty:
+            continue
+        filled = 0
+        if args.fill_gaps:
+            rows = fill_gaps(series)
+            if len(rows):
+                filled = database.upsert_tma(rows, stasiun)
+                series = database.load_series(stasiun)
+        report = check_series(series, args.threshold)
+        report.jumlah['celah_diisi'] = filled
+        add_counts(counts, stasiun, report.jumlah)
+        if args.detail:
+            print(f"== {stasiun}: celah ==\n{report.celah.to_string(index=False)}\n"
+                  f"== {stasiun}: pencilan ==\n{report.pencilan.to_string(index=False)}\n")
+    if not counts:
+        parser.error("Tidak ada data TMA yang bisa diperiksa")
+    counts_table(counts).to_csv(sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+# reports.py - Laporan statistik TMA dan prediksi banjir ke Excel, CSV, PDF dan PNG
+#
+# Laporan terdiri dari bagian per (stasiun, tahun) - ringkasan, statistik bulanan dan grafik tahunan
+# seperti tab Analisis Tahunan - dan satu bagian prediksi per stasiun (tabel, MAE/MAPE, grafik) seperti
+# halaman Prediksi. Kunci cache setiap bagian memuat versi data terakhir yang mengubah tahun tersebut
+# (lihat database.load_year_versions), jadi membuat ulang laporan multi-tahun hanya menggambar ulang
+# bagian yang datanya berubah. Bagian yang belum ada di cache dirender paralel.
+#
+# Contoh:
+#   python reports.py --years 2019 2020 2021 --output laporan.xlsx
+#   python reports.py --stations hulu hilir --output laporan.pdf --workers 0
+#   python reports.py --output grafik.zip --format png
+import argparse
+import hashlib
+import io
+import os
+import pickle
+import sys
+import threading
+import time
+import zipfile
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import charts
+import database
+import forecasting
+import models
+import profiling
+
+FORMATS = ['xlsx', 'csv', 'pdf', 'png']
+# csv dan png berupa arsip zip (satu file per tabel / grafik)
+EXTENSIONS = {'xlsx': 'xlsx', 'csv': 'zip', 'pdf': 'pdf', 'png': 'zip'}
+MIME_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'application/zip',
+    'pdf': 'application/pdf',
+    'png': 'application/zip',
+}
+
+# Jumlah bagian yang disimpan di memori (dipakai bersama semua sesi)
+CACHE_SIZE = 256
+# Cache bagian di disk untuk CLI, agar laporan berikutnya tidak menggambar ulang tahun yang sama.
+# Foldernya di samping file database (<db>.laporan) kecuali --cache-dir diberikan.
+REPORT_CACHE_SUFFIX = '.laporan'
+# Thread untuk merender bagian dari aplikasi Streamlit
+WORKERS = 4
+
+# Resolusi grafik laporan: cukup untuk cetak A4, seperempat jumlah piksel grafik di aplikasi
+REPORT_DPI = 100
+# Ukuran halaman PDF (A4 landscape, inci) dan lebar grafik di sheet Excel (piksel)
+PDF_PAGE_SIZE = (11.69, 8.27)
+EXCEL_IMAGE_WIDTH = 900
+EXCEL_ROW_HEIGHT = 20
+
+YearSection = namedtuple('YearSection', ['stasiun', 'tahun', 'threshold', 'ringkasan', 'bulanan', 'grafik'])
+ForecastSection = namedtuple('ForecastSection', ['stasiun', 'threshold', 'model', 'window', 'label', 'tabel',
+                                                 'mae', 'mape', 'kategori', 'grafik'])
+# dirender / dari_cache: jumlah bagian yang digambar pada pemanggilan ini dan yang dipakai ulang
+Report = namedtuple('Report', ['dibuat', 'threshold', 'tahun', 'prediksi', 'dirender', 'dari_cache'])
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def report_cache_dir():
+    return database.DB_PATH + REPORT_CACHE_SUFFIX
+
+
+def _cache_file(cache_dir, key):
+    return os.path.join(cache_dir, hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.pkl')
+
+
+def _remember(key, section):
+    with _cache_lock:
+        _cache[key] = section
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _get_section(key, cache_dir=None):
+    with _cache_lock:
+        section = _cache.get(key)
+        if section is not None:
+            _cache.move_to_end(key)
+            return section
+    if cache_dir is None:
+        return None
+    try:
+        with open(_cache_file(cache_dir, key), 'rb') as f:
+            section = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    _remember(key, section)
+    return section
+
+
+# File cache ditulis dengan nama sementara lalu di-rename agar pembaca tidak melihat file setengah jadi
+def _put_section(key, section, cache_dir=None):
+    _remember(key, section)
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_file(cache_dir, key)
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(section, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+def clear_cache(cache_dir=None):
+    with _cache_lock:
+        _cache.clear()
+    if cache_dir is not None and os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(cache_dir, name))
+
+
+# Satu bagian tahunan. Fungsi tingkat modul dengan data polos (array numpy, DataFrame)
+# agar bisa dijalankan di thread maupun process pool.
+def render_year(stasiun, tahun, threshold, year_stats, monthly_stats, year_series):
+    ringkasan = {
+        'stasiun': stasiun,
+        'tahun': int(tahun),
+        'jumlah_hari': int(year_stats['jumlah_hari']),
+        'hari_banjir': int(monthly_stats['hari_banjir'].sum()),
+        'tma_rata': float(year_stats['tma_rata']),
+        'tma_min': float(year_stats['tma_min']),
+        'tma_max': float(year_stats['tma_max']),
+    }
+    grafik = charts.draw_png('tahunan', monthly_stats, year_series, threshold, dpi=REPORT_DPI)
+    return YearSection(stasiun, int(tahun), threshold, ringkasan, monthly_stats, grafik)
+
+
+# Bagian prediksi satu stasiun, sama dengan tabel dan grafik halaman Prediksi
+def render_forecast(stasiun, threshold, model_name, window, yearly_floods, monthly_floods):
+    model = models.get_model(model_name)
+    state = forecasting.ForecastState(model_name, window)
+    state.rebuild(yearly_floods, monthly_floods)
+    table, eval_data, mae, mape = state.result()
+    label = f'{window}-Periode' if model.uses_window else model.label
+    if eval_data.empty:
+        return ForecastSection(stasiun, threshold, model_name, window, label, table, np.nan, np.nan, None, None)
+    chart_label = f'{window}-MA' if model_name == 'sma' else label
+    grafik = charts.draw_png('prediksi', table, eval_data, chart_label, dpi=REPORT_DPI)
+    kategori = forecasting.mape_category(mape)[0]
+    return ForecastSection(stasiun, threshold, model_name, window, label, table, mae, mape, kategori, grafik)
+
+
+def _run_tasks(tasks, workers, processes):
+    if workers > 1 and len(tasks) > 1:
+        if processes:
+            from concurrent.futures import ProcessPoolExecutor as Executor
+        else:
+            from concurrent.futures import ThreadPoolExecutor as Executor
+        with Executor(max_workers=workers) as pool:
+            futures = [pool.submit(fn, *args) for fn, args in tasks]
+            return [future.result() for future in futures]
+    return [fn(*args) for fn, args in tasks]
+
+
+# Kumpulkan bagian laporan untuk stasiun dan tahun terpilih (years=None: semua tahun).
+# Bagian yang tidak ada di cache dirender dengan `workers` thread (atau proses jika processes=True).
+@profiling.timed('report.generate')
+def generate(stations, years=None, threshold=forecasting.DEFAULT_THRESHOLD, model_name='sma', window=3,
+             workers=1, processes=False, cache_dir=None):
+    threshold = round(float(threshold), 2)
+    window = int(window)
+    model = models.get_model(model_name)
+    wanted = None if years is None else {int(year) for year in years}
+    # Path dan identitas acak database: cache yang dipakai bersama tidak tertukar antar database
+    identity = (database.DB_PATH, database.get_database_id())
+
+    year_slots = []
+    forecast_slots = []
+    tasks = []
+    pending = []
+    for stasiun in stations:
+        year_versions = database.load_year_versions(stasiun)
+        station_years = [year for year in year_versions if wanted is None or year in wanted]
+        missing = []
+        for tahun in station_years:
+            key = ('tahun', identity, stasiun, tahun, threshold, year_versions[tahun])
+            section = _get_section(key, cache_dir)
+            year_slots.append([key, section])
+            if section is None:
+                missing.append((len(year_slots) - 1, tahun))
+
+        if missing:
+            yearly_stats = database.load_yearly_stats(stasiun).set_index('tahun')
+            series = database.load_series(stasiun, [tahun for _, tahun in missing])
+            for slot, tahun in missing:
+                year_series = series.year(tahun)
+                tasks.append((render_year, (stasiun, tahun, threshold, yearly_stats.loc[tahun].to_dict(),
+                                            database.load_monthly_stats(tahun, threshold, stasiun),
+                                            {name: year_series[name] for name in ['bulan', 'hari', 'tma_rata']})))
+                pending.append(year_slots[slot])
+
+        if not station_years:
+            continue
+        # Prediksi memakai seluruh riwayat stasiun; kuncinya adalah jumlah banjir per tahun (dan per bulan)
+        yearly_floods = database.load_yearly_floods(threshold, stasiun)
+        monthly_floods = database.load_monthly_floods(threshold, stasiun) if model.needs_monthly else None
+        fingerprint = tuple(map(tuple, yearly_floods.to_numpy().tolist()))
+        if monthly_floods is not None:
+            fingerprint += tuple(map(tuple, monthly_floods.to_numpy().tolist()))
+        key = ('prediksi', identity, stasiun, threshold, model_name, window, fingerprint)
+        section = _get_section(key, cache_dir)
+        forecast_slots.append([key, section])
+        if section is None:
+            tasks.append((render_forecast, (stasiun, threshold, model_name, window, yearly_floods, monthly_floods)))
+            pending.append(forecast_slots[-1])
+
+    with profiling.timed('report.render'):
+        results = _run_tasks(tasks, workers, processes)
+    for slot, section in zip(pending, results):
+        slot[1] = section
+        _put_section(slot[0], section, cache_dir)
+
+    return Report(datetime.now().replace(microsecond=0), threshold,
+                  [section for _, section in year_slots], [section for _, section in forecast_slots],
+                  len(tasks), len(year_slots) + len(forecast_slots) - len(tasks))
+
+
+# Gabungkan tabel per bagian dengan kolom identitas di depan
+def _leading(frames, columns):
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    frame = pd.concat(frames, ignore_index=True)
+    return frame[columns + [c for c in frame.columns if c not in columns]]
+
+
+# Tabel laporan (nama sheet -> DataFrame), dipakai oleh Excel dan CSV
+def tables(report):
+    result = OrderedDict()
+    result['Ringkasan Tahunan'] = pd.DataFrame([section.ringkasan for section in report.tahun],
+                                               columns=['stasiun', 'tahun', 'jumlah_hari', 'hari_banjir',
+                                                        'tma_rata', 'tma_min', 'tma_max'])
+    monthly = [section.bulanan.assign(stasiun=section.stasiun, tahun=section.tahun) for section in report.tahun]
+    result['Statistik Bulanan'] = _leading(monthly, ['stasiun', 'tahun'])
+    forecasts = [section.tabel.assign(stasiun=section.stasiun, model=section.model) for section in report.prediksi]
+    result['Prediksi'] = _leading(forecasts, ['stasiun', 'model'])
+    result['Metrik'] = pd.DataFrame([{
+        'stasiun': section.stasiun,
+        'model': section.model,
+        'window': section.window,
+        'threshold': section.threshold,
+        'mae': section.mae,
+        'mape': section.mape,
+        'kategori': section.kategori,
+    } for section in report.prediksi], columns=['stasiun', 'model', 'window', 'threshold', 'mae', 'mape', 'kategori'])
+    return result
+
+
+def charts_of(report):
+    for section in report.tahun:
+        yield f"{section.stasiun}_{section.tahun}", f"{section.stasiun} - Analisis Tahunan {section.tahun}", section.grafik
+    for section in report.prediksi:
+        if section.grafik is not None:
+            yield (f"{section.stasiun}_prediksi", f"{section.stasiun} - Prediksi ({section.label})", section.grafik)
+
+
+# NaN / inf tidak valid di Excel, ditulis sebagai sel kosong
+def _cell(value):
+    if isinstance(value, (float, np.floating)) and not np.isfinite(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+# Excel mode write-only: baris ditulis berurutan tanpa menyimpan seluruh sheet di memori
+def to_excel(report):
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image
+
+    workbook = Workbook(write_only=True)
+    for name, frame in tables(report).items():
+        sheet = workbook.create_sheet(name)
+        sheet.append(list(frame.columns))
+        for row in frame.itertuples(index=False, name=None):
+            sheet.append([_cell(value) for value in row])
+
+    # Setiap grafik diberi baris kosong setinggi gambar agar judul berikutnya tidak tertutup
+    sheet = workbook.create_sheet('Grafik')
+    row = 1
+    for _, title, png in charts_of(report):
+        sheet.append([title])
+        image = Image(io.BytesIO(png))
+        image.width, image.height = EXCEL_IMAGE_WIDTH, int(image.height * EXCEL_IMAGE_WIDTH / image.width)
+        sheet.add_image(image, f"A{row + 1}")
+        blank_rows = image.height // EXCEL_ROW_HEIGHT + 2
+        for _ in range(blank_rows):
+            sheet.append([])
+        row += 1 + blank_rows
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def to_csv_zip(report):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, frame in tables(report).items():
+            archive.writestr(name.lower().replace(' ', '_') + '.csv', frame.to_csv(index=False))
+    return buffer.getvalue()
+
+
+# PNG sudah terkompresi, disimpan tanpa kompresi ulang
+def to_png_zip(report):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for name, _, png in charts_of(report):
+            archive.writestr(f"{name}.png", png)
+    return buffer.getvalue()
+
+
+def _format_table(frame):
+    return [[('-' if pd.isna(value) else f'{value:.2f}' if isinstance(value, (float, np.floating)) else str(value))
+             for value in row] for row in frame.itertuples(index=False, name=None)]
+
+
+def _pdf_page(pdf, title, png=None, table=None, lines=()):
+    from matplotlib.figure import Figure
+    from matplotlib.image import imread
+
+    fig = Figure(figsize=PDF_PAGE_SIZE)
+    fig.suptitle(title, fontsize=14, fontweight='bold')
+    top = 0.92
+    for line in lines:
+        fig.text(0.05, top, line, fontsize=10)
+        top -= 0.035
+    if png is not None:
+        height = 0.5 if table is not None else top - 0.05
+        ax = fig.add_axes([0.05, top - height, 0.9, height])
+        ax.imshow(imread(io.BytesIO(png)))
+        ax.axis('off')
+        top -= height + 0.02
+    if table is not None and len(table):
+        ax = fig.add_axes([0.05, 0.03, 0.9, top - 0.05])
+        ax.axis('off')
+        cells = ax.table(cellText=_format_table(table), colLabels=list(table.columns), loc='upper center')
+        cells.auto_set_font_size(False)
+        cells.set_fontsize(7)
+    pdf.savefig(fig)
+
+
+def to_pdf(report):
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf:
+        summary = tables(report)['Ringkasan Tahunan']
+        _pdf_page(pdf, "Laporan Tinggi Muka Air dan Prediksi Banjir", table=summary,
+                  lines=[f"Dibuat: {report.dibuat}", f"Threshold banjir: {report.threshold} m"])
+        for section in report.tahun:
+            _pdf_page(pdf, f"{section.stasiun} - Analisis Tahunan {section.tahun}", section.grafik,
+                      section.bulanan.drop(columns=['bulan']),
+                      [f"Total hari banjir: {section.ringkasan['hari_banjir']} hari",
+                       f"TMA rata-rata: {section.ringkasan['tma_rata']:.2f} m, "
+                       f"tertinggi: {section.ringkasan['tma_max']:.2f} m"])
+        for section in report.prediksi:
+            lines = [f"Model: {section.label}"]
+            if section.kategori is not None:
+                lines.append(f"MAE: {section.mae:.1f}   MAPE: {section.mape:.1f}%   Kategori: {section.kategori}")
+            _pdf_page(pdf, f"{section.stasiun} - Prediksi Banjir Tahunan", section.grafik,
+                      section.tabel, lines)
+    return buffer.getvalue()
+
+
+WRITERS = {'xlsx': to_excel, 'csv': to_csv_zip, 'pdf': to_pdf, 'png': to_png_zip}
+
+
+@profiling.timed('report.export')
+def export(report, fmt):
+    if fmt not in WRITERS:
+        raise ValueError(f"Format laporan tidak dikenal: {fmt}")
+    return WRITERS[fmt](report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat laporan statistik TMA dan prediksi banjir")
+    parser.add_argument('--db', default=database.DB_PATH, help="File database SQLite (default: %(default)s)")
+    parser.add_argument('--stations', nargs='+', help="Stasiun yang dilaporkan (default: semua)")
+    parser.add_argument('--years', nargs='+', type=int, help="Tahun yang dilaporkan (default: semua)")
+    parser.add_argument('--threshold', type=float, default=forecasting.DEFAULT_THRESHOLD,
+                        help="Threshold banjir dalam meter (default: %(default)s)")
+    parser.add_argument('--model', default='sma', choices=list(models.MODELS),
+                        help="Model prediksi (default: %(default)s)")
+    parser.add_argument('--window', type=int, default=3, help="Periode Moving Average (default: %(default)s)")
+    parser.add_argument('--format', choices=FORMATS, help="Format laporan (default: dari ekstensi --output)")
+    parser.add_argument('--output', '-o', required=True, help="File laporan (.xlsx, .pdf, atau .zip)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Jumlah proses render paralel, 0 = semua core (default: %(default)s)")
+    parser.add_argument('--cache-dir', help=f"Direktori cache bagian laporan (default: <db>{REPORT_CACHE_SUFFIX})")
+    parser.add_argument('--no-cache', action='store_true', help="Jangan pakai cache disk")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or {'xlsx': 'xlsx', 'pdf': 'pdf', 'zip': 'csv'}.get(args.output.rsplit('.', 1)[-1].lower())
+    if fmt is None:
+        parser.error("Format tidak bisa ditentukan dari nama file, gunakan --format")
+    if not os.path.exists(args.db):
+        parser.error(f"Database tidak ditemukan: {args.db}")
+    database.use_database(args.db)
+    stations = args.stations or database.list_stations()
+
+    start = time.perf_counter()
+    report = generate(stations, args.years, args.threshold, args.model, args.window,
+                      workers=args.workers or os.cpu_count() or 1, processes=True,
+                      cache_dir=None if args.no_cache else args.cache_dir or report_cache_dir())
+    if not report.tahun:
+        parser.error("Tidak ada data TMA untuk stasiun dan tahun yang dipilih")
+    content = export(report, fmt)
+    with open(args.output, 'wb') as f:
+        f.write(content)
+    print(f"{args.output}: {report.dirender} bagian dirender, {report.dari_cache} dari cache, "
+          f"{time.perf_counter() - start:.2f} detik", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
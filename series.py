@@ -0,0 +1,132 @@
+# series.py - Deret waktu TMA yang ringkas dan tidak dapat diubah (read-only)
+import calendar
+import threading
+import numpy as np
+import pandas as pd
+
+READING_COLUMNS = ['jam_06', 'jam_12', 'jam_18', 'tma_min', 'tma_max', 'tma_rata']
+DERIVED_COLUMNS = ['tahun', 'bulan', 'hari']
+# Lookup 12 nama bulan untuk kolom kategori nama_bulan
+MONTH_NAMES = list(calendar.month_name[1:])
+
+
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+
+# Satu objek dipakai bersama oleh semua sesi: tanggal datetime64[D], bacaan float32,
+# kolom turunan (tahun int16, bulan/hari uint8) dihitung saat pertama diminta lalu disimpan.
+# Data harus terurut berdasarkan tanggal sehingga potongan tahun/bulan berupa view tanpa salinan.
+# derived: kolom turunan yang sudah dihitung (misalnya dari snapshot.py), dipakai jika data sudah terurut.
+class TMASeries:
+    def __init__(self, tanggal, readings, derived=None):
+        tanggal = np.asarray(tanggal, dtype='datetime64[D]')
+        readings = {name: np.asarray(values, dtype=np.float32) for name, values in readings.items()}
+        if len(tanggal) > 1 and np.any(tanggal[1:] < tanggal[:-1]):
+            order = np.argsort(tanggal, kind='stable')
+            tanggal = tanggal[order]
+            readings = {name: values[order] for name, values in readings.items()}
+            derived = None
+        self._tanggal = _readonly(tanggal)
+        self._readings = {name: _readonly(values) for name, values in readings.items()}
+        self._derived = {name: _readonly(np.asarray(values)) for name, values in (derived or {}).items()}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df['tanggal'].to_numpy(), {col: df[col].to_numpy() for col in READING_COLUMNS})
+
+    def _view(self, lo, hi):
+        child = TMASeries.__new__(TMASeries)
+        child._tanggal = self._tanggal[lo:hi]
+        child._readings = {name: values[lo:hi] for name, values in self._readings.items()}
+        child._derived = {name: values[lo:hi] for name, values in self._derived.items()
+                          if isinstance(values, np.ndarray) and len(values) == len(self)}
+        child._lock = threading.RLock()
+        return child
+
+    def _memo(self, name, compute):
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = compute()
+                    if isinstance(value, np.ndarray):
+                        _readonly(value)
+                    self._derived[name] = value
+        return value
+
+    def __len__(self):
+        return len(self._tanggal)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __getitem__(self, name):
+        if name == 'tanggal':
+            return self._tanggal
+        if name in self._readings:
+            return self._readings[name]
+        if name in ('tahun', 'bulan', 'hari', 'nama_bulan'):
+            return getattr(self, name)
+        raise KeyError(name)
+
+    @property
+    def tanggal(self):
+        return self._tanggal
+
+    @property
+    def tahun(self):
+        return self._memo('tahun', lambda: (self._tanggal.astype('datetime64[Y]').astype(np.int64) + 1970).astype(np.int16))
+
+    @property
+    def bulan(self):
+        return self._memo('bulan', lambda: (self._tanggal.astype('datetime64[M]').astype(np.int64) % 12 + 1).astype(np.uint8))
+
+    @property
+    def hari(self):
+        return self._memo('hari', lambda: ((self._tanggal - self._tanggal.astype('datetime64[M]')).astype(np.int64) + 1).astype(np.uint8))
+
+    @property
+    def nama_bulan(self):
+        return pd.Categorical.from_codes(self.bulan.astype(np.int8) - 1, categories=MONTH_NAMES)
+
+    def years(self):
+        return self._memo('years', lambda: np.unique(self.tahun).tolist())
+
+    def months(self):
+        return np.unique(self.bulan).tolist()
+
+    # Potongan satu tahun / satu bulan dengan pencarian biner pada tanggal (view, tanpa salinan)
+    def year(self, year):
+        year = int(year)
+        lo, hi = np.searchsorted(self._tanggal, [np.datetime64(f'{year:04d}-01-01'),
+                                                 np.datetime64(f'{year + 1:04d}-01-01')])
+        return self._view(lo, hi)
+
+    def month(self, year, month):
+        start = np.datetime64(f'{int(year):04d}-{int(month):02d}', 'M')
+        lo, hi = np.searchsorted(self._tanggal, [start.astype('datetime64[D]'),
+                                                 (start + 1).astype('datetime64[D]')])
+        return self._view(lo, hi)
+
+    # Bandingkan dengan threshold pada presisi kolom (float32) agar bacaan 1.60 tidak dianggap > 1.60
+    def above(self, column, threshold):
+        values = self[column]
+        return values > values.dtype.type(threshold)
+
+    # DataFrame kecil untuk ditampilkan (misalnya data satu bulan)
+    def to_frame(self, mask=None):
+        frame = pd.DataFrame({'tanggal': self._tanggal.astype('datetime64[ns]')})
+        for name, values in self._readings.items():
+            frame[name] = np.round(values.astype(np.float64), 3)
+        frame['tahun'] = self.tahun
+        frame['bulan'] = self.bulan
+        frame['nama_bulan'] = self.nama_bulan
+        frame['hari'] = self.hari
+        if mask is not None:
+            frame = frame[mask]
+        return frame
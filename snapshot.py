@@ -0,0 +1,320 @@
+# snapshot.py - Snapshot data TMA read-only yang dibagi oleh beberapa proses worker Streamlit
+#
+# Mode multi-worker: beberapa proses `streamlit run app.py` (port berbeda di belakang reverse proxy
+# dengan sticky session) memakai satu snapshot di SNAPSHOT_DIR. Loader menulis deret TMA setiap
+# stasiun (tanggal, bacaan, kolom turunan tahun/bulan/hari) beserta array ThresholdSweep per tahun dan
+# per bulan sebagai file .npy ke direktori v<versi data>, lalu mengganti file CURRENT secara atomik.
+# Worker membuka file tersebut memory-mapped read-only, sehingga halaman memorinya dibagi lewat page
+# cache OS: memori per worker tetap datar berapa pun jumlah worker. Direktori versi tidak pernah diubah
+# setelah diterbitkan; versi lama dihapus jika sudah ada KEEP_VERSIONS versi yang lebih baru dan versi
+# tersebut sudah digantikan lebih dari RETAIN_SECONDS (worker yang masih memegang nama versi lama sempat
+# membukanya; file yang sudah di-mmap tetap ada sampai ditutup). Stasiun yang tidak ada di snapshot
+# (ditambahkan setelah diterbitkan, atau versinya sudah dihapus) menimbulkan FileNotFoundError
+# sehingga pemanggil bisa membaca dari SQLite.
+#
+# Agregat SQL (tma_bulanan, banjir_tahunan, ...) tetap dibaca dari SQLite lewat pool koneksi: tabelnya
+# kecil dan sudah dihitung sebelumnya.
+#
+#   python snapshot.py --serve 4                   # loader + 4 worker di port 8501-8504
+#   python snapshot.py --watch                     # loader saja (worker dijalankan sendiri)
+#   python snapshot.py --load-test 1 2 4           # throughput dan memori per jumlah worker
+#
+# Worker mengaktifkan mode ini dengan variabel TMA_SNAPSHOT_DIR (path yang sama dengan loader).
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from urllib.parse import quote, unquote
+import numpy as np
+import database
+import thresholds
+from series import DERIVED_COLUMNS, READING_COLUMNS, TMASeries
+
+SNAPSHOT_DIR = os.environ.get('TMA_SNAPSHOT_DIR') or None
+if SNAPSHOT_DIR is not None:
+    SNAPSHOT_DIR = os.path.abspath(SNAPSHOT_DIR)
+DEFAULT_SNAPSHOT_DIR = 'tma_snapshot'
+CURRENT_FILE = 'CURRENT'
+# Jumlah versi yang disimpan (termasuk versi terkini)
+KEEP_VERSIONS = 3
+# Lama versi lama tetap disimpan setelah digantikan versi berikutnya (detik)
+RETAIN_SECONDS = 600
+# Interval loader memeriksa versi data (detik)
+WATCH_SECONDS = 1.0
+# Port worker pertama untuk --serve
+BASE_PORT = 8501
+# Permintaan per uji beban (dibagi rata ke semua worker)
+LOAD_REQUESTS = 1000
+
+SWEEP_PARTS = ['buckets', 'starts', 'ends', 'values']
+_VERSION_NAME = re.compile(r'^v(\d+)$')
+
+
+def enabled():
+    return SNAPSHOT_DIR is not None
+
+
+def _station_dir(name, stasiun):
+    return os.path.join(SNAPSHOT_DIR, name, quote(stasiun, safe=''))
+
+
+def _version(name):
+    match = _VERSION_NAME.match(name or '')
+    return int(match.group(1)) if match else -1
+
+
+# Nama snapshot terkini (misalnya 'v12'), None jika belum ada yang diterbitkan
+def current():
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _set_current(name):
+    path = os.path.join(SNAPSHOT_DIR, CURRENT_FILE)
+    with open(path + '.tmp', 'w') as f:
+        f.write(name)
+    os.replace(path + '.tmp', path)
+
+
+# Kunci antar proses (loader dan worker yang menerbitkan setelah upload)
+class _PublishLock:
+    def __enter__(self):
+        import fcntl
+        self._file = open(os.path.join(SNAPSHOT_DIR, '.lock'), 'w')
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+
+def _save(path, name, array):
+    np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(array))
+
+
+def _write_station(path, series):
+    os.makedirs(path)
+    _save(path, 'tanggal', series['tanggal'].astype(np.int64))
+    for name in READING_COLUMNS + DERIVED_COLUMNS:
+        _save(path, name, series[name])
+    for by, build in (('year', thresholds.ThresholdSweep.by_year), ('month', thresholds.ThresholdSweep.by_month)):
+        for part, array in build(series['tanggal'], series['tma_max']).arrays().items():
+            _save(path, f'sweep_{by}_{part}', array)
+
+
+# Tulis seluruh stasiun ke direktori sementara lalu rename menjadi direktori versi
+def _write(target):
+    tmp = target + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for stasiun in database.list_stations():
+        series = database.load_series(stasiun)
+        if not series.empty:
+            _write_station(os.path.join(tmp, quote(stasiun, safe='')), series)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+
+# Waktu versi digantikan = waktu direktori versi berikutnya diterbitkan (mtime)
+def _cleanup(keep=KEEP_VERSIONS, retain=RETAIN_SECONDS):
+    names = sorted((name for name in os.listdir(SNAPSHOT_DIR) if _VERSION_NAME.match(name)), key=_version)
+    active = current()
+    now = time.time()
+    for name, newer in zip(names[:-keep], names[1:]):
+        if name == active:
+            continue
+        try:
+            superseded = os.path.getmtime(os.path.join(SNAPSHOT_DIR, newer))
+        except FileNotFoundError:
+            continue
+        if now - superseded >= retain:
+            shutil.rmtree(os.path.join(SNAPSHOT_DIR, name), ignore_errors=True)
+
+
+# Terbitkan snapshot untuk versi data saat ini jika belum ada, mengembalikan nama snapshot terkini.
+# Versi dibaca sebelum data dimuat: jika ada penulisan selama proses, isi snapshot sudah lebih baru
+# dan versi berikutnya diterbitkan pada pemanggilan selanjutnya.
+def publish(force=False):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with _PublishLock():
+        name = f'v{database.get_data_version()}'
+        target = os.path.join(SNAPSHOT_DIR, name)
+        if force or not os.path.isdir(target):
+            _write(target)
+        if _version(name) >= _version(current()):
+            _set_current(name)
+        _cleanup()
+        return current()
+
+
+def _load(path, name):
+    return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+
+
+def _require(path):
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Stasiun tidak ada di snapshot: {path}")
+    return path
+
+
+# Deret satu stasiun dari snapshot, semua kolom memory-mapped (tanpa salinan).
+# FileNotFoundError jika stasiun tidak ada di snapshot ini.
+def load_series(name, stasiun):
+    path = _require(_station_dir(name, stasiun))
+    return TMASeries(_load(path, 'tanggal').view('datetime64[D]'),
+                     {column: _load(path, column) for column in READING_COLUMNS},
+                     {column: _load(path, column) for column in DERIVED_COLUMNS})
+
+
+# ThresholdSweep per tahun ('year') atau per bulan ('month') yang sudah diurutkan oleh loader
+def load_sweep(name, stasiun, by='month'):
+    path = _require(_station_dir(name, stasiun))
+    return thresholds.ThresholdSweep.from_arrays(*(_load(path, f'sweep_{by}_{part}') for part in SWEEP_PARTS))
+
+
+def stations(name):
+    path = os.path.join(SNAPSHOT_DIR, name)
+    return sorted(unquote(entry) for entry in os.listdir(path)) if os.path.isdir(path) else []
+
+
+# Loader: terbitkan ulang setiap kali versi data berubah (upload, reset, alert_service, CLI)
+def watch(interval=WATCH_SECONDS, stop=None):
+    while stop is None or not stop():
+        try:
+            publish()
+        except Exception as e:
+            print(f"Gagal menerbitkan snapshot: {str(e)}", file=sys.stderr)
+        time.sleep(interval)
+
+
+# Jalankan n worker Streamlit (port BASE_PORT ...) dan loader di proses ini
+def serve(workers, base_port=BASE_PORT):
+    env = dict(os.environ, TMA_SNAPSHOT_DIR=SNAPSHOT_DIR, TMA_DB_PATH=database.DB_PATH)
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+    publish()
+    processes = [subprocess.Popen([sys.executable, '-m', 'streamlit', 'run', app, '--server.headless', 'true',
+                                   '--server.port', str(base_port + i)], env=env)
+                 for i in range(workers)]
+    print(f"{workers} worker di port {base_port}-{base_port + workers - 1}, snapshot: {SNAPSHOT_DIR}")
+    try:
+        watch(stop=lambda: any(process.poll() is not None for process in processes))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+# Memori privat (anonim) proses ini dalam MB; halaman snapshot yang di-mmap tidak termasuk (Linux)
+def private_memory_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('RssAnon:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+# Satu permintaan halaman tipikal: potongan tahun/bulan, tabel bulan, hitung banjir dan sweep threshold
+def _request(cache, name, stasiun, tahun, bulan):
+    if stasiun not in cache:
+        cache[stasiun] = (load_series(name, stasiun), load_sweep(name, stasiun, 'month'))
+    series, sweep = cache[stasiun]
+    year = series.year(tahun)
+    year.month(tahun, bulan).to_frame()
+    int(year.above('tma_max', 1.6).sum())
+    sweep.sweep()
+
+
+def _load_worker(snapshot_dir, name, targets, requests, barrier, results):
+    global SNAPSHOT_DIR
+    SNAPSHOT_DIR = snapshot_dir
+    cache = {}
+    baseline = private_memory_mb()
+    barrier.wait()
+    start = time.perf_counter()
+    for i in range(requests):
+        stasiun, tahun = targets[i % len(targets)]
+        _request(cache, name, stasiun, tahun, i % 12 + 1)
+    elapsed = time.perf_counter() - start
+    memory = private_memory_mb()
+    results.put((elapsed, None if memory is None or baseline is None else memory - baseline))
+
+
+# Uji beban: total permintaan dibagi ke n proses worker yang masing-masing membuka snapshot sendiri.
+# Mengembalikan (detik sampai semua selesai, pertambahan memori privat rata-rata per worker dalam MB).
+def load_test(workers, requests=LOAD_REQUESTS, name=None):
+    import multiprocessing
+    name = name or current()
+    targets = [(stasiun, int(tahun)) for stasiun in stations(name)
+               for tahun in np.unique(load_series(name, stasiun).tahun)]
+    if not targets:
+        raise ValueError("Snapshot kosong, terbitkan snapshot terlebih dahulu")
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [context.Process(target=_load_worker,
+                                 args=(SNAPSHOT_DIR, name, targets, requests // workers, barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    start = time.perf_counter()
+    measured = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    memory = [mb for _, mb in measured if mb is not None]
+    return elapsed, (sum(memory) / len(memory) if memory else None)
+
+
+def main(argv=None):
+    global SNAPSHOT_DIR
+    parser = argparse.ArgumentParser(description="Snapshot data TMA bersama untuk mode multi-worker")
+    parser.add_argument('--db', default=database.DB_PATH, help="File database SQLite (default: %(default)s)")
+    parser.add_argument('--dir', default=SNAPSHOT_DIR or DEFAULT_SNAPSHOT_DIR,
+                        help="Direktori snapshot (default: TMA_SNAPSHOT_DIR atau %(default)s)")
+    parser.add_argument('--force', action='store_true', help="Tulis ulang snapshot versi saat ini")
+    parser.add_argument('--watch', action='store_true', help="Loader: terbitkan ulang setiap data berubah")
+    parser.add_argument('--serve', type=int, metavar='N', help="Jalankan loader dan N worker Streamlit")
+    parser.add_argument('--port', type=int, default=BASE_PORT, help="Port worker pertama (default: %(default)s)")
+    parser.add_argument('--load-test', type=int, nargs='+', metavar='N',
+                        help="Uji beban dengan N proses worker (misalnya 1 2 4)")
+    parser.add_argument('--requests', type=int, default=LOAD_REQUESTS,
+                        help="Jumlah permintaan uji beban (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"Database tidak ditemukan: {args.db}")
+    database.use_database(args.db)
+    SNAPSHOT_DIR = os.path.abspath(args.dir)
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+    name = publish(args.force)
+    print(f"Snapshot terkini: {name} ({', '.join(stations(name))})")
+    if args.load_test:
+        base = None
+        for workers in args.load_test:
+            elapsed, memory = load_test(workers, args.requests, name)
+            base = base or elapsed
+            memory = f"{memory:6.1f} MB" if memory is not None else "-"
+            print(f"{workers:>3} worker  {args.requests / elapsed:9.0f} permintaan/detik  "
+                  f"speedup {base / elapsed:4.2f}x  memori privat/worker {memory}")
+    if args.watch:
+        watch()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# synthetic.py - Generator data TMA sintetis (seeded) untuk benchmark dan uji coba
+#
+# Deret harian per stasiun: pola musim hujan (puncak sekitar Januari), kejadian banjir acak yang
+# naik cepat lalu surut perlahan, dan noise harian. Hasilnya berformat sama dengan file upload.
+import numpy as np
+import pandas as pd
+from database import TMA_COLUMNS
+
+BASE_LEVEL = 1.25
+SEASON_AMPLITUDE = 0.25
+STORMS_PER_YEAR = 6
+
+
+def _station_series(rng, tanggal, offset):
+    n = len(tanggal)
+    day_of_year = tanggal.dayofyear.to_numpy()
+    # Musim hujan November-April: kosinus dengan puncak sekitar 15 Januari
+    season = SEASON_AMPLITUDE * np.cos(2 * np.pi * (day_of_year - 15) / 365.25)
+    wet = np.clip(season / SEASON_AMPLITUDE, 0, None)
+
+    # Kejadian banjir: lonjakan eksponensial yang lebih sering di musim hujan
+    storm_prob = STORMS_PER_YEAR / 365.25 * (0.3 + 1.7 * wet)
+    storms = rng.random(n) < storm_prob
+    impulse = np.where(storms, rng.gamma(2.0, 0.35, n), 0.0)
+    decay = 0.6
+    kernel = decay ** np.arange(15)
+    surge = np.convolve(impulse, kernel)[:n]
+
+    daily = BASE_LEVEL + offset + season + surge + rng.normal(0, 0.03, n)
+    return daily
+
+
+# DataFrame TMA sintetis: kolom stasiun + TMA_COLUMNS, satu baris per stasiun per hari
+def generate(stations=1, years=6, start_year=2019, seed=0, missing_fraction=0.0):
+    rng = np.random.default_rng(seed)
+    tanggal = pd.date_range(f'{start_year}-01-01', f'{start_year + years - 1}-12-31', freq='D')
+    frames = []
+    for i in range(stations):
+        daily = _station_series(rng, tanggal, offset=rng.normal(0, 0.05))
+        spread = np.abs(rng.normal(0.05, 0.02, (3, len(tanggal))))
+        jam_06 = daily - spread[0]
+        jam_12 = daily + spread[1]
+        jam_18 = daily - spread[2] / 2
+        readings = np.vstack([jam_06, jam_12, jam_18])
+        frame = pd.DataFrame({
+            'stasiun': f'stasiun_{i + 1:02d}',
+            'tanggal': tanggal,
+            'jam_06': jam_06.round(2),
+            'jam_12': jam_12.round(2),
+            'jam_18': jam_18.round(2),
+            'tma_min': readings.min(axis=0).round(2),
+            'tma_max': readings.max(axis=0).round(2),
+            'tma_rata': readings.mean(axis=0).round(2),
+        })
+        if missing_fraction:
+            frame = frame[rng.random(len(frame)) >= missing_fraction]
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)[['stasiun'] + TMA_COLUMNS]
+
+
+# Format file upload: tanggal dd/mm/yyyy, koma sebagai pemisah desimal (opsional)
+def to_upload_frame(df, decimal_comma=False):
+    out = df.copy()
+    out['tanggal'] = out['tanggal'].dt.strftime('%d/%m/%Y')
+    if decimal_comma:
+        for col in TMA_COLUMNS[1:]:
+            out[col] = out[col].round(2).astype(str).str.replace('.', ',', regex=False)
+    return out
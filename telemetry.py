@@ -0,0 +1,164 @@
+# telemetry.py - Penyimpanan bacaan TMA frekuensi tinggi (logger 5-15 menit) dan piramida downsampling
+#
+# Bacaan mentah disimpan di tma_telemetri. Piramida tma_piramida menyimpan min/maks/rata-rata per
+# jam, hari dan bulan; level hari dipakai untuk menurunkan baris harian tma_data sehingga analisis
+# banjir dan agregat yang sudah ada tetap bekerja tanpa perubahan.
+import pandas as pd
+import profiling
+
+# Level dari yang paling halus; detik per titik dipakai untuk memilih level sesuai rentang grafik.
+# 'mentah' memakai interval logger tercepat (5 menit) sebagai perkiraan.
+LEVELS = ['mentah', 'jam', 'hari', 'bulan']
+LEVEL_SECONDS = {'mentah': 300, 'jam': 3600, 'hari': 86400, 'bulan': 30 * 86400}
+MAX_POINTS = 1500
+KEY_FORMATS = {'mentah': '%Y-%m-%d %H:%M:%S', 'jam': '%Y-%m-%d %H:00', 'hari': '%Y-%m-%d', 'bulan': '%Y-%m'}
+
+CREATE_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS tma_telemetri
+       (stasiun TEXT NOT NULL,
+        waktu TEXT NOT NULL,
+        tma REAL NOT NULL,
+        PRIMARY KEY (stasiun, waktu)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS tma_piramida
+       (stasiun TEXT NOT NULL,
+        level TEXT NOT NULL,
+        waktu TEXT NOT NULL,
+        jumlah INTEGER,
+        tma_min REAL,
+        tma_max REAL,
+        tma_rata REAL,
+        PRIMARY KEY (stasiun, level, waktu)) WITHOUT ROWID''',
+]
+
+UPSERT_READING = '''INSERT INTO tma_telemetri (stasiun, waktu, tma) VALUES (?, ?, ?)
+                    ON CONFLICT (stasiun, waktu) DO UPDATE SET tma=excluded.tma'''
+
+# Baris harian tma_data dari level hari; jam_06/12/18 = rata-rata jam tersebut,
+# atau rata-rata harian jika logger tidak mencatat pada jam itu
+DAILY_ROWS = '''SELECT d.stasiun, d.waktu,
+                       COALESCE(h06.tma_rata, d.tma_rata), COALESCE(h12.tma_rata, d.tma_rata),
+                       COALESCE(h18.tma_rata, d.tma_rata), d.tma_min, d.tma_max, d.tma_rata
+                FROM tma_piramida d
+                LEFT JOIN tma_piramida h06 ON h06.stasiun = d.stasiun AND h06.level = 'jam'
+                                          AND h06.waktu = d.waktu || ' 06:00'
+                LEFT JOIN tma_piramida h12 ON h12.stasiun = d.stasiun AND h12.level = 'jam'
+                                          AND h12.waktu = d.waktu || ' 12:00'
+                LEFT JOIN tma_piramida h18 ON h18.stasiun = d.stasiun AND h18.level = 'jam'
+                                          AND h18.waktu = d.waktu || ' 18:00'
+                WHERE d.stasiun = ? AND d.level = 'hari' AND d.waktu >= ? AND d.waktu < ?'''
+
+# Kunci bucket berupa teks yang terurut: jam 'YYYY-MM-DD HH:00', hari 'YYYY-MM-DD', bulan 'YYYY-MM'
+_INSERT_LEVEL = '''INSERT INTO tma_piramida
+                   SELECT stasiun, ?, {bucket}, {count}, MIN({low}), MAX({high}), {mean}
+                   FROM {source}
+                   WHERE stasiun = ? {source_level} AND waktu >= ? AND waktu < ?
+                   GROUP BY stasiun, {bucket}'''
+
+_LEVEL_SQL = {
+    'jam': _INSERT_LEVEL.format(bucket="substr(waktu, 1, 13) || ':00'", count='COUNT(*)', low='tma',
+                                high='tma', mean='AVG(tma)', source='tma_telemetri', source_level=''),
+    'hari': _INSERT_LEVEL.format(bucket='substr(waktu, 1, 10)', count='SUM(jumlah)', low='tma_min',
+                                 high='tma_max', mean='SUM(tma_rata * jumlah) / SUM(jumlah)',
+                                 source='tma_piramida', source_level="AND level = 'jam'"),
+    'bulan': _INSERT_LEVEL.format(bucket='substr(waktu, 1, 7)', count='SUM(jumlah)', low='tma_min',
+                                  high='tma_max', mean='SUM(tma_rata * jumlah) / SUM(jumlah)',
+                                  source='tma_piramida', source_level="AND level = 'hari'"),
+}
+
+
+def create_tables(conn):
+    for ddl in CREATE_TABLES:
+        conn.execute(ddl)
+
+
+def to_rows(df, stasiun):
+    waktu = pd.to_datetime(df['waktu']).dt.strftime(KEY_FORMATS['mentah'])
+    return zip([stasiun] * len(df), waktu, df['tma'].astype(float))
+
+
+def _day(timestamp):
+    return pd.Timestamp(timestamp).strftime('%Y-%m-%d')
+
+
+# Hitung ulang piramida untuk hari-hari (dan bulan-bulan) yang tersentuh rentang [start, end].
+# Dipanggil di dalam transaksi yang sama dengan penulisan tma_telemetri.
+# Mengembalikan rentang hari [lo, hi) yang diperbarui.
+@profiling.timed('telemetry.refresh')
+def refresh(conn, stasiun, start, end):
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize()
+    lo, hi = _day(start), _day(end + pd.Timedelta(days=1))
+    month_lo = start.strftime('%Y-%m')
+    month_hi = (end + pd.offsets.MonthBegin(1)).strftime('%Y-%m')
+    ranges = {'jam': (lo, hi), 'hari': (lo, hi), 'bulan': (month_lo, month_hi)}
+
+    for level in LEVELS[1:]:
+        level_lo, level_hi = ranges[level]
+        conn.execute("DELETE FROM tma_piramida WHERE stasiun=? AND level=? AND waktu >= ? AND waktu < ?",
+                     (stasiun, level, level_lo, level_hi))
+        conn.execute(_LEVEL_SQL[level], (level, stasiun, level_lo, level_hi))
+    return lo, hi
+
+
+def clear(conn, stasiun=None):
+    for table in ['tma_telemetri', 'tma_piramida']:
+        if stasiun is None:
+            conn.execute(f"DELETE FROM {table}")
+        else:
+            conn.execute(f"DELETE FROM {table} WHERE stasiun=?", (stasiun,))
+
+
+# Pilih level paling halus yang jumlah titiknya pada rentang [start, end] tidak melebihi max_points
+def choose_level(start, end, max_points=MAX_POINTS):
+    span = (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds()
+    for level in LEVELS:
+        if span / LEVEL_SECONDS[level] <= max_points:
+            return level
+    return LEVELS[-1]
+
+
+def _bucket_start(level, timestamp):
+    if level == 'jam':
+        return timestamp.replace(minute=0, second=0, microsecond=0, nanosecond=0)
+    if level == 'hari':
+        return timestamp.normalize()
+    return timestamp.normalize().replace(day=1)
+
+
+def _next_bucket(level, timestamp):
+    step = {'jam': pd.Timedelta(hours=1), 'hari': pd.Timedelta(days=1), 'bulan': pd.DateOffset(months=1)}[level]
+    return _bucket_start(level, timestamp) + step
+
+
+# Kunci bucket teks untuk rentang [start, end): bucket yang beririsan dengan rentang ikut terbaca
+def _bounds(level, start, end):
+    fmt = KEY_FORMATS[level]
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if level == 'mentah':
+        return start.strftime(fmt), end.strftime(fmt)
+    return _bucket_start(level, start).strftime(fmt), _next_bucket(level, end - pd.Timedelta(1)).strftime(fmt)
+
+
+# Data satu level pada rentang waktu [start, end) dengan kolom waktu, tma_min, tma_max, tma_rata
+def read_level(conn, stasiun, level, start, end):
+    lo, hi = _bounds(level, start, end)
+    if level == 'mentah':
+        query = '''SELECT waktu, tma AS tma_min, tma AS tma_max, tma AS tma_rata FROM tma_telemetri
+                   WHERE stasiun = ? AND waktu >= ? AND waktu < ? ORDER BY waktu'''
+        params = (stasiun, lo, hi)
+    else:
+        query = '''SELECT waktu, tma_min, tma_max, tma_rata FROM tma_piramida
+                   WHERE stasiun = ? AND level = ? AND waktu >= ? AND waktu < ? ORDER BY waktu'''
+        params = (stasiun, level, lo, hi)
+    frame = pd.read_sql(query, conn, params=params)
+    frame['waktu'] = pd.to_datetime(frame['waktu'])
+    return frame
+
+
+# Rentang waktu bacaan mentah satu stasiun, None jika stasiun tidak punya data telemetri
+def read_range(conn, stasiun):
+    start, end = conn.execute("SELECT MIN(waktu), MAX(waktu) FROM tma_telemetri WHERE stasiun = ?",
+                              (stasiun,)).fetchone()
+    if start is None:
+        return None
+    return pd.Timestamp(start), pd.Timestamp(end)
@@ -0,0 +1,54 @@
+# conftest.py - Modul aplikasi diimpor dari root repo; tes database memakai file sementara sendiri
+import os
+import sys
+import pandas as pd
+import pytest
+
+# Biaya scrypt kecil agar tes auth cepat (dibaca auth.py saat impor)
+os.environ.setdefault('TMA_SCRYPT_N', str(2 ** 10))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+# Buka file database (skema dipastikan terkini); koneksi ditutup dan DB_PATH dikembalikan setelah tes
+@pytest.fixture
+def open_db():
+    previous = database.DB_PATH
+    opened = []
+
+    def _open(path):
+        database.use_database(str(path))
+        opened.append(database.DB_PATH)
+        return database.DB_PATH
+
+    yield _open
+    for path in opened:
+        database.DB_PATH = path
+        database.close_connections()
+    database.DB_PATH = previous
+
+
+# Database kosong dengan skema terkini di tmp_path
+@pytest.fixture
+def db(open_db, tmp_path):
+    return open_db(tmp_path / 'tes.db')
+
+
+def _tma_frame(tanggal, tma_max):
+    tma_max = pd.Series(tma_max, dtype=float).round(2).to_numpy()
+    return pd.DataFrame({
+        'tanggal': pd.to_datetime(list(tanggal)),
+        'jam_06': tma_max - 0.1,
+        'jam_12': tma_max,
+        'jam_18': tma_max - 0.05,
+        'tma_min': tma_max - 0.1,
+        'tma_max': tma_max,
+        'tma_rata': tma_max - 0.05,
+    })
+
+
+# Pembuat frame format tma_data dari tanggal dan tma_max (kolom bacaan lain diturunkan)
+@pytest.fixture
+def tma_frame():
+    return _tma_frame
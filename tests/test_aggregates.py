@@ -0,0 +1,69 @@
+# test_aggregates.py - Agregat bulanan/tahunan yang diperbarui inkremental sama dengan bangun ulang penuh
+import numpy as np
+import pandas as pd
+import pytest
+import aggregates
+import database
+import forecasting
+import synthetic
+
+
+def _tables():
+    keys = {'tma_bulanan': 'stasiun, tahun, bulan', 'banjir_bulanan': 'stasiun, tahun, bulan, threshold_cm',
+            'tma_tahunan': 'stasiun, tahun', 'banjir_tahunan': 'stasiun, tahun, threshold_cm'}
+    with database.connect() as conn:
+        return {table: pd.read_sql(f"SELECT * FROM {table} ORDER BY {keys[table]}", conn)
+                for table in aggregates.AGGREGATE_TABLES}
+
+
+# Upload bertahap dengan potongan acak yang saling tumpang tindih, sebagian menimpa nilai lama
+def _upload_in_chunks(data, seed):
+    rng = np.random.default_rng(seed)
+    for stasiun, frame in data.groupby('stasiun'):
+        frame = frame.drop(columns='stasiun').reset_index(drop=True)
+        start = 0
+        while start < len(frame):
+            end = start + int(rng.integers(20, 300))
+            database.upsert_tma(frame.iloc[start:end], stasiun)
+            start = end - int(rng.integers(0, 15))
+        for _ in range(5):
+            lo = int(rng.integers(0, len(frame)))
+            chunk = frame.iloc[lo:lo + int(rng.integers(1, 90))].copy()
+            chunk[database.NUMERIC_COLUMNS] = (chunk[database.NUMERIC_COLUMNS] + rng.normal(0, 0.4)).round(2)
+            database.upsert_tma(chunk, stasiun)
+
+
+def test_incremental_refresh_matches_rebuild(db):
+    _upload_in_chunks(synthetic.generate(stations=2, years=3, seed=3, missing_fraction=0.05), seed=0)
+    incremental = _tables()
+    with database.transaction() as conn:
+        aggregates.rebuild(conn)
+    rebuilt = _tables()
+
+    for table in aggregates.AGGREGATE_TABLES:
+        assert len(rebuilt[table]) > 0
+        pd.testing.assert_frame_equal(incremental[table], rebuilt[table], check_exact=False)
+
+
+def test_reset_station_clears_its_aggregates(db):
+    _upload_in_chunks(synthetic.generate(stations=2, years=1, seed=5), seed=1)
+    database.reset_tma('stasiun_01')
+    for table, frame in _tables().items():
+        assert set(frame['stasiun']) == {'stasiun_02'}, table
+
+
+# Tabel agregat (threshold standar) dan query langsung (threshold lain, termasuk yang dekat kelipatan
+# 10 cm seperti 1.496) sama dengan hitungan dari deret harian
+@pytest.mark.parametrize('threshold', [1.3, 1.6, 1.63, 1.004, 1.496])
+def test_flood_counts_match_daily_series(db, threshold):
+    _upload_in_chunks(synthetic.generate(stations=1, years=4, seed=7, missing_fraction=0.02), seed=2)
+    series = database.load_series('stasiun_01')
+    expected = forecasting.yearly_flood_counts(series['tanggal'], series['tma_max'], threshold)
+
+    actual = database.load_yearly_floods(threshold, 'stasiun_01')
+    assert actual['tahun'].tolist() == expected['tahun'].tolist()
+    assert actual['banjir'].tolist() == expected['banjir'].tolist()
+
+    monthly = database.load_monthly_floods(threshold, 'stasiun_01')
+    assert monthly.groupby('tahun')['hari_banjir'].sum().tolist() == expected['banjir'].tolist()
+    assert monthly['jumlah_hari'].sum() == len(series)
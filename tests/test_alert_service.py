@@ -0,0 +1,41 @@
+# test_alert_service.py - Folder pantauan: ekstensi tanpa beda huruf besar/kecil, file bermasalah dilewati
+import io
+import os
+import queue
+import types
+import pytest
+import alert_service
+
+
+class _Stop(Exception):
+    pass
+
+
+def _watch_once(path, monkeypatch):
+    def _sleep(seconds):
+        raise _Stop()
+
+    monkeypatch.setattr(alert_service.time, 'sleep', _sleep)
+    service = types.SimpleNamespace(queue=queue.Queue(), log=io.StringIO())
+    with pytest.raises(_Stop):
+        alert_service.watch_directory(service, str(path))
+    batches = []
+    while not service.queue.empty():
+        batches.append(service.queue.get())
+    return batches, service.log.getvalue()
+
+
+def test_watch_directory_skips_unreadable_files(tmp_path, monkeypatch):
+    (tmp_path / 'a.csv').write_text('2024-01-01 06:00,1.2\n')
+    (tmp_path / 'B.CSV').write_text('2024-01-01 12:00,1.7\n')
+    # Direktori bernama .csv: open() gagal dengan OSError
+    (tmp_path / 'rusak.csv').mkdir()
+    (tmp_path / 'catatan.txt').write_text('abaikan\n')
+
+    batches, log = _watch_once(tmp_path, monkeypatch)
+
+    assert sorted(line for lines in batches for line in lines) == ['2024-01-01 06:00,1.2\n',
+                                                                 '2024-01-01 12:00,1.7\n']
+    assert 'rusak.csv' in log
+    assert sorted(os.listdir(tmp_path)) == ['B.CSV' + alert_service.DONE_SUFFIX, 'a.csv' + alert_service.DONE_SUFFIX,
+                                            'catatan.txt', 'rusak.csv']
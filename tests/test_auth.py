@@ -0,0 +1,81 @@
+# test_auth.py - Hash password scrypt, login (rehash dan batas verifikasi bersamaan) dan token sesi HMAC
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import auth
+import database
+
+
+def test_hash_and_verify():
+    stored = auth.hash_password('rahasia')
+    assert auth.is_hashed(stored)
+    assert auth.verify_password('rahasia', stored)
+    assert not auth.verify_password('salah', stored)
+    # Salt acak: hash berbeda untuk password yang sama
+    assert auth.hash_password('rahasia') != stored
+
+
+def test_verify_rejects_plain_and_malformed_hashes():
+    assert not auth.verify_password('rahasia', 'rahasia')
+    assert not auth.verify_password('rahasia', None)
+    assert not auth.verify_password('rahasia', 'scrypt$bukan$angka')
+    assert not auth.verify_password('rahasia', 'scrypt$1024$8$1$!!!$!!!')
+
+
+def test_needs_rehash_when_cost_changes():
+    assert not auth.needs_rehash(auth.hash_password('rahasia'))
+    assert auth.needs_rehash(auth.hash_password('rahasia', n=auth.SCRYPT_N * 2))
+
+
+def test_login_rehashes_old_cost(db):
+    database.set_password_hash('user', auth.hash_password('user123', n=auth.SCRYPT_N * 2))
+    assert auth.login('user', 'salah') is None
+    assert auth.needs_rehash(database.get_credentials('user')[0])
+
+    token = auth.login('user', 'user123')
+    assert auth.session_user(token) == ('user', 'user')
+    stored = database.get_credentials('user')[0]
+    assert not auth.needs_rehash(stored) and auth.verify_password('user123', stored)
+    assert auth.login('tidak_ada', 'user123') is None
+
+
+def test_login_caps_concurrent_verifications(db, monkeypatch):
+    active = []
+    peak = []
+    lock = threading.Lock()
+    verify = auth.verify_password
+
+    def slow_verify(password, stored):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.pop()
+        return verify(password, stored)
+
+    monkeypatch.setattr(auth, 'verify_password', slow_verify)
+    with ThreadPoolExecutor(max_workers=auth.VERIFY_WORKERS * 3) as pool:
+        tokens = list(pool.map(lambda _: auth.login('123', '123'), range(auth.VERIFY_WORKERS * 6)))
+    assert all(auth.session_user(token) == ('123', 'admin') for token in tokens)
+    assert max(peak) == auth.VERIFY_WORKERS
+
+
+def test_token_roundtrip_and_expiry():
+    assert auth.session_user(auth.issue_token('budi', 'user')) == ('budi', 'user')
+    assert auth.session_user(auth.issue_token('budi', 'user', ttl=-1)) is None
+
+
+def test_tampered_tokens_are_rejected(monkeypatch):
+    token = auth.issue_token('budi', 'user')
+    payload, signature = token.rsplit('.', 1)
+    forged = auth._b64(f"budi\nadmin\n{int(time.time()) + 3600}".encode('utf-8'))
+    assert auth.session_user(f"{forged}.{signature}") is None
+    assert auth.session_user(f"{payload}.{'B' if signature[0] == 'A' else 'A'}{signature[1:]}") is None
+    assert auth.session_user(payload) is None
+    assert auth.session_user('') is None
+    assert auth.session_user(None) is None
+
+    # Token dari kunci lain (misalnya proses lain tanpa TMA_SESSION_SECRET yang sama) ditolak
+    monkeypatch.setattr(auth, 'SESSION_SECRET', b'kunci-lain')
+    assert auth.session_user(token) is None
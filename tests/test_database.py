@@ -0,0 +1,128 @@
+# test_database.py - Migrasi skema dan penyimpanan tma_data (upsert per stasiun + tanggal)
+import sqlite3
+import numpy as np
+import auth
+import database
+
+# Skema aplikasi awal: tma_data append-only tanpa stasiun, tanggal dari pandas.to_sql, password polos
+BASELINE_SCHEMA = [
+    "CREATE TABLE users (username TEXT PRIMARY KEY, password TEXT)",
+    '''CREATE TABLE tma_data (id INTEGER PRIMARY KEY AUTOINCREMENT, tanggal TEXT, jam_06 REAL, jam_12 REAL,
+                              jam_18 REAL, tma_min REAL, tma_max REAL, tma_rata REAL)''',
+]
+
+
+def _baseline_db(path):
+    conn = sqlite3.connect(str(path))
+    for ddl in BASELINE_SCHEMA:
+        conn.execute(ddl)
+    conn.executemany("INSERT INTO users VALUES (?, ?)", [('123', '123'), ('user', 'user123')])
+    conn.executemany("INSERT INTO tma_data (tanggal, jam_06, jam_12, jam_18, tma_min, tma_max, tma_rata) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)", [
+                         ('2019-01-02 00:00:00', 1.0, 1.0, 1.0, 1.0, 1.0, 1.0),
+                         ('2019-01-01 00:00:00', 1.2, 1.3, 1.1, 1.1, 1.3, 1.2),
+                         # Upload ulang tanggal yang sama: baris terakhir yang dipertahankan
+                         ('2019-01-02 00:00:00', 1.6, 1.8, 1.7, 1.6, 1.8, 1.7),
+                         ('2020-03-01 00:00:00', 1.4, 1.5, 1.4, 1.4, 1.5, 1.43),
+                         (None, 9.0, 9.0, 9.0, 9.0, 9.0, 9.0),
+                     ])
+    conn.commit()
+    conn.close()
+
+
+def _rows(query, params=()):
+    with database.connect() as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def test_migrates_baseline_database(tmp_path, open_db):
+    path = tmp_path / 'lama.db'
+    _baseline_db(path)
+    open_db(path)
+
+    assert _rows("PRAGMA user_version") == [(database.SCHEMA_VERSION,)]
+    assert _rows("SELECT stasiun, tanggal, tma_max, tanggal_hari FROM tma_data ORDER BY tanggal") == [
+        (database.DEFAULT_STATION, '2019-01-01', 1.3, 17897),
+        (database.DEFAULT_STATION, '2019-01-02', 1.8, 17898),
+        (database.DEFAULT_STATION, '2020-03-01', 1.5, 18322),
+    ]
+    series = database.load_series()
+    assert series['tanggal'].tolist() == [np.datetime64(day) for day in ['2019-01-01', '2019-01-02', '2020-03-01']]
+
+    # Agregat dibangun dari data lama
+    assert database.load_yearly_stats()[['tahun', 'jumlah_hari']].values.tolist() == [[2019, 2], [2020, 1]]
+    assert database.load_yearly_floods(1.6)['banjir'].tolist() == [1, 0]
+
+    # Password lama di-hash, peran admin untuk akun bawaan 123
+    stored, role = database.get_credentials('123')
+    assert auth.is_hashed(stored) and auth.verify_password('123', stored) and role == 'admin'
+    stored, role = database.get_credentials('user')
+    assert auth.is_hashed(stored) and auth.verify_password('user123', stored) and role == 'user'
+
+    with database.connect() as conn:
+        assert {'berkas', 'isi_celah'} <= set(database._table_columns(conn, 'antrian_upload'))
+    assert database.load_year_versions() == {2019: 0, 2020: 0}
+    assert database.get_database_id() is not None
+
+
+def test_migration_is_idempotent(tmp_path, open_db):
+    path = tmp_path / 'lama.db'
+    _baseline_db(path)
+    open_db(path)
+    before = _rows("SELECT * FROM tma_data ORDER BY tanggal"), _rows("SELECT * FROM users ORDER BY username")
+    database_id = database.get_database_id()
+
+    database._create_schema()
+    assert (_rows("SELECT * FROM tma_data ORDER BY tanggal"), _rows("SELECT * FROM users ORDER BY username")) == before
+    assert database.get_database_id() == database_id
+
+
+def test_upsert_replaces_rows_per_station_and_date(db, tma_frame):
+    version = database.get_data_version()
+    database.upsert_tma(tma_frame(['2021-01-01', '2021-01-02', '2021-01-03'], [1.0, 1.1, 1.2]))
+    database.upsert_tma(tma_frame(['2021-01-03', '2021-01-04'], [2.0, 2.1]))
+    database.upsert_tma(tma_frame(['2021-01-01'], [3.0]), 'hilir')
+
+    assert _rows("SELECT tanggal, tma_max FROM tma_data WHERE stasiun=? ORDER BY tanggal",
+                 (database.DEFAULT_STATION,)) == [('2021-01-01', 1.0), ('2021-01-02', 1.1),
+                                                  ('2021-01-03', 2.0), ('2021-01-04', 2.1)]
+    assert _rows("SELECT tanggal, tma_max FROM tma_data WHERE stasiun='hilir'") == [('2021-01-01', 3.0)]
+    assert database.get_data_version() == version + 3
+    assert database.list_stations() == ['hilir', database.DEFAULT_STATION]
+
+
+def test_year_versions_change_only_for_written_years(db, tma_frame):
+    database.upsert_tma(tma_frame(['2019-06-01', '2020-06-01'], [1.0, 1.1]))
+    first = database.load_year_versions()
+    assert first[2019] == first[2020] > 0
+
+    database.upsert_tma(tma_frame(['2020-06-02'], [1.2]))
+    second = database.load_year_versions()
+    assert second[2019] == first[2019] and second[2020] > first[2020]
+
+    # Setelah reset, versi tidak pernah kembali ke nilai lama walaupun datanya sama
+    database.reset_tma()
+    assert database.load_year_versions() == {}
+    database.upsert_tma(tma_frame(['2019-06-01', '2020-06-01'], [1.0, 1.1]))
+    assert min(database.load_year_versions().values()) > max(second.values())
+
+
+# Fungsi tulis yang diberi conn ikut transaksi pemanggil: tidak ada commit sebelum blok luar selesai
+def test_nested_writes_join_the_outer_transaction(db, tma_frame):
+    job_id = database.create_job('tma.csv', database.DEFAULT_STATION)
+    try:
+        with database.transaction() as conn:
+            database.finish_job(job_id, 1, 0, [database.DEFAULT_STATION], [2021],
+                                {database.DEFAULT_STATION: {'celah': 2}}, conn=conn)
+            database.upsert_tma(tma_frame(['2021-01-01'], [1.0]), conn=conn)
+            assert conn.in_transaction
+            raise RuntimeError("batal")
+    except RuntimeError:
+        pass
+    assert database.load_jobs([job_id]).iloc[0]['status'] == 'antri'
+    assert database.load_job_quality([job_id]).empty
+    assert _rows("SELECT COUNT(*) FROM tma_data") == [(0,)]
+
+    with database.transaction() as conn:
+        database.finish_job(job_id, 1, 0, [database.DEFAULT_STATION], [2021], conn=conn)
+    assert database.load_jobs([job_id]).iloc[0]['status'] == 'selesai'
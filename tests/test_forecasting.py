@@ -0,0 +1,124 @@
+# test_forecasting.py - ForecastState inkremental dibandingkan dengan model_table + evaluate (hitung ulang penuh)
+import numpy as np
+import pandas as pd
+import pytest
+import forecasting
+import models
+
+# Model tahunan (tanpa data bulanan): sma/wma diperbarui inkremental, ses/holt selalu dihitung ulang
+YEARLY_MODELS = [name for name, model in models.MODELS.items() if not model.needs_monthly]
+FUZZ_CASES = 3000
+FUZZ_CHUNKS = 10
+# Prediksi dicek pada setiap langkah semua kasus; tabel lengkap, MAE dan MAPE (lebih mahal karena
+# membangun DataFrame) pada setiap langkah satu dari TABLE_EVERY kasus
+TABLE_EVERY = 30
+
+
+def _yearly(years, counts):
+    return pd.DataFrame({'tahun': np.asarray(years, dtype=np.int64), 'banjir': np.asarray(counts, dtype=np.int64)})
+
+
+def _same_number(actual, expected):
+    if np.isnan(expected):
+        return np.isnan(actual)
+    if np.isinf(expected):
+        return actual == expected
+    return bool(np.isclose(actual, expected, rtol=1e-9, atol=1e-9))
+
+
+def _check_predictions(state, yearly, model_name, window):
+    data = models.model_data(yearly)
+    assert state.years.tolist() == data.years.tolist()
+    assert np.array_equal(state.counts, data.counts)
+    assert np.allclose(state.predictions, models.get_model(model_name).predict(data, window),
+                       rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def _check(state, yearly, model_name, window):
+    table, eval_data, mae, mape = state.result()
+    expected = forecasting.model_table(models.model_data(yearly), yearly, model_name, window)
+    expected_eval, expected_mae, expected_mape = forecasting.evaluate(expected)
+    assert list(table.columns) == forecasting.TABLE_COLUMNS
+    assert table['tahun'].tolist() == expected['tahun'].tolist()
+    for column in forecasting.TABLE_COLUMNS[1:]:
+        assert np.allclose(table[column].to_numpy(float), expected[column].to_numpy(float),
+                           rtol=1e-9, atol=1e-9, equal_nan=True), column
+    assert eval_data['tahun'].tolist() == expected_eval['tahun'].tolist()
+    assert _same_number(mae, expected_mae), (mae, expected_mae)
+    assert _same_number(mape, expected_mape), (mape, expected_mape)
+
+
+# Perubahan acak: ubah beberapa tahun, tambah tahun baru di akhir, atau (jarang) hapus/sisipkan tahun
+def _mutate(rng, years, counts):
+    years, counts = list(years), list(counts)
+    action = rng.random()
+    if action < 0.45 and counts:
+        for i in rng.choice(len(counts), int(rng.integers(1, len(counts) + 1)), replace=False):
+            counts[i] = int(rng.integers(0, 40))
+    elif action < 0.8:
+        for _ in range(int(rng.integers(1, 4))):
+            years.append(years[-1] + 1 if years else 2000)
+            counts.append(int(rng.integers(0, 40)))
+    elif action < 0.9 and len(years) > 1:
+        i = int(rng.integers(0, len(years)))
+        del years[i], counts[i]
+    else:
+        counts = [int(value) for value in rng.integers(0, 40, len(counts))]
+    return years, counts
+
+
+@pytest.mark.parametrize('chunk', range(FUZZ_CHUNKS))
+def test_incremental_state_matches_full_recompute(chunk):
+    rng = np.random.default_rng(chunk)
+    for case in range(FUZZ_CASES // FUZZ_CHUNKS):
+        model_name = YEARLY_MODELS[int(rng.integers(0, len(YEARLY_MODELS)))]
+        window = int(rng.integers(1, 7))
+        n = int(rng.integers(1, 14))
+        years = list(range(2000, 2000 + n))
+        # Banyak nol agar jalur MAPE tak hingga / 0/0 ikut teruji
+        counts = [int(value) for value in rng.integers(0, 40, n) * (rng.random(n) > 0.2)]
+        state = forecasting.ForecastState(model_name, window)
+        for _ in range(int(rng.integers(1, 5))):
+            yearly = _yearly(years, counts)
+            state.update(yearly)
+            _check_predictions(state, yearly, model_name, window)
+            if case % TABLE_EVERY == 0:
+                _check(state, yearly, model_name, window)
+            years, counts = _mutate(rng, years, counts)
+
+
+def test_update_reports_changed_years_only():
+    state = forecasting.ForecastState('sma', 3)
+    assert state.update(_yearly([2019, 2020, 2021, 2022], [5, 7, 9, 11])) == [2019, 2020, 2021, 2022]
+    assert state.update(_yearly([2019, 2020, 2021, 2022], [5, 7, 9, 11])) == []
+    assert state.update(_yearly([2019, 2020, 2021, 2022, 2023], [5, 8, 9, 11, 4])) == [2020, 2023]
+    table = state.result()[0]
+    # Prediksi 2023 = rata-rata 2020-2022, baris terakhir = prediksi 2024
+    assert table['prediksi'].tolist()[-2:] == [pytest.approx(28 / 3), pytest.approx(8.0)]
+
+
+def test_result_is_cached_until_data_changes():
+    state = forecasting.ForecastState('wma', 2)
+    state.update(_yearly([2020, 2021, 2022], [1, 2, 3]))
+    first = state.result()
+    state.update(_yearly([2020, 2021, 2022], [1, 2, 3]))
+    assert state.result() is first
+    state.update(_yearly([2020, 2021, 2022], [1, 2, 4]))
+    assert state.result() is not first
+
+
+# min_years adalah jumlah tahun terkecil yang menghasilkan minimal satu tahun evaluasi
+@pytest.mark.parametrize('name', list(models.MODELS))
+@pytest.mark.parametrize('window', [3, 4])
+def test_min_years_gives_one_evaluated_year(name, window):
+    model = models.get_model(name)
+    n = model.min_years(window)
+    rng = np.random.default_rng(0)
+    for years, evaluated in ((n, True), (n - 1, False)):
+        yearly = _yearly(range(2000, 2000 + years), rng.integers(1, 40, years))
+        monthly = pd.DataFrame({'tahun': np.repeat(yearly['tahun'].to_numpy(), 12),
+                                'bulan': np.tile(np.arange(1, 13), years),
+                                'hari_banjir': 2, 'jumlah_hari': 30})
+        data = models.model_data(yearly, monthly if model.needs_monthly else None)
+        eval_data, _, _ = forecasting.evaluate(forecasting.model_table(data, yearly, name, window))
+        assert (len(eval_data) > 0) == evaluated
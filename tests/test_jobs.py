@@ -0,0 +1,92 @@
+# test_jobs.py - Antrian upload: file di-spool ke disk, dihapus setelah diproses, job proses mati dilanjutkan
+import io
+import os
+import subprocess
+import sys
+import time
+import database
+import jobs
+import synthetic
+
+
+def _csv(days=40):
+    data = synthetic.generate(stations=1, years=1, seed=4).head(days).drop(columns='stasiun')
+    buffer = io.BytesIO(synthetic.to_upload_frame(data).to_csv(index=False).encode('utf-8'))
+    buffer.name = 'tma.csv'
+    return buffer
+
+
+def _wait(job_id, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = database.load_jobs([job_id]).iloc[0]
+        if job['status'] not in database.ACTIVE_JOB_STATUSES:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} belum selesai")
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_upload_is_spooled_and_removed(db):
+    job_id = jobs.submit(_csv(), 'hulu')
+    job = _wait(job_id)
+    assert job['status'] == 'selesai' and job['baris'] == 40
+    assert len(database.load_series('hulu')) == 40
+    assert os.listdir(jobs.spool_dir()) == []
+
+
+def _spool_file(name, days):
+    os.makedirs(jobs.spool_dir(), exist_ok=True)
+    berkas = os.path.join(jobs.spool_dir(), name)
+    with open(berkas, 'wb') as f:
+        f.write(_csv(days).getvalue())
+    return berkas
+
+
+def test_interrupted_job_resumes_from_spool_file(db):
+    berkas = _spool_file('sisa.csv', 25)
+    resumed_id = database.create_job('sisa.csv', 'hilir', pid=_dead_pid(), berkas=berkas,
+                                     host=jobs.HOST_ID, instans='proses-lama')
+    lost_id = database.create_job('hilang.csv', 'hilir', pid=_dead_pid(), host=jobs.HOST_ID, instans='proses-lama',
+                                  berkas=os.path.join(jobs.spool_dir(), 'hilang.csv'))
+    running_id = database.create_job('jalan.csv', 'hilir', pid=os.getpid(), host=jobs.HOST_ID, instans='proses-lain')
+
+    jobs.recover_interrupted(jobs._get_executor())
+    assert _wait(resumed_id)['baris'] == 25
+    lost = database.load_jobs([lost_id]).iloc[0]
+    assert lost['status'] == 'gagal' and lost['pesan'] == jobs.INTERRUPTED_MESSAGE
+    assert database.load_jobs([running_id]).iloc[0]['status'] == 'antri'
+    assert not os.path.exists(berkas)
+    # Job yang sudah diambil alih tidak diproses dua kali
+    assert jobs.recover_interrupted(jobs._get_executor()) == ([], [])
+
+
+# pid dari host lain tidak bisa diperiksa: yang menentukan adalah detak
+def test_job_from_other_host_is_resumed_only_when_heartbeat_is_stale(db):
+    berkas = _spool_file('lain.csv', 10)
+    job_id = database.create_job('lain.csv', 'tengah', pid=os.getpid(), berkas=berkas, host='host-lain/boot',
+                                 instans='proses-host-lain')
+    assert jobs.recover_interrupted(jobs._get_executor()) == ([], [])
+
+    with database.transaction() as conn:
+        conn.execute("UPDATE antrian_upload SET detak=datetime('now', ?) WHERE id=?",
+                     (f'-{jobs.STALE_SECONDS + 5} seconds', job_id))
+    jobs.recover_interrupted(jobs._get_executor())
+    assert _wait(job_id)['baris'] == 10
+
+
+def test_heartbeat_keeps_own_jobs_fresh(db):
+    job_id = database.create_job('saya.csv', 'hulu', pid=os.getpid(), host=jobs.HOST_ID, instans=jobs.INSTANCE_ID)
+    with database.transaction() as conn:
+        conn.execute("UPDATE antrian_upload SET detak='2000-01-01 00:00:00' WHERE id=?", (job_id,))
+    database.heartbeat_jobs(jobs.INSTANCE_ID)
+    assert [row[4] for row in database.unfinished_jobs(jobs.STALE_SECONDS) if row[0] == job_id] == [0]
+    # Job milik proses ini sendiri tidak pernah diambil alih walaupun detaknya basi
+    with database.transaction() as conn:
+        conn.execute("UPDATE antrian_upload SET detak='2000-01-01 00:00:00' WHERE id=?", (job_id,))
+    assert jobs.recover_interrupted(jobs._get_executor()) == ([], [])
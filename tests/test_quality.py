@@ -0,0 +1,103 @@
+# test_quality.py - Aturan kualitas data: pelanggaran per baris, tanggal ganda/hilang, pencilan, isi celah
+import numpy as np
+import pandas as pd
+import pytest
+import database
+import quality
+
+
+def _row(jam_06=1.0, jam_12=1.2, jam_18=1.1, tma_min=1.0, tma_max=1.2, tma_rata=1.1):
+    return {'jam_06': jam_06, 'jam_12': jam_12, 'jam_18': jam_18, 'tma_min': tma_min, 'tma_max': tma_max,
+            'tma_rata': tma_rata}
+
+
+@pytest.mark.parametrize('row, rules', [
+    (_row(), []),
+    (_row(jam_12=11.0, tma_max=11.0, tma_rata=4.37), ['di_luar_rentang']),
+    (_row(tma_min=1.3), ['min_lebih_dari_max', 'jam_di_luar_min_max', 'rata_di_luar_min_max']),
+    (_row(jam_06=0.8), ['jam_di_luar_min_max', 'rata_tidak_sesuai']),
+    (_row(tma_rata=1.25), ['rata_di_luar_min_max', 'rata_tidak_sesuai']),
+    (_row(tma_rata=1.17), ['rata_tidak_sesuai']),
+    # Selisih pembulatan sampai TOLERANCE bukan pelanggaran
+    (_row(jam_12=1.204, tma_rata=1.104), []),
+])
+def test_row_rules(row, rules):
+    counts = quality.row_counts(pd.DataFrame([row]))
+    assert [rule for rule, count in counts.items() if count] == rules
+
+
+def test_telemetry_rows_only_check_range():
+    assert quality.row_counts(pd.DataFrame({'waktu': ['2020-01-01 00:00'] * 3, 'tma': [1.0, -0.5, 12.0]})) == \
+        {'di_luar_rentang': 2}
+
+
+def test_duplicate_count():
+    assert quality.duplicate_count([3, 1, 3, 2, 3]) == 2
+    assert quality.duplicate_count([]) == 0
+
+
+def test_rolling_median_matches_pandas():
+    rng = np.random.default_rng(0)
+    values = rng.normal(1.5, 0.3, 500)
+    values[rng.random(500) < 0.2] = np.nan
+    for window in (3, 5, 7):
+        expected = pd.Series(values).rolling(window, center=True, min_periods=window // 2 + 1).median()
+        assert np.allclose(quality.rolling_median(values, window), expected.to_numpy(), equal_nan=True)
+
+
+def _series(days, tma_max):
+    tma_max = np.asarray(tma_max, dtype=float)
+    frame = {'tanggal': np.array(days, dtype='datetime64[D]')}
+    for name in database.NUMERIC_COLUMNS:
+        frame[name] = tma_max
+    return frame
+
+
+def test_check_series_finds_gaps_and_flood_spike():
+    days = np.datetime64('2020-01-01') + np.arange(40)
+    keep = np.ones(40, dtype=bool)
+    keep[[10, 20, 21, 22]] = False
+    tma_max = np.full(40, 1.2)
+    tma_max[30] = 2.5
+    report = quality.check_series(_series(days[keep], tma_max[keep]), threshold=1.6)
+
+    assert report.jumlah['tanggal_hilang'] == 4 and report.jumlah['celah'] == 2
+    assert report.celah['hari'].tolist() == [1, 3]
+    assert report.celah['mulai'].tolist() == [pd.Timestamp('2020-01-11'), pd.Timestamp('2020-01-21')]
+    assert report.jumlah['pencilan'] == 1 and report.jumlah['pencilan_banjir'] == 1
+    assert report.pencilan['tanggal'].tolist() == [pd.Timestamp('2020-01-31')]
+
+
+# Banjir yang bertahan lebih lama dari setengah jendela bukan pencilan
+def test_sustained_flood_is_not_an_outlier():
+    days = np.datetime64('2020-01-01') + np.arange(30)
+    tma_max = np.full(30, 1.2)
+    tma_max[10:16] = 2.5
+    assert quality.check_series(_series(days, tma_max)).jumlah['pencilan'] == 0
+
+
+def test_check_series_counts_only_inside_range():
+    days = np.datetime64('2020-01-01') + np.arange(30)
+    keep = np.ones(30, dtype=bool)
+    keep[[5, 25]] = False
+    report = quality.check_series(_series(days[keep], np.full(28, 1.2)), start='2020-01-15', end='2020-01-31')
+    assert report.jumlah['tanggal_hilang'] == 1
+
+
+def test_fill_gaps_interpolates_short_gaps_only():
+    days = np.array(['2020-01-01', '2020-01-03', '2020-01-10'], dtype='datetime64[D]')
+    rows = quality.fill_gaps(_series(days, [1.0, 2.0, 3.0]), max_days=3)
+    assert rows['tanggal'].tolist() == [pd.Timestamp('2020-01-02')]
+    assert rows['tma_max'].tolist() == [1.5]
+    assert list(rows.columns) == database.TMA_COLUMNS
+
+    rows = quality.fill_gaps(_series(days, [1.0, 2.0, 3.0]), max_days=6)
+    assert len(rows) == 7 and rows['tma_max'].iloc[-1] == pytest.approx(2.857, abs=1e-3)
+
+
+def test_check_stored_fills_gaps_in_database(db, tma_frame):
+    days = pd.date_range('2021-05-01', '2021-05-20')
+    database.upsert_tma(tma_frame(days.delete([4, 5]), np.full(18, 1.4)))
+    report = quality.check_stored(database.DEFAULT_STATION, days[0], days[-1], fill=True)
+    assert report.jumlah['celah_diisi'] == 2 and report.jumlah['tanggal_hilang'] == 0
+    assert len(database.load_series()) == 20
@@ -0,0 +1,48 @@
+# test_reports.py - Cache bagian laporan: dipakai ulang per tahun, tidak tertukar antar database
+import os
+import database
+import reports
+import synthetic
+
+
+def _upload(stations=1, years=2, seed=0):
+    data = synthetic.generate(stations=stations, years=years, seed=seed)
+    for stasiun, frame in data.groupby('stasiun'):
+        database.upsert_tma(frame.drop(columns='stasiun'), stasiun)
+
+
+def test_only_changed_year_is_rendered_again(db, tma_frame):
+    reports.clear_cache()
+    _upload()
+    cache_dir = reports.report_cache_dir()
+    assert os.path.dirname(cache_dir) == os.path.dirname(db)
+
+    first = reports.generate(['stasiun_01'], cache_dir=cache_dir)
+    assert (first.dirender, first.dari_cache) == (3, 0)
+    again = reports.generate(['stasiun_01'], cache_dir=cache_dir)
+    assert (again.dirender, again.dari_cache) == (0, 3)
+
+    # Nilai dua hari ditukar: jumlah per tahun tetap sama tetapi bagian 2020 harus dirender ulang;
+    # prediksi (kuncinya jumlah banjir per tahun) tetap dari cache
+    series = database.load_series('stasiun_01', [2020])
+    database.upsert_tma(tma_frame(['2020-01-05', '2020-01-06'],
+                                  [series['tma_max'][5], series['tma_max'][4]]), 'stasiun_01')
+    changed = reports.generate(['stasiun_01'], cache_dir=cache_dir)
+    assert (changed.dirender, changed.dari_cache) == (1, 2)
+
+    # Cache disk tetap berlaku tanpa cache memori
+    reports.clear_cache()
+    assert reports.generate(['stasiun_01'], cache_dir=cache_dir).dari_cache == 3
+
+
+def test_shared_cache_dir_is_not_reused_across_databases(tmp_path, open_db):
+    reports.clear_cache()
+    cache_dir = str(tmp_path / 'cache')
+    open_db(tmp_path / 'a.db')
+    _upload()
+    assert reports.generate(['stasiun_01'], cache_dir=cache_dir).dirender == 3
+
+    # Data berbeda dengan versi data yang sama di database lain
+    open_db(tmp_path / 'b.db')
+    _upload(seed=1)
+    assert reports.generate(['stasiun_01'], cache_dir=cache_dir).dirender == 3
@@ -0,0 +1,49 @@
+# test_series.py - TMASeries: urutan, potongan tahun/bulan tanpa salinan, dan perbandingan threshold float32
+import numpy as np
+import pytest
+from series import READING_COLUMNS, TMASeries
+
+
+def _series(days, tma_max):
+    tanggal = np.array(days, dtype='datetime64[D]')
+    readings = {name: np.asarray(tma_max, dtype=np.float64) for name in READING_COLUMNS}
+    return TMASeries(tanggal, readings)
+
+
+# Bacaan float32 1.60 tidak boleh dihitung di atas threshold 1.60: dibandingkan pada float64,
+# float32(1.6) = 1.60000002 lebih besar dari 1.6
+def test_above_compares_at_column_precision():
+    series = _series(['2020-01-01', '2020-01-02', '2020-01-03'], [1.6, 1.61, 1.59])
+    assert series['tma_max'].dtype == np.float32
+    assert (series['tma_max'] > np.float64(1.6)).tolist() == [True, True, False]
+    assert series.above('tma_max', 1.6).tolist() == [False, True, False]
+    assert series.above('tma_max', np.float64(1.6)).tolist() == [False, True, False]
+
+
+def test_above_matches_rounded_float64_readings():
+    rng = np.random.default_rng(0)
+    values = rng.integers(100, 300, 3000) / 100
+    days = np.datetime64('2015-01-01') + np.arange(len(values))
+    series = _series(days, values)
+    for threshold in np.round(np.arange(1.0, 3.0 + 1e-9, 0.1), 1):
+        assert np.array_equal(series.above('tma_max', threshold), values > threshold)
+
+
+def test_unsorted_input_is_sorted_and_read_only():
+    series = _series(['2020-03-01', '2019-12-31', '2020-01-15'], [3.0, 1.0, 2.0])
+    assert series['tanggal'].tolist() == sorted(series['tanggal'].tolist())
+    assert series['tma_max'].tolist() == [1.0, 2.0, 3.0]
+    with pytest.raises(ValueError):
+        series['tma_max'][0] = 5.0
+
+
+def test_year_and_month_are_views():
+    days = np.datetime64('2019-12-30') + np.arange(70)
+    series = _series(days, np.arange(70) / 10)
+    year = series.year(2020)
+    assert len(year) == 68 and year.years() == [2020]
+    assert np.shares_memory(year['tma_max'], series['tma_max'])
+    february = series.month(2020, 2)
+    assert len(february) == 29
+    assert february.bulan.tolist() == [2] * 29 and february.hari.tolist() == list(range(1, 30))
+    assert series.year(2030).empty
@@ -0,0 +1,46 @@
+# test_snapshot.py - Stasiun yang tidak ada di snapshot dan penghapusan versi lama
+import os
+import time
+import pytest
+import data_access
+import database
+import snapshot
+
+
+@pytest.fixture
+def snapshot_dir(db, tmp_path, monkeypatch):
+    path = str(tmp_path / 'snapshot')
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', path)
+    return path
+
+
+def test_station_added_after_publish_is_read_from_sqlite(snapshot_dir, tma_frame):
+    database.upsert_tma(tma_frame(['2020-01-01', '2020-01-02'], [1.2, 1.7]), 'Lama')
+    name = snapshot.publish()
+    database.upsert_tma(tma_frame(['2021-02-01'], [1.8]), 'Baru')
+
+    assert len(snapshot.load_series(name, 'Lama')) == 2
+    with pytest.raises(FileNotFoundError):
+        snapshot.load_series(name, 'Baru')
+    with pytest.raises(FileNotFoundError):
+        snapshot.load_sweep(name, 'Baru')
+
+    series = data_access._load_tma(name, 'Baru')
+    assert len(series) == 1
+    assert data_access._load_flood_sweep(name, 'Baru', 'month').sweep() is not None
+
+
+def test_cleanup_keeps_recently_superseded_versions(snapshot_dir):
+    os.makedirs(snapshot_dir)
+    now = time.time()
+    for version in range(1, 7):
+        path = os.path.join(snapshot_dir, f'v{version}')
+        os.makedirs(path)
+        # v1-v3 diterbitkan lama sekali, v4 baru saja menggantikan v3
+        published = now - 3600 if version <= 3 else now
+        os.utime(path, (published, published))
+    snapshot._set_current('v6')
+
+    snapshot._cleanup(keep=3, retain=600)
+
+    assert sorted(name for name in os.listdir(snapshot_dir) if name.startswith('v')) == ['v3', 'v4', 'v5', 'v6']
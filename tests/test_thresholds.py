@@ -0,0 +1,52 @@
+# test_thresholds.py - Hitungan hari banjir ThresholdSweep dibandingkan dengan perbandingan langsung
+import numpy as np
+import pytest
+from thresholds import SLIDER_THRESHOLDS, ThresholdSweep
+
+
+def _random_readings(rng, n, dtype):
+    keys = rng.integers(2015, 2025, n)
+    values = rng.integers(80, 320, n) / 100
+    values[rng.random(n) < 0.05] = np.nan
+    return keys, values.astype(dtype)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_count_above_matches_direct_comparison(dtype):
+    rng = np.random.default_rng(0)
+    keys, values = _random_readings(rng, 5000, dtype)
+    sweep = ThresholdSweep(keys, values)
+    for key in range(2014, 2026):
+        for threshold in list(SLIDER_THRESHOLDS) + [1.55, 1.605, 2.999]:
+            in_bucket = values[keys == key]
+            expected = int((in_bucket > dtype(threshold)).sum())
+            assert sweep.count_above(key, threshold) == expected, (key, threshold)
+
+
+# Bacaan tepat sama dengan threshold bukan hari banjir, juga untuk float32 (1.6 float32 > 1.6 float64)
+def test_count_above_is_strict_at_column_precision():
+    values = np.array([1.6, 1.6, 1.61, 1.59], dtype=np.float32)
+    sweep = ThresholdSweep([2020] * 4, values)
+    assert sweep.count_above(2020, 1.6) == 1
+    assert sweep.count_above(2020, 1.59) == 3
+    assert sweep.count_above(2021, 1.0) == 0
+
+
+def test_sweep_matches_count_above_and_survives_arrays_roundtrip():
+    rng = np.random.default_rng(1)
+    keys, values = _random_readings(rng, 2000, np.float32)
+    sweep = ThresholdSweep(keys, values)
+    counts = sweep.sweep()
+    for i, key in enumerate(sweep.buckets):
+        assert counts[i].tolist() == [sweep.count_above(key, t) for t in SLIDER_THRESHOLDS]
+    assert sweep.bucket_sizes().sum() == np.count_nonzero(~np.isnan(values))
+
+    restored = ThresholdSweep.from_arrays(**sweep.arrays())
+    assert np.array_equal(restored.sweep(), counts)
+
+
+def test_by_month_buckets():
+    dates = np.array(['2020-01-31', '2020-02-01', '2020-02-15', '2021-02-01'], dtype='datetime64[D]')
+    sweep = ThresholdSweep.by_month(dates, [2.0, 1.0, 2.0, 2.0])
+    assert sweep.buckets.tolist() == [202001, 202002, 202102]
+    assert sweep.sweep([1.5])[:, 0].tolist() == [1, 1, 1]
@@ -0,0 +1,101 @@
+# thresholds.py - Hitung hari banjir untuk threshold apa pun dengan pencarian biner
+import numpy as np
+import pandas as pd
+import profiling
+
+# Grid threshold sesuai slider (1.0 - 3.0 m, langkah 0.1 m)
+SLIDER_THRESHOLDS = np.round(np.arange(1.0, 3.0 + 1e-9, 0.1), 1)
+
+
+# Nilai tma_max diurutkan sekali per bucket (tahun atau tahun-bulan).
+# Jumlah hari dengan tma_max > t = n_bucket - searchsorted(nilai_bucket, t, side='right').
+# Threshold dibandingkan pada presisi nilai (float32 dari TMASeries atau float64).
+class ThresholdSweep:
+    def __init__(self, keys, values):
+        keys = np.asarray(keys)
+        values = np.asarray(values)
+        if not np.issubdtype(values.dtype, np.floating):
+            values = values.astype(np.float64)
+        valid = ~np.isnan(values)
+        keys, values = keys[valid], values[valid]
+
+        order = np.lexsort((values, keys))
+        self._values = values[order]
+        self.buckets, self._starts = np.unique(keys[order], return_index=True)
+        self._ends = np.append(self._starts[1:], len(self._values)).astype(self._starts.dtype)
+
+    # Susun ulang dari array hasil arrays() (misalnya memory-mapped dari snapshot) tanpa mengurutkan lagi
+    @classmethod
+    def from_arrays(cls, buckets, starts, ends, values):
+        sweep = cls.__new__(cls)
+        sweep.buckets, sweep._starts, sweep._ends, sweep._values = buckets, starts, ends, values
+        return sweep
+
+    def arrays(self):
+        return {'buckets': self.buckets, 'starts': self._starts, 'ends': self._ends, 'values': self._values}
+
+    @classmethod
+    def by_year(cls, dates, values):
+        dates = pd.DatetimeIndex(dates)
+        return cls(dates.year, values)
+
+    @classmethod
+    def by_month(cls, dates, values):
+        dates = pd.DatetimeIndex(dates)
+        return cls(dates.year * 100 + dates.month, values)
+
+    def bucket_sizes(self):
+        return self._ends - self._starts
+
+    def _bucket_slice(self, key):
+        i = np.searchsorted(self.buckets, key)
+        if i == len(self.buckets) or self.buckets[i] != key:
+            return 0, 0
+        return self._starts[i], self._ends[i]
+
+    # Jumlah hari banjir satu bucket untuk satu threshold
+    def count_above(self, key, threshold):
+        lo, hi = self._bucket_slice(key)
+        threshold = self._values.dtype.type(threshold)
+        return int(hi - lo - np.searchsorted(self._values[lo:hi], threshold, side='right'))
+
+    # Matriks jumlah hari banjir: baris = bucket, kolom = threshold
+    def sweep(self, thresholds=SLIDER_THRESHOLDS):
+        thresholds = np.atleast_1d(np.asarray(thresholds, dtype=self._values.dtype))
+        counts = np.empty((len(self.buckets), len(thresholds)), dtype=np.int64)
+        for i, (lo, hi) in enumerate(zip(self._starts, self._ends)):
+            counts[i] = (hi - lo) - np.searchsorted(self._values[lo:hi], thresholds, side='right')
+        return counts
+
+    def sweep_frame(self, thresholds=SLIDER_THRESHOLDS):
+        return pd.DataFrame(self.sweep(thresholds), index=self.buckets, columns=thresholds)
+
+
+# Analisis sensitivitas: prediksi Moving Average dan error untuk setiap threshold sekaligus.
+# MAPE mengabaikan tahun dengan aktual 0 (sama seperti calculate_mape di halaman Prediksi).
+@profiling.timed('thresholds.sensitivity_table')
+def sensitivity_table(sweep, window, thresholds=SLIDER_THRESHOLDS):
+    counts = sweep.sweep(thresholds).astype(np.float64)
+    n_years = counts.shape[0]
+    if n_years < window:
+        return pd.DataFrame(columns=['threshold', 'prediksi_tahun_depan', 'mae', 'mape'])
+
+    cumsum = np.vstack([np.zeros((1, counts.shape[1])), np.cumsum(counts, axis=0)])
+    rolling_mean = (cumsum[window:] - cumsum[:-window]) / window
+    next_year = rolling_mean[-1]
+
+    predicted = rolling_mean[:-1]
+    actual = counts[window:]
+    abs_error = np.abs(actual - predicted)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mae = abs_error.mean(axis=0) if len(actual) else np.full(len(next_year), np.nan)
+        mask = actual != 0
+        pct = np.where(mask, abs_error / np.where(mask, actual, 1), 0.0)
+        mape = np.where(mask.any(axis=0), pct.sum(axis=0) / mask.sum(axis=0) * 100, np.inf)
+
+    return pd.DataFrame({
+        'threshold': np.asarray(thresholds, dtype=np.float64),
+        'prediksi_tahun_depan': next_year,
+        'mae': mae,
+        'mape': mape,
+    })